@@ -1,89 +1,125 @@
-import time, random
-from flask import Flask, render_template
+import sys
+from flask import Flask, jsonify, render_template, request
 from flask_socketio import SocketIO, emit
-from stable_baselines3 import DQN, PPO
-from snake_env import SnakeEnv
+from model_registry import ModelRegistry
+from game_sessions import SessionManager
+from inference_service import InferenceService, create_blueprint, register_socketio_handlers
+from replay import ReplayLibrary
+from planner import SearchPlanner
 
 app = Flask(__name__)
 socketio = SocketIO(app)
 
-# Erstelle die Umgebung
-env = SnakeEnv()
-nextHumanAction = random.randint(0, 3)
-
-def _direction_to_text(direction):
-    if direction == (0, -1):
-        return "up"
-    elif direction == (1, 0):
-        return "right"
-    elif direction == (0, 1):
-        return "down"
-    elif direction == (-1, 0):
-        return "left"
-    return "unknown"
+# Modelle werden einmal geladen und im Speicher gehalten
+registry = ModelRegistry("./models")
+# Jeder Client bekommt sein eigenes Spiel (Umgebung, Modell, Aktion)
+sessions = SessionManager(socketio, tick_rate=10.0)
+# Die Spiele schicken ihre Beobachtungen an den Inferenz-Dienst, der sie pro Modell bündelt;
+# /predict und das Socket.IO-Event 'predict' stehen auch externen Clients zur Verfügung
+inference = InferenceService(registry, window_ms=2.0, max_batch=256)
+use_batching = True
+app.register_blueprint(create_blueprint(inference))
+register_socketio_handlers(socketio, inference)
+# Suchplaner (Option "Planer" im Browser); das Budget muss unter dem Tick-Intervall bleiben
+planner_budget_ms = 50.0
+planner_beam_width = 64
+# Aufgezeichnete Episoden (test.py --record) zum Abspielen im Browser
+replays = ReplayLibrary("./replays")
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/models')
+def models():
+    return jsonify({'models': registry.list_models(), 'loaded': registry.cached_models(), 'games': len(sessions)})
+
+@app.route('/replays')
+def replay_files():
+    return jsonify({'files': replays.list_files()})
+
+@app.route('/replays/<path:name>/<int:episode>')
+def replay_episode(name, episode):
+    try:
+        with replays.open(name) as replay_file:
+            replay = replay_file[episode]
+            return jsonify({'steps': replay.n_steps, 'score': replay.score, 'seed': replay.seed,
+                            'episodes': len(replay_file), 'state': replay.state_at(0)})
+    except (ValueError, OSError, IndexError) as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/replays/<path:name>/<int:episode>/<int:step>')
+def replay_state(name, episode, step):
+    try:
+        with replays.open(name) as replay_file:
+            return jsonify(replay_file[episode].state_at(step))
+    except (ValueError, OSError, IndexError) as e:
+        return jsonify({'error': str(e)}), 404
+
 @socketio.on('human_action')
 def human_action(data):
-    global nextHumanAction 
-    humanAction = data.get('direction')
-    if humanAction == 'up':
-        nextHumanAction = 0
-    elif humanAction == 'right':
-        nextHumanAction = 1
-    elif humanAction == 'down':
-        nextHumanAction = 2
-    elif humanAction == 'left':
-        nextHumanAction = 3
+    sessions.set_action(request.sid, data.get('direction'))
+
+@socketio.on('disconnect')
+def disconnect(*args):
+    sessions.stop(request.sid)
 
 @socketio.on('start_test')
 def start_test(data):
     model_name = data.get('model', 'ppo_snake_config0')  # Standardmodell, falls nichts übergeben wird
-    model_path = f"./models/{model_name}"
     
     # human player
     if model_name == 'human':
         print("Human player")
-        obs, _ = env.reset()
-        done = False
-        while not done:        
-            obs, reward, terminated, truncated, info = env.step(nextHumanAction)
-            done = terminated or truncated
-            grid = env.get_grid()
-            socketio.emit('state_update', {
-                'state': grid.tolist(),
-                'score': env.score,
-                'direction': _direction_to_text(env.direction),
-            })
-            time.sleep(0.1)
-        socketio.emit('episode_end', {'score': env.score})
+        sessions.start(request.sid, binary=bool(data.get('binary')))
     
     # AI player    
     else:
-        print(f"Loading model from {model_path}")
+        print(f"Using model {model_name}")
         try:
-            model = PPO.load(model_path)
+            model = registry.get(model_name)
         except Exception as e:
             emit('error', {'message': f'Fehler beim Laden des Modells: {str(e)}'})
             return
-        obs, _ = env.reset()
-        done = False
-        while not done:
-            action, _states = model.predict(obs)
-            obs, reward, terminated, truncated, info = env.step(action)
-            done = terminated or truncated
-            grid = env.get_grid()
-            
-            socketio.emit('state_update', {
-                'state': grid.tolist(),
-                'score': env.score,
-                'direction': _direction_to_text(env.direction),
-            })
-            time.sleep(0.1)
-        socketio.emit('episode_end', {'score': env.score})
+        if data.get('planner'):
+            try:
+                model = SearchPlanner(model, beam_width=planner_beam_width, time_budget_ms=planner_budget_ms)
+            except ValueError as e:
+                emit('error', {'message': f'Planer nicht verfügbar: {str(e)}'})
+                return
+        elif use_batching:
+            model = inference.policy(model_name)
+        sessions.start(request.sid, model, binary=bool(data.get('binary')))
+
+def run(preload=False, cache_size=8, tick_rate=10.0, batch_window_ms=2.0, max_batch=256, batching=True,
+        budget_ms=50.0, beam_width=64, debug=True):
+    """
+    Configure the registry, the game sessions and the inference service and start the web server.
+
+    Args:
+        preload (bool, optional): Load all models into the cache at startup.
+        cache_size (int, optional): Maximum number of models kept in memory.
+        tick_rate (float, optional): Game steps per second.
+        batch_window_ms (float, optional): How long the inference service collects observations per batch.
+        max_batch (int, optional): Maximum observations per forward pass.
+        batching (bool, optional): If False, every game calls model.predict itself.
+        budget_ms (float, optional): Time budget per move of the search planner.
+        beam_width (int, optional): Nodes kept per search level of the planner.
+        debug (bool, optional): Run Flask in debug mode with the reloader.
+    """
+    global use_batching, planner_budget_ms, planner_beam_width
+    registry.max_size = cache_size
+    sessions.tick_rate = tick_rate
+    inference.window_ms = batch_window_ms
+    inference.max_batch = max_batch
+    use_batching = batching
+    planner_budget_ms = budget_ms
+    planner_beam_width = beam_width
+    if preload:
+        registry.preload()
+    socketio.run(app, debug=debug)
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True)
+    # Die Argumente sind in snake.py definiert (python src/snake.py serve --help)
+    from snake import main
+    main(["serve", *sys.argv[1:]])
@@ -0,0 +1,242 @@
+import copy
+import io
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import recursive_getattr, save_to_zip_file
+from evaluation import evaluate_model_bytes, evaluate_policy_arrays, summarize_scores
+from numpy_policy import policy_arrays
+
+
+def snapshot_model(model):
+    """
+    Copy everything ``model.save`` writes into memory, so it can be written later.
+
+    Mirrors ``BaseAlgorithm.save``: the class attributes without the excluded ones, the state
+    dicts (policy and optimizer) and the other torch variables, all deep-copied so that training
+    can go on while the snapshot is serialized in the background.
+
+    Args:
+        model (BaseAlgorithm): The model, e.g. PPO.
+
+    Returns:
+        dict: data, params and pytorch_variables for ``write_snapshot``.
+    """
+    exclude = set(model._excluded_save_params())
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    for torch_var in state_dicts_names + torch_variable_names:
+        exclude.add(torch_var.split(".")[0])
+    data = copy.deepcopy({k: v for k, v in model.__dict__.items() if k not in exclude})
+    pytorch_variables = {name: copy.deepcopy(recursive_getattr(model, name)) for name in torch_variable_names}
+    params = copy.deepcopy(model.get_parameters())
+    return {"data": data, "params": params, "pytorch_variables": pytorch_variables}
+
+
+def write_snapshot(snapshot, path):
+    """Write a snapshot of ``snapshot_model`` as a regular model zip (loadable with ``PPO.load``)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Erst in eine temporäre Datei schreiben, damit nie ein halb geschriebenes Modell geladen wird
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        save_to_zip_file(f, data=snapshot["data"], params=snapshot["params"],
+                         pytorch_variables=snapshot["pytorch_variables"])
+    os.replace(tmp_path, path)
+
+
+def snapshot_bytes(snapshot):
+    """Serialize a snapshot of ``snapshot_model`` to the bytes of a model zip."""
+    buffer = io.BytesIO()
+    save_to_zip_file(buffer, data=snapshot["data"], params=snapshot["params"],
+                     pytorch_variables=snapshot["pytorch_variables"])
+    return buffer.getvalue()
+
+
+class BackgroundWriter:
+    """
+    Single background thread that runs file writes in submission order.
+
+    Shared by the checkpoint and eval callbacks, so all model files are written by one thread
+    and the retention bookkeeping needs no locking.
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        self._queue.put((fn, args))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            fn, args = task
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Fehler beim Schreiben im Hintergrund: {e}")
+
+    def close(self):
+        """Wait until all submitted writes are done and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """
+    Checkpointing without stalling training: the model is snapshotted in memory and the zip is
+    written by a background thread. Only the newest ``keep_last`` checkpoints are kept.
+
+    Args:
+        save_freq (int): Save a checkpoint every ``save_freq`` calls (vectorized steps).
+        save_path (str): Directory of the checkpoints.
+        writer (BackgroundWriter): Thread that writes the files.
+        name_prefix (str, optional): File name prefix, like CheckpointCallback.
+        keep_last (int, optional): Number of checkpoints to keep, None keeps all.
+    """
+    def __init__(self, save_freq, save_path, writer, name_prefix="ppo_snake", keep_last=5, verbose=0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.save_path = save_path
+        self.writer = writer
+        self.name_prefix = name_prefix
+        self.keep_last = keep_last
+        self._written = []  # wird nur vom Writer-Thread verändert
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.save_freq == 0:
+            path = os.path.join(self.save_path, f"{self.name_prefix}_{self.num_timesteps}_steps.zip")
+            self.writer.submit(self._write, snapshot_model(self.model), path)
+        return True
+
+    def _write(self, snapshot, path):
+        write_snapshot(snapshot, path)
+        if self.verbose:
+            print(f"Saving model checkpoint to {path}")
+        self._written.append(path)
+        while self.keep_last is not None and len(self._written) > self.keep_last:
+            old = self._written.pop(0)
+            if os.path.exists(old):
+                os.remove(old)
+
+
+class AsyncEvalCallback(BaseCallback):
+    """
+    Evaluation in a separate worker process while training continues.
+
+    At every eval point the actor network is copied to NumPy (``policy_arrays``) and played for
+    ``n_eval_episodes`` episodes on the worker's own VecSnakeEnv. Policies that cannot be exported
+    to NumPy (CNN policies of observation_mode="grid") are sent as zip bytes and run with torch in
+    the worker instead. The model itself is snapshotted in memory at the same time. Finished results are picked up on the next steps: they are logged
+    under ``eval/`` (tagged with the timesteps of the snapshot), appended to
+    ``log_path/evaluations.npz`` and, if the mean score is among the best ``keep_best``, the
+    snapshot is written to ``best_model_save_path`` by the background writer (``best_model.zip``
+    is always the best one).
+
+    Args:
+        eval_freq (int): Start an evaluation every ``eval_freq`` calls (vectorized steps).
+        best_model_save_path (str): Directory of the best models.
+        writer (BackgroundWriter): Thread that writes the files.
+        n_eval_episodes (int, optional): Episodes per evaluation.
+        keep_best (int, optional): Number of best snapshots kept as ``model_<steps>_steps.zip``.
+        log_path (str, optional): Directory for evaluations.npz, None to disable.
+        max_pending (int, optional): Evaluations that may run or wait at the same time; eval
+                                     points beyond that are skipped instead of queueing up.
+        seed (int, optional): Seed of the evaluation games, the same for every evaluation.
+        deterministic (bool, optional): Use the greedy action instead of sampling.
+        observation_mode (str, optional): Observation mode of the trained model ("features" or "grid").
+    """
+    def __init__(self, eval_freq, best_model_save_path, writer, n_eval_episodes=100, keep_best=3, log_path=None,
+                 max_pending=2, seed=0, deterministic=False, observation_mode="features", verbose=1):
+        super().__init__(verbose)
+        self.eval_freq = eval_freq
+        self.best_model_save_path = best_model_save_path
+        self.writer = writer
+        self.n_eval_episodes = n_eval_episodes
+        self.keep_best = keep_best
+        self.log_path = log_path
+        self.max_pending = max_pending
+        self.seed = seed
+        self.deterministic = deterministic
+        self.observation_mode = observation_mode
+        self.best_mean_score = -np.inf
+        self._best = []  # (mean score, timesteps, path), beste zuerst
+        self._pending = []  # (timesteps, snapshot, future)
+        self._pool = None
+        self._timesteps, self._results, self._lengths = [], [], []
+
+    def _init_callback(self):
+        self._pool = ProcessPoolExecutor(max_workers=1)
+
+    def _on_step(self) -> bool:
+        self._collect(wait=False)
+        if self.n_calls % self.eval_freq == 0:
+            if len(self._pending) >= self.max_pending:
+                if self.verbose:
+                    print(f"Evaluation at {self.num_timesteps} steps skipped, {len(self._pending)} still running")
+            else:
+                snapshot = snapshot_model(self.model)
+                n_parallel = min(self.n_eval_episodes, 1024)
+                if self.observation_mode == "features":
+                    future = self._pool.submit(evaluate_policy_arrays, policy_arrays(self.model.policy),
+                                               self.n_eval_episodes, n_parallel, self.seed, self.deterministic)
+                else:
+                    future = self._pool.submit(evaluate_model_bytes, snapshot_bytes(snapshot), self.n_eval_episodes,
+                                               n_parallel, self.seed, self.deterministic, self.observation_mode)
+                self._pending.append((self.num_timesteps, snapshot, future))
+        return True
+
+    def _on_training_end(self):
+        self._collect(wait=True)
+        self._pool.shutdown()
+
+    def _collect(self, wait):
+        """Process finished evaluations in the order they were started."""
+        while self._pending and (wait or self._pending[0][2].done()):
+            timesteps, snapshot, future = self._pending.pop(0)
+            scores, lengths = future.result()
+            self._report(timesteps, snapshot, scores, lengths)
+
+    def _report(self, timesteps, snapshot, scores, lengths):
+        summary = summarize_scores(scores, lengths)
+        self.logger.record("eval/mean_score", summary["mean_score"])
+        self.logger.record("eval/p95_score", summary["p95_score"])
+        self.logger.record("eval/mean_ep_length", summary["mean_length"])
+        self.logger.record("eval/snapshot_timesteps", timesteps)
+        if self.verbose:
+            print(f"Eval at {timesteps} steps: mean score {summary['mean_score']:.2f} "
+                  f"over {summary['episodes']} episodes")
+
+        if self.log_path is not None:
+            self._timesteps.append(timesteps)
+            self._results.append(scores)
+            self._lengths.append(lengths)
+            os.makedirs(self.log_path, exist_ok=True)
+            np.savez(os.path.join(self.log_path, "evaluations.npz"), timesteps=self._timesteps,
+                     results=self._results, ep_lengths=self._lengths)
+
+        mean_score = summary["mean_score"]
+        if self.keep_best > 0 and (len(self._best) < self.keep_best or mean_score > self._best[-1][0]):
+            path = os.path.join(self.best_model_save_path, f"model_{timesteps}_steps.zip")
+            self._best.append((mean_score, timesteps, path))
+            self._best.sort(key=lambda entry: -entry[0])
+            dropped = self._best[self.keep_best:]
+            del self._best[self.keep_best:]
+            self.writer.submit(write_snapshot, snapshot, path)
+            for _, _, old in dropped:
+                self.writer.submit(_remove_file, old)
+        if mean_score > self.best_mean_score:
+            self.best_mean_score = mean_score
+            if self.verbose:
+                print("New best mean score!")
+            self.writer.submit(write_snapshot, snapshot, os.path.join(self.best_model_save_path, "best_model.zip"))
+
+
+def _remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,376 @@
+import os
+import platform
+import sys
+import time
+import timeit
+from datetime import datetime
+import numpy as np
+from snake_env import DIRECTIONS, SnakeEnv, batch_observations
+
+SUITES = ["env", "observation", "predict", "ppo", "server"]
+# ppo_configs.toml liegt neben diesem Modul
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ppo_configs.toml")
+
+
+def reference_observation(env):
+    """
+    Original closure-based observation of SnakeEnv, kept as reference for the parity check.
+
+    Args:
+        env (SnakeEnv): The environment.
+
+    Returns:
+        np.ndarray: The 9-dimensional observation.
+    """
+    head = env.snake[0]
+
+    def is_danger(cell):
+        x, y = cell
+        if x < 0 or x >= env.cols or y < 0 or y >= env.rows:
+            return 1.0
+        if cell in env.snake:
+            return 1.0
+        return 0.0
+
+    danger_ahead = is_danger((head[0] + env.direction[0], head[1] + env.direction[1]))
+    left_dir = (-env.direction[1], env.direction[0])
+    danger_left = is_danger((head[0] + left_dir[0], head[1] + left_dir[1]))
+    right_dir = (env.direction[1], -env.direction[0])
+    danger_right = is_danger((head[0] + right_dir[0], head[1] + right_dir[1]))
+
+    food_dx = (env.food[0] - head[0]) / env.cols
+    food_dy = (env.food[1] - head[1]) / env.rows
+
+    if env.direction == (1, 0):
+        dir_onehot = [1, 0, 0, 0]
+    elif env.direction == (0, 1):
+        dir_onehot = [0, 1, 0, 0]
+    elif env.direction == (-1, 0):
+        dir_onehot = [0, 0, 1, 0]
+    elif env.direction == (0, -1):
+        dir_onehot = [0, 0, 0, 1]
+    else:
+        dir_onehot = [0, 0, 0, 0]
+
+    return np.array([danger_ahead, danger_left, danger_right, food_dx, food_dy] + dir_onehot, dtype=np.float32)
+
+
+def collect_states(n_states, seed=0):
+    """
+    Play a food-seeking random policy and snapshot the env states it visits.
+
+    Returns:
+        list: Tuples (head, direction index, food, wall-padded occupancy grid, env observation).
+    """
+    from snake_env import DIRECTION_INDEX
+
+    rng = np.random.default_rng(seed)
+    env = SnakeEnv()
+    env.reset(seed=seed)
+    states = []
+    while len(states) < n_states:
+        head = env.snake[0]
+        if rng.random() < 0.8:
+            dx, dy = env.food[0] - head[0], env.food[1] - head[1]
+            action = 1 if dx > 0 else 3 if dx < 0 else 2 if dy > 0 else 0
+        else:
+            action = int(rng.integers(4))
+        obs, reward, terminated, truncated, info = env.step(action)
+        if not np.array_equal(obs.view(np.uint32), reference_observation(env).view(np.uint32)):
+            raise AssertionError(f"Observation differs from the reference after {len(states)} steps")
+        states.append((env.snake[0], DIRECTION_INDEX[env.direction], env.food, env._blocked.copy(), obs))
+        if terminated:
+            env.reset()
+    return states
+
+
+def check_observation_parity(n_states=20_000, seed=0):
+    """
+    Check that SnakeEnv._get_observation and batch_observations are bit-identical to the reference.
+
+    Raises:
+        AssertionError: If any observation differs.
+    """
+    states = collect_states(n_states, seed)
+    heads = np.array([s[0] for s in states])
+    directions = np.array([s[1] for s in states])
+    food = np.array([s[2] for s in states])
+    blocked = np.stack([s[3] for s in states])
+    expected = np.stack([s[4] for s in states])
+    batch = batch_observations(heads, directions, food, blocked)
+    if not np.array_equal(batch.view(np.uint32), expected.view(np.uint32)):
+        raise AssertionError("batch_observations differs from SnakeEnv._get_observation")
+
+
+def bench_observation(number=20_000, batch_size=1024):
+    """
+    Time the reference observation, the table-based one (with and without copy) and the batched kernel.
+
+    Returns:
+        dict: Microseconds per observation for each variant.
+    """
+    env = SnakeEnv()
+    env.reset(seed=0)
+    states = collect_states(batch_size)
+    heads = np.array([s[0] for s in states])
+    directions = np.array([s[1] for s in states])
+    food = np.array([s[2] for s in states])
+    blocked = np.stack([s[3] for s in states])
+    out = np.empty((batch_size, 9), dtype=np.float32)
+
+    results = {}
+    results["reference"] = timeit.timeit(lambda: reference_observation(env), number=number) / number * 1e6
+    env.copy_observation = True
+    results["table"] = timeit.timeit(env._get_observation, number=number) / number * 1e6
+    env.copy_observation = False
+    results["table_no_copy"] = timeit.timeit(env._get_observation, number=number) / number * 1e6
+    batch_runs = max(1, number // batch_size)
+    results["batch"] = timeit.timeit(lambda: batch_observations(heads, directions, food, blocked, out=out),
+                                     number=batch_runs) / (batch_runs * batch_size) * 1e6
+    return results
+
+
+def hamiltonian_action(x, y, cols, rows):
+    """
+    Action that follows a Hamiltonian cycle over the board (rows must be even).
+
+    Rows are traversed in a serpentine from x = 1 to cols - 1 and column 0 leads back to the
+    top, so a snake following the cycle never dies and its length stays under control.
+    """
+    if x == 0:
+        return 1 if y == 0 else 0
+    if y % 2 == 0:
+        return 1 if x < cols - 1 else 2
+    if x > 1 or y == rows - 1:
+        return 3
+    return 2
+
+
+def hamiltonian_cells(cols, rows):
+    """Cells of the Hamiltonian cycle of ``hamiltonian_action`` in order, starting at (0, 0)."""
+    cells = [(0, 0)]
+    while len(cells) < cols * rows:
+        x, y = cells[-1]
+        dx, dy = DIRECTIONS[hamiltonian_action(x, y, cols, rows)]
+        cells.append((x + dx, y + dy))
+    return cells
+
+
+def env_with_length(length, seed=0):
+    """
+    Create a SnakeEnv whose snake has the given length and lies on the Hamiltonian cycle.
+
+    Returns:
+        SnakeEnv: The prepared environment.
+    """
+    env = SnakeEnv()
+    env.reset(seed=seed)
+    cells = hamiltonian_cells(env.cols, env.rows)[:length]
+    env._release(env.snake.pop())
+    for cell in cells:
+        env.snake.appendleft(cell)
+        env._occupy(cell)
+    if length > 1:
+        env.direction = (cells[-1][0] - cells[-2][0], cells[-1][1] - cells[-2][1])
+    else:
+        env.direction = DIRECTIONS[hamiltonian_action(*cells[0], env.cols, env.rows)]
+    env._place_food()
+    return env
+
+
+def bench_env(lengths=(1, 50, 200, 350), n_steps=20_000, tolerance=5):
+    """
+    Measure SnakeEnv.step throughput for several snake lengths, plus reset and get_grid cost.
+
+    The snake eats while it follows the Hamiltonian cycle, so the environment is rebuilt with
+    ``env_with_length`` (outside the timed section) whenever the snake has grown by more than
+    ``tolerance`` segments or the game is over. Only steps of running games are timed.
+
+    Returns:
+        dict: Metrics.
+    """
+    metrics = {}
+    for length in lengths:
+        env = env_with_length(length)
+        max_length = length + tolerance
+        elapsed, steps, rebuilds = 0.0, 0, 0
+        while steps < n_steps:
+            if env.done or len(env.snake) > max_length:
+                rebuilds += 1
+                env = env_with_length(length, seed=rebuilds)
+            start = time.perf_counter()
+            while steps < n_steps and not env.done and len(env.snake) <= max_length:
+                x, y = env.snake[0]
+                env.step(hamiltonian_action(x, y, env.cols, env.rows))
+                steps += 1
+            elapsed += time.perf_counter() - start
+        metrics[f"env.step_per_sec.len{length}"] = _metric(n_steps / elapsed, "steps/s", True)
+        metrics[f"env.get_grid_us.len{length}"] = _metric(_usec(env.get_grid, n_steps // 10), "us", False)
+    env = SnakeEnv()
+    metrics["env.reset_us"] = _metric(_usec(env.reset, n_steps), "us", False)
+    return metrics
+
+
+def _metric(value, unit, higher_is_better):
+    return {"value": float(value), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def _usec(fn, number):
+    """Mean wall time of ``fn()`` in microseconds."""
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def bench_observation_suite(number=20_000):
+    """Observation parity check plus the timings of ``bench_observation`` as metrics."""
+    check_observation_parity()
+    return {f"observation.{name}_us": _metric(usec, "us", False)
+            for name, usec in bench_observation(number).items()}
+
+
+def bench_predict(models_dir="./models", model_name="ppo_snake_config2", number=2000, batch_size=1024):
+    """
+    Measure single and batched ``predict`` latency of the PPO zip and the exported NumPy policy.
+
+    Returns:
+        dict: Metrics (missing model files are skipped).
+    """
+    from numpy_policy import load_model
+
+    obs = np.stack([s[4] for s in collect_states(batch_size)])
+    metrics = {}
+    for runtime, suffix in (("sb3", ".zip"), ("numpy", ".npz")):
+        path = os.path.join(models_dir, model_name + suffix)
+        if not os.path.exists(path):
+            continue
+        model = load_model(path)
+        metrics[f"predict.{runtime}.single_us"] = _metric(_usec(lambda: model.predict(obs[0]), number), "us", False)
+        batch_runs = max(1, number // 20)
+        metrics[f"predict.{runtime}.batch{batch_size}_us"] = _metric(
+            _usec(lambda: model.predict(obs), batch_runs), "us", False)
+    return metrics
+
+
+def bench_ppo(config_path=CONFIG_PATH, rollouts=2):
+    """
+    Measure end-to-end PPO training speed (rollout collection + update) for every config.
+
+    Each config trains for ``rollouts`` rollouts of its ``n_steps`` on a single SnakeEnv.
+
+    Returns:
+        dict: Metrics in timesteps per second.
+    """
+    import toml
+    from stable_baselines3 import PPO
+
+    with open(config_path, "r") as f:
+        configs = toml.load(f)["configs"]
+    metrics = {}
+    for config in configs:
+        ppo_config = {k: v for k, v in config.items() if k != "name"}
+        model = PPO("MlpPolicy", SnakeEnv(), device="cpu", seed=0, **ppo_config)
+        total_timesteps = model.n_steps * rollouts
+        start = time.perf_counter()
+        model.learn(total_timesteps=total_timesteps)
+        metrics[f"ppo.{config['name']}.steps_per_sec"] = _metric(
+            total_timesteps / (time.perf_counter() - start), "steps/s", True)
+    return metrics
+
+
+def bench_server(models_dir="./models", model_name="ppo_snake_config2", n_ticks=5000):
+    """
+    Measure the per-tick work of a web viewer game (predict, step, encode delta) without the sleep.
+
+    Returns:
+        dict: Mean and p99 tick latency for the PPO zip and the exported NumPy policy.
+    """
+    from game_sessions import encode_delta
+    from numpy_policy import load_model
+
+    metrics = {}
+    for runtime, suffix in (("sb3", ".zip"), ("numpy", ".npz")):
+        path = os.path.join(models_dir, model_name + suffix)
+        if not os.path.exists(path):
+            continue
+        model = load_model(path)
+        env = SnakeEnv()
+        obs, _ = env.reset(seed=0)
+        ticks = np.empty(n_ticks)
+        for i in range(n_ticks):
+            start = time.perf_counter()
+            action, _states = model.predict(obs)
+            prev_head, prev_tail, prev_food = env.snake[0], env.snake[-1], env.food
+            obs, reward, terminated, truncated, info = env.step(action)
+            encode_delta(env, prev_head, prev_tail, prev_food)
+            ticks[i] = time.perf_counter() - start
+            if terminated or truncated:
+                obs, _ = env.reset()
+        metrics[f"server.{runtime}.tick_mean_us"] = _metric(ticks.mean() * 1e6, "us", False)
+        metrics[f"server.{runtime}.tick_p99_us"] = _metric(np.percentile(ticks, 99) * 1e6, "us", False)
+    return metrics
+
+
+def run_benchmarks(suites, quick=False):
+    """
+    Run the selected benchmark suites.
+
+    Args:
+        suites (list): Names from SUITES.
+        quick (bool, optional): Use fewer repetitions (less accurate, for smoke runs).
+
+    Returns:
+        dict: ``{"meta": ..., "metrics": {name: {"value", "unit", "higher_is_better"}}}``.
+    """
+    scale = 10 if quick else 1
+    metrics = {}
+    for suite in suites:
+        print(f"Running benchmark suite '{suite}' ...")
+        if suite == "env":
+            metrics.update(bench_env(n_steps=20_000 // scale))
+        elif suite == "observation":
+            metrics.update(bench_observation_suite(number=20_000 // scale))
+        elif suite == "predict":
+            metrics.update(bench_predict(number=2000 // scale))
+        elif suite == "ppo":
+            metrics.update(bench_ppo(rollouts=1 if quick else 2))
+        elif suite == "server":
+            metrics.update(bench_server(n_ticks=5000 // scale))
+        else:
+            raise ValueError(f"Unbekannte Benchmark-Suite '{suite}', erlaubt sind {SUITES}")
+    meta = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+    }
+    return {"meta": meta, "metrics": metrics}
+
+
+def compare_to_baseline(results, baseline, threshold=0.2):
+    """
+    Compare benchmark results with a saved baseline.
+
+    A metric regresses if it is worse than the baseline by more than ``threshold`` (relative),
+    taking into account whether higher or lower values are better. Metrics missing in either
+    file are ignored.
+
+    Returns:
+        list: (name, baseline value, current value, relative change) of the regressed metrics.
+    """
+    regressions = []
+    for name, current in results["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None or base["value"] == 0:
+            continue
+        change = (current["value"] - base["value"]) / base["value"]
+        worse = -change if current["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append((name, base["value"], current["value"], change))
+    return regressions
+
+
+if __name__ == "__main__":
+    # Die Argumente sind in snake.py definiert (python src/snake.py bench --help)
+    from snake import main
+    main(["bench", *sys.argv[1:]])
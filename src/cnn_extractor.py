@@ -0,0 +1,36 @@
+import torch
+import torch.nn as nn
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+
+
+class SnakeCNN(BaseFeaturesExtractor):
+    """
+    Small CNN feature extractor for the grid observation of SnakeEnv (observation_mode="grid").
+
+    The NatureCNN of stable-baselines3 needs images of at least 36x36 pixels; this one uses 3x3
+    kernels and works for boards from 4x4 up. Input is the (channels, rows, cols) uint8 board,
+    which the policy scales to [0, 1] before it reaches the extractor.
+
+    Args:
+        observation_space (spaces.Box): The grid observation space.
+        features_dim (int, optional): Size of the output feature vector.
+    """
+    def __init__(self, observation_space, features_dim=256):
+        super().__init__(observation_space, features_dim)
+        n_channels = observation_space.shape[0]
+        self.cnn = nn.Sequential(
+            nn.Conv2d(n_channels, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.Conv2d(32, 64, kernel_size=3, stride=2, padding=1),
+            nn.ReLU(),
+            nn.Conv2d(64, 64, kernel_size=3, stride=2, padding=1),
+            nn.ReLU(),
+            nn.Flatten(),
+        )
+        # Grösse nach dem Flatten mit einem Probe-Durchlauf bestimmen
+        with torch.no_grad():
+            n_flatten = self.cnn(torch.zeros((1,) + observation_space.shape)).shape[1]
+        self.linear = nn.Sequential(nn.Linear(n_flatten, features_dim), nn.ReLU())
+
+    def forward(self, observations):
+        return self.linear(self.cnn(observations))
@@ -0,0 +1,263 @@
+import time
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+from evaluation import play_episodes
+from numpy_policy import SnakePolicy, policy_arrays
+from vec_snake_env import VecSnakeEnv
+
+
+class BucketedVecEnv(VecEnv):
+    """
+    VecEnv over boards of different sizes: the games of one size form a bucket that is stepped
+    as one VecSnakeEnv, so every step costs one batched engine call per size, not per game.
+
+    The 9-feature observation is independent of the board size (relative food position and
+    neighbouring cells), so one MlpPolicy can play all buckets. ``set_buckets`` changes the
+    board sizes while keeping the number of games.
+
+    Args:
+        buckets (list): ((cols, rows), n_envs) per bucket; games are ordered bucket by bucket.
+        seed (int, optional): Base seed; the bucket starting at game i is seeded with seed + i.
+    """
+    render_mode = None
+
+    def __init__(self, buckets, seed=None):
+        self._bucket_envs = []
+        self._bucket_seed = seed
+        num_envs = sum(n for _, n in buckets)
+        probe = VecSnakeEnv(num_envs=1)
+        super().__init__(num_envs, probe.observation_space, probe.action_space)
+        self.set_buckets(buckets)
+
+    @property
+    def buckets(self):
+        """((cols, rows), n_envs) of every bucket."""
+        return [((env.cols, env.rows), env.num_envs) for env in self._bucket_envs]
+
+    def set_buckets(self, buckets):
+        """
+        Replace the buckets; all games restart. The total number of games must stay the same.
+
+        Args:
+            buckets (list): ((cols, rows), n_envs) per bucket.
+        """
+        if sum(n for _, n in buckets) != self.num_envs:
+            raise ValueError(f"Die Buckets müssen zusammen {self.num_envs} Spiele enthalten")
+        self._bucket_envs = []
+        self._slices = []
+        start = 0
+        for (cols, rows), n in buckets:
+            if n == 0:
+                continue
+            seed = None if self._bucket_seed is None else self._bucket_seed + start
+            self._bucket_envs.append(VecSnakeEnv(num_envs=n, seed=seed, cols=cols, rows=rows))
+            self._slices.append(slice(start, start + n))
+            start += n
+
+    def reset(self):
+        if any(seed is not None for seed in self._seeds):
+            self._bucket_seed = self._seeds[0]
+            for env, part in zip(self._bucket_envs, self._slices):
+                env.seed(self._seeds[part.start])
+        self._reset_seeds()
+        self._reset_options()
+        return np.concatenate([env.reset() for env in self._bucket_envs])
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        results = []
+        for env, part in zip(self._bucket_envs, self._slices):
+            env.step_async(self._actions[part])
+            results.append(env.step_wait())
+        obs = np.concatenate([r[0] for r in results])
+        rewards = np.concatenate([r[1] for r in results])
+        dones = np.concatenate([r[2] for r in results])
+        infos = [info for r in results for info in r[3]]
+        return obs, rewards, dones, infos
+
+    def close(self):
+        for env in self._bucket_envs:
+            env.close()
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def _whole_batch(self, indices, call):
+        """
+        Indices of a call that acts on the batch object and therefore on all games at once.
+
+        Raises:
+            ValueError: If ``indices`` names only some of the games.
+        """
+        indices = list(self._get_indices(indices))
+        if indices and sorted(set(indices)) != list(range(self.num_envs)):
+            raise ValueError(f"BucketedVecEnv.{call} wirkt auf alle Spiele gemeinsam, nicht nur auf die Indizes {indices}")
+        return indices
+
+    def set_attr(self, attr_name, value, indices=None):
+        if self._whole_batch(indices, "set_attr"):
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Wie get_attr: alle Spiele liegen in einem Objekt, die Methode wird einmal darauf aufgerufen
+        # und ihr Resultat für jeden angefragten Index zurückgegeben
+        indices = self._whole_batch(indices, "env_method")
+        if not indices:
+            return []
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in indices]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+
+class CurriculumScheduler:
+    """
+    Board sizes of a curriculum and the rule for moving on.
+
+    Training starts on the first (smallest) board. After every evaluation on the current board
+    ``update`` checks for a plateau: if the mean score has not improved by at least ``min_delta``
+    (relative) for ``patience`` evaluations, the next board is used. From the second stage on,
+    ``review_fraction`` of the games keep playing the earlier boards, so the policy does not
+    forget them.
+
+    Args:
+        sizes (list): (cols, rows) per stage, small to large.
+        patience (int, optional): Evaluations without improvement before moving on.
+        min_delta (float, optional): Relative improvement of the best mean score that counts.
+        review_fraction (float, optional): Share of the games on earlier boards.
+    """
+    def __init__(self, sizes, patience=3, min_delta=0.05, review_fraction=0.25):
+        self.sizes = list(sizes)
+        self.patience = patience
+        self.min_delta = min_delta
+        self.review_fraction = review_fraction
+        self.stage = 0
+        self.best = -np.inf
+        self.stale = 0
+
+    @property
+    def size(self):
+        """(cols, rows) of the current stage."""
+        return self.sizes[self.stage]
+
+    @property
+    def final(self):
+        return self.stage == len(self.sizes) - 1
+
+    def buckets(self, n_envs):
+        """
+        Split ``n_envs`` games over the boards of the current stage.
+
+        Returns:
+            list: ((cols, rows), n_envs) per board, current board first.
+        """
+        earlier = self.sizes[:self.stage]
+        n_review = int(round(self.review_fraction * n_envs)) if earlier else 0
+        n_review = min(n_review, n_envs - 1)
+        buckets = [(self.size, n_envs - n_review)]
+        for i, size in enumerate(earlier):
+            # Wiederholungsspiele gleichmässig auf die früheren Felder verteilen
+            buckets.append((size, n_review // len(earlier) + (1 if i < n_review % len(earlier) else 0)))
+        return [(size, n) for size, n in buckets if n > 0]
+
+    def update(self, mean_score):
+        """
+        Record the evaluation score of the current stage.
+
+        Returns:
+            bool: True if the curriculum moved to the next stage.
+        """
+        threshold = self.best + self.min_delta * abs(self.best) if np.isfinite(self.best) else -np.inf
+        if mean_score > threshold:
+            self.best = max(self.best, mean_score)
+            self.stale = 0
+            return False
+        self.stale += 1
+        if self.stale < self.patience or self.final:
+            return False
+        self.stage += 1
+        self.best = -np.inf
+        self.stale = 0
+        return True
+
+
+def unwrap_vec_env(env):
+    """Return the innermost VecEnv below all VecEnvWrappers (VecMonitor, InstrumentedVecEnv, ...)."""
+    while isinstance(env, VecEnvWrapper):
+        env = env.venv
+    return env
+
+
+class CurriculumCallback(BaseCallback):
+    """
+    Drives a CurriculumScheduler during ``model.learn`` on a BucketedVecEnv.
+
+    Every ``eval_freq`` timesteps (checked at the end of a rollout) the policy plays
+    ``eval_episodes`` games on the current board with the NumPy runtime, always on the same seeds.
+    On a plateau the buckets of the training env are switched to the next stage; the games restart
+    and the next rollout starts from the new boards. Logs ``curriculum/stage``,
+    ``curriculum/board_cols``, ``curriculum/board_rows`` and ``curriculum/eval_mean_score``.
+
+    With ``target_score``, training stops as soon as the evaluation on the last board reaches it,
+    and the wall time until then is printed and logged as ``curriculum/time_to_target_s``.
+
+    Args:
+        scheduler (CurriculumScheduler): The curriculum.
+        eval_freq (int, optional): Timesteps between two evaluations.
+        eval_episodes (int, optional): Games per evaluation.
+        seed (int, optional): Seed of the evaluation games.
+        target_score (float, optional): Mean score on the last board at which training stops.
+    """
+    def __init__(self, scheduler, eval_freq=10_000, eval_episodes=200, seed=0, target_score=None, verbose=1):
+        super().__init__(verbose)
+        self.scheduler = scheduler
+        self.eval_freq = eval_freq
+        self.eval_episodes = eval_episodes
+        self.seed = seed
+        self.target_score = target_score
+        self._last_eval = 0
+        self._continue = True
+        self._start_time = None
+
+    def _on_training_start(self):
+        self._start_time = time.perf_counter()
+
+    def _on_step(self) -> bool:
+        return self._continue
+
+    def _on_rollout_end(self):
+        if self.num_timesteps - self._last_eval < self.eval_freq:
+            return
+        self._last_eval = self.num_timesteps
+        cols, rows = self.scheduler.size
+        policy = SnakePolicy.from_arrays(policy_arrays(self.model.policy))
+        scores, _ = play_episodes(policy, self.eval_episodes, seed=self.seed, cols=cols, rows=rows)
+        mean_score = float(scores.mean())
+        self.logger.record("curriculum/stage", self.scheduler.stage)
+        self.logger.record("curriculum/board_cols", cols)
+        self.logger.record("curriculum/board_rows", rows)
+        self.logger.record("curriculum/eval_mean_score", mean_score)
+
+        if self.target_score is not None and self.scheduler.final and mean_score >= self.target_score:
+            elapsed = time.perf_counter() - self._start_time
+            self.logger.record("curriculum/time_to_target_s", elapsed)
+            if self.verbose:
+                print(f"Curriculum: target score {self.target_score} on {cols}x{rows} reached after "
+                      f"{self.num_timesteps} timesteps ({elapsed:.0f} s)")
+            self._continue = False
+            return
+        if self.scheduler.update(mean_score):
+            env = unwrap_vec_env(self.training_env)
+            env.set_buckets(self.scheduler.buckets(env.num_envs))
+            # Neue Spielfelder: die nächste Rollout beginnt mit frischen Spielen
+            self.model._last_obs = self.training_env.reset()
+            self.model._last_episode_starts = np.ones(env.num_envs, dtype=bool)
+            if self.verbose:
+                new_cols, new_rows = self.scheduler.size
+                print(f"Curriculum: plateau at {mean_score:.2f} on {cols}x{rows}, moving to {new_cols}x{new_rows} "
+                      f"after {self.num_timesteps} timesteps")
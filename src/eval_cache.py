@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from evaluation import evaluate_shard, summarize_scores
+
+DEFAULT_CACHE_PATH = "eval_results.sqlite"
+# Episoden pro Block: Block b wird mit seed + b gespielt und einzeln gespeichert
+DEFAULT_BLOCK_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    model_hash TEXT NOT NULL,
+    env_hash TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    block_size INTEGER NOT NULL,
+    deterministic INTEGER NOT NULL,
+    block INTEGER NOT NULL,
+    scores BLOB NOT NULL,
+    lengths BLOB NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (model_hash, env_hash, seed, block_size, deterministic, block)
+);
+CREATE TABLE IF NOT EXISTS models (
+    path TEXT NOT NULL,
+    model_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    seen REAL NOT NULL,
+    PRIMARY KEY (path, model_hash)
+);
+CREATE TABLE IF NOT EXISTS envs (
+    env_hash TEXT PRIMARY KEY,
+    params TEXT NOT NULL
+);
+"""
+
+
+def model_file(path):
+    """Resolve a model path as used by the registry (PPO zips without suffix) to its file."""
+    return path if os.path.isfile(path) else path + ".zip"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, as hex string."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def env_params(cols=20, rows=20):
+    """
+    Parameters of the evaluation environment that the results depend on: board size and rewards.
+
+    Returns:
+        dict: The parameters, read from a VecSnakeEnv (the engine of ``play_episodes``).
+    """
+    from vec_snake_env import VecSnakeEnv
+
+    env = VecSnakeEnv(num_envs=1, cols=cols, rows=rows)
+    return {
+        "engine": "VecSnakeEnv",
+        "cols": env.cols,
+        "rows": env.rows,
+        "reward_for_food": env.reward_for_food,
+        "penalty_for_small_steps": env.penalty_for_small_steps,
+        "penalty_for_hit_wall": env.penalty_for_hit_wall,
+        "penalty_for_hit_body": env.penalty_for_hit_body,
+        "observation_mode": "features",
+    }
+
+
+def _natural_key(text):
+    """Sort key that orders embedded numbers numerically (model_5000_steps before model_10000_steps)."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+
+class EvalCache:
+    """
+    Content-addressed store of evaluation results in a SQLite file.
+
+    A result is keyed by the SHA-256 of the model file, a hash of the environment parameters
+    (``env_params``), the base seed, the block size and ``deterministic``. The episodes are played
+    in blocks of ``block_size``; block b is played with seed ``seed + b`` and stored with its
+    per-episode scores and lengths. A block therefore never changes once stored: a later run
+    with more episodes only plays the missing blocks, and a model file is only evaluated again
+    when its content changes. Requested episode counts are rounded up to whole blocks.
+
+    Args:
+        path (str, optional): The SQLite file, created if missing.
+        block_size (int, optional): Episodes per block.
+        cols (int, optional): Board width of the evaluation.
+        rows (int, optional): Board height of the evaluation.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, block_size=DEFAULT_BLOCK_SIZE, cols=20, rows=20):
+        self.path = path
+        self.block_size = block_size
+        self.cols = cols
+        self.rows = rows
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+        params = env_params(cols, rows)
+        text = json.dumps(params, sort_keys=True)
+        self.env_hash = hashlib.sha256(text.encode()).hexdigest()
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO envs VALUES (?, ?)", (self.env_hash, text))
+
+    def close(self):
+        self._conn.close()
+
+    def _key(self, model_hash, seed, deterministic):
+        return (model_hash, self.env_hash, seed, self.block_size, int(deterministic))
+
+    def _stored_blocks(self, model_hash, seed, deterministic):
+        rows = self._conn.execute(
+            "SELECT block FROM blocks WHERE model_hash = ? AND env_hash = ? AND seed = ? AND block_size = ? "
+            "AND deterministic = ?", self._key(model_hash, seed, deterministic))
+        return {row[0] for row in rows}
+
+    def _load(self, model_hash, seed, deterministic, blocks=None):
+        """Scores and lengths of the stored blocks (all or the given ones), in block order."""
+        rows = self._conn.execute(
+            "SELECT block, scores, lengths FROM blocks WHERE model_hash = ? AND env_hash = ? AND seed = ? "
+            "AND block_size = ? AND deterministic = ? ORDER BY block", self._key(model_hash, seed, deterministic))
+        rows = [row for row in rows if blocks is None or row[0] in blocks]
+        scores = np.concatenate([np.frombuffer(row[1], dtype=np.int32) for row in rows]) if rows else np.zeros(0, np.int32)
+        lengths = np.concatenate([np.frombuffer(row[2], dtype=np.int32) for row in rows]) if rows else np.zeros(0, np.int32)
+        return scores, lengths
+
+    def _store(self, model_hash, seed, deterministic, block, scores, lengths):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (*self._key(model_hash, seed, deterministic), block,
+                                np.asarray(scores, dtype=np.int32).tobytes(),
+                                np.asarray(lengths, dtype=np.int32).tobytes(), time.time()))
+
+    def _register(self, path):
+        """Hash a model file and remember under which path it was seen."""
+        filename = model_file(path)
+        stat = os.stat(filename)
+        model_hash = hash_file(filename)
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?)",
+                               (os.path.normpath(path), model_hash, stat.st_size, stat.st_mtime, time.time()))
+        return model_hash
+
+    def evaluate(self, model_paths, num_episodes, n_workers=None, seed=0, deterministic=False, verbose=1):
+        """
+        Evaluate models, playing only the blocks that are not stored yet.
+
+        The missing blocks of all models run on one process pool; every finished block is stored
+        immediately, so an interrupted run keeps its progress.
+
+        Args:
+            model_paths (list): Model paths (PPO zips with or without suffix, or .npz files).
+            num_episodes (int): Episodes per model, rounded up to whole blocks.
+            n_workers (int, optional): Worker processes. Defaults to the CPU count.
+            seed (int, optional): Base seed.
+            deterministic (bool, optional): Use the greedy action instead of sampling.
+            verbose (int, optional): Print how many blocks were cached and played per model.
+
+        Returns:
+            dict: Like ``evaluation.evaluate_models``: per path ``scores``, ``lengths``, the
+                  ``summarize_scores`` statistics and ``model_hash``, or ``{"error": message}``.
+        """
+        n_blocks = max(1, -(-num_episodes // self.block_size))
+        n_parallel = min(self.block_size, 1024)
+        results, hashes, pending = {}, {}, {}
+        for path in model_paths:
+            try:
+                hashes[path] = self._register(path)
+            except OSError as e:
+                results[path] = {"error": str(e)}
+                continue
+            stored = self._stored_blocks(hashes[path], seed, deterministic)
+            pending[path] = [block for block in range(n_blocks) if block not in stored]
+            if verbose:
+                print(f"{path}: {n_blocks - len(pending[path])} of {n_blocks} blocks cached")
+
+        if any(pending.values()):
+            with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+                futures = {
+                    path: [(block, pool.submit(evaluate_shard, path, self.block_size, n_parallel, seed + block,
+                                               deterministic)) for block in blocks]
+                    for path, blocks in pending.items()
+                }
+                for path, block_futures in futures.items():
+                    try:
+                        for block, future in block_futures:
+                            scores, lengths = future.result()
+                            self._store(hashes[path], seed, deterministic, block, scores, lengths)
+                    except Exception as e:
+                        results[path] = {"error": str(e)}
+
+        for path, model_hash in hashes.items():
+            if path in results:
+                continue
+            scores, lengths = self._load(model_hash, seed, deterministic, blocks=set(range(n_blocks)))
+            results[path] = {"scores": scores, "lengths": lengths, "model_hash": model_hash,
+                             **summarize_scores(scores, lengths)}
+        return results
+
+    def report(self, seed=0, deterministic=False):
+        """
+        Compare all stored models from the database alone, without playing any episode.
+
+        Every path is reported with the model version it was last seen with and all stored blocks
+        of that version. ``changed`` marks paths whose file now has a different content (it will
+        be evaluated again), ``missing`` paths whose file is gone.
+
+        Args:
+            seed (int, optional): Base seed of the results to compare.
+            deterministic (bool, optional): Greedy or sampled results.
+
+        Returns:
+            list: One dict per path with ``path``, ``model_hash``, ``status`` and the
+                  ``summarize_scores`` statistics, in natural path order.
+        """
+        latest = self._conn.execute(
+            "SELECT path, model_hash, size, mtime FROM models AS m WHERE seen = "
+            "(SELECT MAX(seen) FROM models WHERE path = m.path)").fetchall()
+        rows = []
+        for path, model_hash, size, mtime in latest:
+            scores, lengths = self._load(model_hash, seed, deterministic)
+            if len(scores) == 0:
+                continue
+            filename = model_file(path)
+            if not os.path.isfile(filename):
+                status = "missing"
+            else:
+                stat = os.stat(filename)
+                unchanged = (stat.st_size, stat.st_mtime) == (size, mtime) or hash_file(filename) == model_hash
+                status = "" if unchanged else "changed"
+            rows.append({"path": path, "model_hash": model_hash, "status": status,
+                         **summarize_scores(scores, lengths)})
+        return sorted(rows, key=lambda row: _natural_key(row["path"]))
+
+
+def format_report(rows):
+    """Format the rows of ``EvalCache.report`` as a table; the best mean score is marked with *."""
+    if not rows:
+        return "No stored results."
+    best = max(range(len(rows)), key=lambda i: rows[i]["mean_score"])
+    width = max(len("model"), max(len(row["path"]) for row in rows))
+    lines = [f"  {'model':<{width}} {'hash':<12} {'episodes':>8} {'mean':>8} {'95% CI':>17} {'p95':>6} "
+             f"{'length':>8}  status"]
+    for i, row in enumerate(rows):
+        ci = f"{row['ci95_low']:.2f}-{row['ci95_high']:.2f}"
+        lines.append(f"{'*' if i == best else ' '} {row['path']:<{width}} {row['model_hash'][:12]} "
+                     f"{row['episodes']:>8} {row['mean_score']:>8.2f} {ci:>17} {row['p95_score']:>6.1f} "
+                     f"{row['mean_length']:>8.1f}  {row['status']}")
+    return "\n".join(lines)
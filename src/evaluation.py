@@ -0,0 +1,182 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from numpy_policy import SnakePolicy, load_model
+from snake_env import SnakeEnv
+from vec_snake_env import VecSnakeEnv
+
+
+def summarize_scores(scores, lengths):
+    """
+    Compute summary statistics over finished episodes.
+
+    Args:
+        scores (np.ndarray): Score of each episode.
+        lengths (np.ndarray): Number of steps of each episode.
+
+    Returns:
+        dict: mean/median/p95 score, 95% confidence interval of the mean score,
+              mean episode length and the number of episodes.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.float64)
+    n = len(scores)
+    mean = float(scores.mean())
+    # Normalapproximation für das 95%-Konfidenzintervall des Mittelwerts
+    half_width = 1.96 * float(scores.std(ddof=1)) / np.sqrt(n) if n > 1 else 0.0
+    return {
+        "episodes": n,
+        "mean_score": mean,
+        "median_score": float(np.median(scores)),
+        "p95_score": float(np.percentile(scores, 95)),
+        "ci95_low": mean - half_width,
+        "ci95_high": mean + half_width,
+        "mean_length": float(lengths.mean()),
+    }
+
+
+def play_episodes(model, num_episodes, n_parallel=1024, seed=0, deterministic=False, observation_mode="features",
+                  cols=20, rows=20):
+    """
+    Play ``num_episodes`` episodes in lockstep on a VecSnakeEnv.
+
+    All running games are stacked into one batch, so each tick needs a single
+    ``model.predict`` call. Exactly ``num_episodes`` episodes are started; slots whose
+    episode is finished and for which no episode is left stay idle until the end.
+
+    Args:
+        model (object): Model with an SB3-compatible ``predict(obs, deterministic)`` method.
+        num_episodes (int): Number of episodes to play.
+        n_parallel (int, optional): Number of games played at the same time.
+        seed (int, optional): Seed for food placement and, if supported, action sampling.
+        deterministic (bool, optional): Use the greedy action instead of sampling.
+        observation_mode (str, optional): Observation of the model. "features" runs on VecSnakeEnv,
+                                          "grid" on a DummyVecEnv of SnakeEnvs (env i seeded with seed + i).
+        cols (int, optional): Board width in cells.
+        rows (int, optional): Board height in cells.
+
+    Returns:
+        tuple: (scores, lengths) as np.ndarray of shape (num_episodes,).
+    """
+    n_parallel = min(n_parallel, num_episodes)
+    if hasattr(model, "set_random_seed"):
+        model.set_random_seed(seed)
+    if observation_mode == "features":
+        env = VecSnakeEnv(num_envs=n_parallel, seed=seed, cols=cols, rows=rows)
+    else:
+        from stable_baselines3.common.vec_env import DummyVecEnv
+        env = DummyVecEnv([partial(SnakeEnv, observation_mode=observation_mode, cols=cols, rows=rows)] * n_parallel)
+        env.seed(seed)
+    obs = env.reset()
+    active = np.ones(n_parallel, dtype=bool)
+    lengths = np.zeros(n_parallel, dtype=np.int64)
+    started = n_parallel
+    scores, episode_lengths = [], []
+    actions = np.zeros(n_parallel, dtype=np.int64)
+
+    while active.any():
+        actions[active], _states = model.predict(obs[active], deterministic=deterministic)
+        obs, rewards, dones, infos = env.step(actions)
+        lengths += 1
+        for i in np.flatnonzero(dones & active):
+            scores.append(infos[i]["score"])
+            episode_lengths.append(lengths[i])
+            lengths[i] = 0
+            # Die automatisch gestartete neue Episode nur behalten, solange noch welche übrig sind
+            if started < num_episodes:
+                started += 1
+            else:
+                active[i] = False
+
+    env.close()
+    return np.array(scores, dtype=np.int64), np.array(episode_lengths, dtype=np.int64)
+
+
+def evaluate_shard(model_path, num_episodes, n_parallel, seed, deterministic):
+    """Process-pool task: load a model (PPO zip or exported .npz) and play one shard of its episodes."""
+    if not model_path.endswith(".npz"):
+        import torch
+
+        # Parallelität kommt vom Prozess-Pool, nicht von torch-Threads
+        torch.set_num_threads(1)
+    model = load_model(model_path)
+    return play_episodes(model, num_episodes, n_parallel=n_parallel, seed=seed, deterministic=deterministic)
+
+
+def evaluate_policy_arrays(arrays, num_episodes, n_parallel=1024, seed=0, deterministic=False):
+    """
+    Process-pool task: play episodes with a policy given as ``policy_arrays`` (no torch needed).
+
+    Returns:
+        tuple: (scores, lengths) as returned by ``play_episodes``.
+    """
+    policy = SnakePolicy.from_arrays(arrays)
+    return play_episodes(policy, num_episodes, n_parallel=n_parallel, seed=seed, deterministic=deterministic)
+
+
+def evaluate_model_bytes(model_bytes, num_episodes, n_parallel=1024, seed=0, deterministic=False, observation_mode="features"):
+    """
+    Process-pool task: play episodes with a PPO model given as the bytes of its zip (any policy type).
+
+    Returns:
+        tuple: (scores, lengths) as returned by ``play_episodes``.
+    """
+    import torch
+    from stable_baselines3 import PPO
+
+    torch.set_num_threads(1)
+    model = PPO.load(io.BytesIO(model_bytes), device="cpu")
+    return play_episodes(model, num_episodes, n_parallel=n_parallel, seed=seed, deterministic=deterministic,
+                         observation_mode=observation_mode)
+
+
+def evaluate_models(model_paths, num_episodes, n_workers=None, n_shards=4, n_parallel=1024, seed=0, deterministic=False):
+    """
+    Evaluate several models in parallel on a process pool.
+
+    The episodes of every model are split into ``n_shards`` shards; shard k is played with
+    seed ``seed + k``. All models therefore see the same seeds, and the results do not depend on
+    the number of workers.
+
+    Args:
+        model_paths (list): Paths of the model zips.
+        num_episodes (int): Number of episodes per model.
+        n_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+        n_shards (int, optional): Number of shards per model.
+        n_parallel (int, optional): Games played in lockstep per shard.
+        seed (int, optional): Base seed.
+        deterministic (bool, optional): Use the greedy action instead of sampling.
+
+    Returns:
+        dict: Maps each model path to a dict with ``scores``, ``lengths`` and the ``summarize_scores`` statistics,
+              or to ``{"error": message}`` if the evaluation failed.
+    """
+    n_shards = max(1, min(n_shards, num_episodes))
+    shard_sizes = [len(part) for part in np.array_split(np.arange(num_episodes), n_shards)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+        futures = {
+            path: [pool.submit(evaluate_shard, path, size, n_parallel, seed + k, deterministic)
+                   for k, size in enumerate(shard_sizes)]
+            for path in model_paths
+        }
+        for path, shard_futures in futures.items():
+            try:
+                shards = [future.result() for future in shard_futures]
+            except Exception as e:
+                results[path] = {"error": str(e)}
+                continue
+            scores = np.concatenate([s for s, _ in shards])
+            lengths = np.concatenate([l for _, l in shards])
+            results[path] = {"scores": scores, "lengths": lengths, **summarize_scores(scores, lengths)}
+    return results
+
+
+def format_summary(summary):
+    """Format the statistics of ``summarize_scores`` as a single line."""
+    return (f"mean {summary['mean_score']:.3f} "
+            f"(95% CI {summary['ci95_low']:.3f}-{summary['ci95_high']:.3f}), "
+            f"median {summary['median_score']:.1f}, p95 {summary['p95_score']:.1f}, "
+            f"mean length {summary['mean_length']:.1f} over {summary['episodes']} episodes")
@@ -0,0 +1,425 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.format import open_memmap
+from snake_env import SnakeEnv
+
+# Ein Datensatz pro Schritt: Beobachtung vor dem Schritt, Aktion des Experten, Belohnung und Episodenende
+SAMPLE_DTYPE = np.dtype([("obs", np.float32, (9,)), ("action", np.uint8), ("reward", np.float32), ("done", np.bool_)])
+MANIFEST = "manifest.json"
+DATASET_VERSION = 1
+# Zellen, die nie frei werden (Wandrand), bei der zeitabhängigen Suche
+NEVER = 1 << 30
+
+
+class ExpertPolicy:
+    """
+    Heuristic Snake player: shortest safe path to the food, otherwise follow the tail.
+
+    The board is searched on the wall-padded occupancy grid of SnakeEnv. A body segment that is
+    ``j`` cells away from the tail is free again from step ``j + 2`` on (the tail moves before the
+    head can enter, except in the first step), so the breadth-first searches treat the body as
+    obstacles that disappear over time. A path to the food is only taken if, after eating, the
+    head of the virtual snake that followed it can still reach its own tail; a planned path is
+    followed until the food is eaten. Without a safe path the expert moves to the neighbour
+    from which the tail is reachable and farthest away (stalling while the body clears), or,
+    if no such neighbour exists, to the one with the largest reachable area. After as many moves
+    without food as the board has cells, the expert takes the shortest path even if it is unsafe,
+    so it cannot circle forever.
+
+    The greedy path gives actions that the 9 features of the policy can explain (food direction
+    and danger), which makes the trajectories suitable for behaviour cloning; a Hamiltonian cycle
+    would be safer but its moves do not depend on the features.
+
+    Like SearchPlanner it exposes ``plan(env)`` and ``last_stats``, so ``planner.play_planner_episodes``
+    can play it.
+    """
+    def __init__(self):
+        self._path = []
+        self._food = None
+        self._idle = 0
+        self.last_stats = {}
+
+    def reset(self):
+        """Forget the planned path (call after env.reset or set_state)."""
+        self._path = []
+        self._food = None
+        self._idle = 0
+
+    def _setup(self, env):
+        width = env.cols + 2
+        cells = (env.rows + 2) * width
+        if getattr(self, "_width", None) != width or self._cells != cells:
+            self._width = width
+            self._cells = cells
+            # Versatz pro Aktion: oben, rechts, unten, links
+            self._offsets = (-width, 1, width, -1)
+            self._walls = [0 if 0 < i % width < width - 1 and 0 < i // width < env.rows + 1 else NEVER
+                           for i in range(cells)]
+        self._n_cells = env.cols * env.rows
+
+    def _cell(self, pos):
+        return (pos[1] + 1) * self._width + pos[0] + 1
+
+    def _release(self, body):
+        """Step from which each cell can be entered, for the body ``body`` (head first)."""
+        release = list(self._walls)
+        n = len(body)
+        for i, cell in enumerate(body):
+            release[cell] = n - i + 1
+        return release
+
+    def _search(self, start, release, goal=None):
+        """
+        Breadth-first search from ``start`` with time-dependent obstacles.
+
+        Returns:
+            tuple: (dist, parent) lists; dist is -1 for unreached cells. Stops early at ``goal``.
+        """
+        dist = [-1] * self._cells
+        parent = [-1] * self._cells
+        dist[start] = 0
+        queue = [start]
+        offsets = self._offsets
+        for cell in queue:
+            t = dist[cell] + 1
+            for offset in offsets:
+                nxt = cell + offset
+                if dist[nxt] < 0 and release[nxt] <= t:
+                    dist[nxt] = t
+                    parent[nxt] = cell
+                    if nxt == goal:
+                        return dist, parent
+                    queue.append(nxt)
+        return dist, parent
+
+    def _tail_reachable(self, body):
+        """Distance from the head of ``body`` to its tail, or -1 if the tail cannot be reached."""
+        if len(body) < 3:
+            return 1
+        dist, _ = self._search(body[0], self._release(body), body[-1])
+        return dist[body[-1]]
+
+    def _food_path(self, body, food, safe=True):
+        """Cells from the head to the food (without the head) if the path is safe (or not ``safe``), else None."""
+        dist, parent = self._search(body[0], self._release(body), food)
+        if dist[food] < 0:
+            return None
+        path = [food]
+        while parent[path[-1]] != body[0]:
+            path.append(parent[path[-1]])
+        # Virtuelle Schlange nach dem Fressen: Pfad (Kopf zuerst) vor den alten Körper, eine Zelle länger
+        virtual = path + body[:len(body) + 1 - len(path)] if len(path) <= len(body) + 1 else path[:len(body) + 1]
+        if safe and self._tail_reachable(virtual) < 0 and len(virtual) < self._n_cells:
+            return None
+        path.reverse()
+        return path
+
+    def _fallback(self, body, food):
+        """Action to the neighbour that keeps the tail reachable and is farthest from it."""
+        release = self._release(body)
+        best_action, best_key = 0, None
+        for action, offset in enumerate(self._offsets):
+            cell = body[0] + offset
+            if release[cell] > 1:
+                continue
+            virtual = [cell] + (body if cell == food else body[:-1])
+            tail_dist = self._tail_reachable(virtual)
+            if tail_dist >= 0:
+                key = (1, tail_dist)
+            else:
+                dist, _ = self._search(cell, self._release(virtual))
+                key = (0, sum(d >= 0 for d in dist))
+            if best_key is None or key > best_key:
+                best_action, best_key = action, key
+        return best_action
+
+    def plan(self, env):
+        """
+        Choose the action for the current state of ``env``.
+
+        Args:
+            env (SnakeEnv): The game; it is not modified.
+
+        Returns:
+            int: Action 0 = up, 1 = right, 2 = down, 3 = left.
+        """
+        start = time.perf_counter()
+        self._setup(env)
+        body = [self._cell(pos) for pos in env.snake]
+        food = self._cell(env.food)
+        if (self._food != food or not self._path or self._path[0] - body[0] not in self._offsets
+                or env._blocked_bytes[self._path[0]]):
+            # Neues Essen oder vom Plan abgewichen (z.B. neue Episode): Pfad neu suchen
+            self._idle = 0 if self._food != food else self._idle + 1
+            self._food = food
+            self._path = self._food_path(body, food, safe=self._idle < self._n_cells) or []
+        if self._path:
+            action = self._offsets.index(self._path.pop(0) - body[0])
+        else:
+            action = self._fallback(body, food)
+        self.last_stats = {"time_ms": (time.perf_counter() - start) * 1000.0}
+        return action
+
+
+class ShardWriter:
+    """
+    Append records of SAMPLE_DTYPE to memory-mapped .npy shards of ``shard_size`` records.
+
+    Records are written straight into the memory map of the current shard, so the writer never
+    holds more than one episode in memory. When a shard is full the next one is opened; the
+    last, partial shard is cut to its length on ``close``.
+
+    Args:
+        out_dir (str): Directory of the shards.
+        prefix (str): File name prefix; shard k is ``<prefix>_<k>.npy``.
+        shard_size (int, optional): Records per shard.
+    """
+    def __init__(self, out_dir, prefix, shard_size=1 << 18):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.shards = []
+        self._shard = None
+        self._pos = 0
+
+    def _open(self):
+        name = f"{self.prefix}_{len(self.shards):05d}.npy"
+        self._shard = open_memmap(os.path.join(self.out_dir, name), mode="w+", dtype=SAMPLE_DTYPE,
+                                  shape=(self.shard_size,))
+        self.shards.append({"name": name, "rows": 0})
+        self._pos = 0
+
+    def append(self, records):
+        """
+        Append records.
+
+        Args:
+            records (np.ndarray): Array of SAMPLE_DTYPE.
+        """
+        start = 0
+        while start < len(records):
+            if self._shard is None or self._pos == self.shard_size:
+                self._finish()
+                self._open()
+            n = min(len(records) - start, self.shard_size - self._pos)
+            self._shard[self._pos:self._pos + n] = records[start:start + n]
+            self._pos += n
+            self.shards[-1]["rows"] = self._pos
+            start += n
+
+    def _finish(self):
+        if self._shard is None:
+            return
+        self._shard.flush()
+        if self._pos < self.shard_size:
+            # Angebrochenen Shard auf die geschriebenen Datensätze kürzen
+            path = os.path.join(self.out_dir, self.shards[-1]["name"])
+            shard, self._shard = self._shard, None
+            np.save(path + ".tmp.npy", shard[:self._pos])
+            del shard
+            os.replace(path + ".tmp.npy", path)
+        self._shard = None
+
+    def close(self):
+        """
+        Finish the last shard.
+
+        Returns:
+            list: {"name", "rows"} per shard.
+        """
+        self._finish()
+        return self.shards
+
+
+def play_expert_episodes(out_dir, prefix, episode_seeds, shard_size=1 << 18, cols=20, rows=20, max_idle_steps=None):
+    """
+    Process-pool task: play episodes with the expert and write their steps to shards.
+
+    An episode ends when the snake dies, the board is full, or after ``max_idle_steps`` steps without
+    food (default: 2 * cols * rows); the last record of every episode has ``done`` set.
+
+    Args:
+        out_dir (str): Directory of the shards.
+        prefix (str): Shard name prefix of this task.
+        episode_seeds (list): One seed per episode.
+        shard_size (int, optional): Records per shard.
+        cols (int, optional): Board width in cells.
+        rows (int, optional): Board height in cells.
+        max_idle_steps (int, optional): Steps without food after which an episode is cut.
+
+    Returns:
+        tuple: (shards, scores, lengths) with the shard list of ShardWriter.close.
+    """
+    env = SnakeEnv(cols=cols, rows=rows)
+    expert = ExpertPolicy()
+    writer = ShardWriter(out_dir, prefix, shard_size)
+    max_idle_steps = max_idle_steps or 2 * cols * rows
+    scores, lengths = [], []
+    for seed in episode_seeds:
+        obs, _ = env.reset(seed=int(seed))
+        expert.reset()
+        episode = []
+        done, idle = False, 0
+        while not done:
+            action = expert.plan(env)
+            next_obs, reward, terminated, truncated, _ = env.step(action)
+            idle = 0 if reward > 0 else idle + 1
+            done = terminated or truncated or idle >= max_idle_steps
+            episode.append((obs, action, reward, done))
+            obs = next_obs
+        writer.append(np.array(episode, dtype=SAMPLE_DTYPE))
+        scores.append(env.score)
+        lengths.append(len(episode))
+    return writer.close(), scores, lengths
+
+
+def generate_dataset(out_dir, num_episodes, n_workers=None, n_tasks=None, shard_size=1 << 18, seed=0,
+                     cols=20, rows=20):
+    """
+    Generate an expert dataset on a process pool.
+
+    Episode i is played with seed ``seed + i``; the episodes are split into ``n_tasks`` tasks that
+    write their own shards, so the data does not depend on the number of workers. A manifest with
+    the shard list is written last.
+
+    Args:
+        out_dir (str): Target directory (created if missing).
+        num_episodes (int): Number of episodes.
+        n_workers (int, optional): Worker processes. Defaults to the CPU count.
+        n_tasks (int, optional): Number of tasks. Defaults to 4 per worker.
+        shard_size (int, optional): Records per shard.
+        seed (int, optional): Base seed.
+        cols (int, optional): Board width in cells.
+        rows (int, optional): Board height in cells.
+
+    Returns:
+        dict: The manifest.
+    """
+    n_workers = n_workers or os.cpu_count()
+    n_tasks = max(1, min(n_tasks or 4 * n_workers, num_episodes))
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    seeds = np.array_split(np.arange(seed, seed + num_episodes), n_tasks)
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(play_expert_episodes, out_dir, f"part{k:04d}", part.tolist(), shard_size, cols, rows)
+                   for k, part in enumerate(seeds)]
+        results = [future.result() for future in futures]
+    shards = [shard for result in results for shard in result[0]]
+    scores = np.concatenate([result[1] for result in results])
+    lengths = np.concatenate([result[2] for result in results])
+    manifest = {
+        "version": DATASET_VERSION,
+        "dtype": SAMPLE_DTYPE.descr,
+        "cols": cols,
+        "rows": rows,
+        "seed": seed,
+        "episodes": int(num_episodes),
+        "steps": int(lengths.sum()),
+        "mean_score": float(scores.mean()),
+        "wall_time_s": time.perf_counter() - start,
+        "shards": shards,
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ExpertDataset:
+    """
+    Read-only view of an expert dataset; the shards are memory-mapped and never loaded as a whole.
+
+    Args:
+        path (str): Directory with the manifest and the shards.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST), "r") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != DATASET_VERSION:
+            raise ValueError(f"Unbekannte Datensatz-Version {self.manifest.get('version')} in {path}")
+        self.shards = [np.load(os.path.join(path, shard["name"]), mmap_mode="r") for shard in self.manifest["shards"]]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def iter_batches(self, batch_size=256, shuffle=True, seed=0):
+        """
+        Yield minibatches of SAMPLE_DTYPE records.
+
+        With ``shuffle`` the shards are visited in random order and each shard in a random
+        permutation; only one permutation and one batch are held in memory at a time. The indices
+        of a batch are sorted so that the reads of the memory map go forward.
+
+        Args:
+            batch_size (int, optional): Records per batch (the last batch of a shard may be smaller).
+            shuffle (bool, optional): Random order instead of the stored order.
+            seed (int, optional): Seed of the order.
+        """
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        for k in order:
+            shard = self.shards[k]
+            if shuffle:
+                index = rng.permutation(len(shard))
+                for start in range(0, len(shard), batch_size):
+                    yield shard[np.sort(index[start:start + batch_size])]
+            else:
+                for start in range(0, len(shard), batch_size):
+                    yield np.asarray(shard[start:start + batch_size])
+
+
+def pretrain_policy(model, dataset, epochs=1, batch_size=256, learning_rate=1e-3, seed=0, verbose=1):
+    """
+    Behaviour cloning: fit the action distribution of an SB3 ``MlpPolicy`` to the expert actions.
+
+    Minimizes the negative log-likelihood of the expert action with a separate Adam optimizer (the
+    optimizer state of PPO stays untouched), streaming shuffled minibatches from the memory-mapped
+    shards. Only the actor is trained; the value head is fitted by PPO afterwards.
+
+    Args:
+        model (PPO): Model with a 9-feature MlpPolicy.
+        dataset (ExpertDataset): The expert data.
+        epochs (int, optional): Passes over the dataset.
+        batch_size (int, optional): Records per minibatch.
+        learning_rate (float, optional): Learning rate of the Adam optimizer.
+        seed (int, optional): Seed of the batch order (epoch e uses seed + e).
+        verbose (int, optional): Print loss and accuracy after every epoch.
+
+    Returns:
+        dict: Mean loss and accuracy of the last epoch.
+    """
+    import torch
+
+    policy = model.policy
+    policy.set_training_mode(True)
+    optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate)
+    stats = {}
+    for epoch in range(epochs):
+        total_loss, correct, seen = 0.0, 0, 0
+        for batch in dataset.iter_batches(batch_size, seed=seed + epoch):
+            obs = torch.as_tensor(np.ascontiguousarray(batch["obs"]), device=policy.device)
+            actions = torch.as_tensor(batch["action"].astype(np.int64), device=policy.device)
+            distribution = policy.get_distribution(obs)
+            loss = -distribution.log_prob(actions).mean()
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(policy.parameters(), 0.5)
+            optimizer.step()
+            total_loss += loss.item() * len(batch)
+            correct += int((distribution.distribution.probs.argmax(dim=1) == actions).sum())
+            seen += len(batch)
+        stats = {"loss": total_loss / max(seen, 1), "accuracy": correct / max(seen, 1)}
+        if verbose:
+            print(f"Behaviour cloning epoch {epoch + 1}/{epochs}: loss {stats['loss']:.4f}, "
+                  f"accuracy {stats['accuracy']:.3f} over {seen} samples")
+    policy.set_training_mode(False)
+    return stats
+
+
+if __name__ == "__main__":
+    # Die Argumente sind in snake.py definiert (python src/snake.py expert --help)
+    from snake import main
+    main(["expert", *sys.argv[1:]])
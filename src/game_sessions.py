@@ -0,0 +1,207 @@
+import random
+import struct
+import threading
+import time
+from snake_env import SnakeEnv
+
+HUMAN_ACTIONS = {'up': 0, 'right': 1, 'down': 2, 'left': 3}
+DIRECTION_INDEX = {(0, -1): 0, (1, 0): 1, (0, 1): 2, (-1, 0): 3}
+
+# Flags der Delta-Frames
+DELTA_HEAD = 1   # neuer Kopf
+DELTA_TAIL = 2   # Schwanzsegment entfernt
+DELTA_FOOD = 4   # Essen an neuer Position
+DELTA_DEAD = 8   # Spiel vorbei (Kopf als 'X' zeichnen)
+# Binärer Delta-Frame: flags, head x/y, tail x/y, food x/y, direction (je uint8), score (uint16)
+DELTA_FRAME = struct.Struct("<8BH")
+
+
+def encode_keyframe(env):
+    """
+    Encode the full game state, sent once when a game starts.
+
+    Args:
+        env (SnakeEnv): The environment.
+
+    Returns:
+        dict: Board size, body (head first), food, score, direction index
+              (0 = up, 1 = right, 2 = down, 3 = left) and the game-over flag.
+    """
+    return {
+        'cols': env.cols,
+        'rows': env.rows,
+        'snake': [list(cell) for cell in env.snake],
+        'food': list(env.food),
+        'score': env.score,
+        'direction': DIRECTION_INDEX[env.direction],
+        'dead': env.done,
+    }
+
+
+def encode_delta(env, prev_head, prev_tail, prev_food, binary=False):
+    """
+    Encode the changes of one step relative to the previous state.
+
+    Between two ticks only the head, the tail and possibly the food change, so a delta
+    carries at most three cells plus score, direction and the game-over flag.
+
+    Args:
+        env (SnakeEnv): The environment after the step.
+        prev_head (tuple): Head cell before the step.
+        prev_tail (tuple): Tail cell before the step.
+        prev_food (tuple): Food cell before the step.
+        binary (bool, optional): Return a packed 10-byte frame (see DELTA_FRAME) instead of a dict.
+                                 Coordinates are stored as uint8, so boards are limited to 256x256.
+
+    Returns:
+        dict or bytes: The delta. In the dict, absent keys mean "unchanged".
+    """
+    flags = 0
+    head = tail = food = (0, 0)
+    # Bei einer Kollision bleibt die Schlange unverändert, nur das Spielende wird gemeldet
+    if env.snake[0] != prev_head:
+        flags |= DELTA_HEAD
+        head = env.snake[0]
+        # Ist der alte Schwanz noch da, ist die Schlange gewachsen
+        if env.snake[-1] != prev_tail:
+            flags |= DELTA_TAIL
+            tail = prev_tail
+    if env.food != prev_food:
+        flags |= DELTA_FOOD
+        food = env.food
+    if env.done:
+        flags |= DELTA_DEAD
+    direction = DIRECTION_INDEX[env.direction]
+    if binary:
+        return DELTA_FRAME.pack(flags, head[0], head[1], tail[0], tail[1], food[0], food[1], direction, env.score)
+    delta = {'s': env.score, 'd': direction}
+    if flags & DELTA_HEAD:
+        delta['h'] = list(head)
+    if flags & DELTA_TAIL:
+        delta['t'] = list(tail)
+    if flags & DELTA_FOOD:
+        delta['f'] = list(food)
+    if flags & DELTA_DEAD:
+        delta['x'] = 1
+    return delta
+
+
+class GameSession:
+    """
+    State of one Socket.IO client's game.
+
+    Attributes:
+        sid (str): Socket.IO session id of the client, also used as its room.
+        env (SnakeEnv): The client's own environment.
+        model (object): Policy with a ``predict`` method, a planner with a ``plan(env)`` method,
+                        or None for a human player.
+        next_action (int): Last action sent by a human player.
+        binary (bool): Send the deltas as packed binary frames instead of JSON.
+        running (bool): Cleared to stop the game loop at the next tick.
+    """
+    def __init__(self, sid, model=None, binary=False):
+        self.sid = sid
+        self.env = SnakeEnv()
+        self.model = model
+        self.binary = binary
+        self.next_action = random.randint(0, 3)
+        self.running = True
+
+
+class SessionManager:
+    """
+    Runs one game per Socket.IO client as a cooperative background task.
+
+    Every game has its own env, policy handle and action, and its updates are emitted only to
+    the client's room: one 'keyframe' with the full state, then one 'state_delta' (JSON) or
+    'state_frame' (binary) per tick. The loops use ``socketio.sleep``, so with eventlet or
+    gevent hundreds of games share one server process; in threading mode each game runs in
+    its own thread.
+
+    Attributes:
+        socketio (SocketIO): The Flask-SocketIO server.
+        tick_rate (float): Game steps per second.
+    """
+    def __init__(self, socketio, tick_rate=10.0):
+        self.socketio = socketio
+        self.tick_rate = tick_rate
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def start(self, sid, model=None, binary=False):
+        """
+        Start a new game for a client; a game that is still running for this client is stopped.
+
+        Args:
+            sid (str): Socket.IO session id of the client.
+            model (object, optional): Policy used to play, or None for a human player.
+            binary (bool, optional): Stream binary delta frames instead of JSON deltas.
+        """
+        session = GameSession(sid, model, binary)
+        with self._lock:
+            previous = self._sessions.get(sid)
+            if previous is not None:
+                previous.running = False
+            self._sessions[sid] = session
+        self.socketio.start_background_task(self._run, session)
+
+    def stop(self, sid):
+        """Stop the game of a client, e.g. when it disconnects."""
+        with self._lock:
+            session = self._sessions.pop(sid, None)
+        if session is not None:
+            session.running = False
+
+    def set_action(self, sid, direction):
+        """
+        Store the next action of a human player.
+
+        Args:
+            sid (str): Socket.IO session id of the client.
+            direction (str): 'up', 'right', 'down' or 'left'.
+        """
+        session = self._sessions.get(sid)
+        if session is not None and direction in HUMAN_ACTIONS:
+            session.next_action = HUMAN_ACTIONS[direction]
+
+    def _run(self, session):
+        """
+        Game loop of one session, emits a state update per tick to the client's room.
+
+        If the policy, the planner or the environment raises, the client gets an 'error' event
+        instead of 'episode_end'; the session is removed in any case.
+        """
+        env = session.env
+        interval = 1.0 / self.tick_rate
+        event = 'state_frame' if session.binary else 'state_delta'
+        try:
+            obs, _ = env.reset()
+            self.socketio.emit('keyframe', encode_keyframe(env), to=session.sid)
+            done = False
+            while session.running and not done:
+                tick_start = time.monotonic()
+                if session.model is None:
+                    action = session.next_action
+                elif hasattr(session.model, "plan"):
+                    # SearchPlanner: sucht auf Kopien des Spielzustands, innerhalb seines Zeitbudgets
+                    action = session.model.plan(env)
+                else:
+                    action, _states = session.model.predict(obs)
+                prev_head, prev_tail, prev_food = env.snake[0], env.snake[-1], env.food
+                obs, reward, terminated, truncated, info = env.step(action)
+                done = terminated or truncated
+                delta = encode_delta(env, prev_head, prev_tail, prev_food, binary=session.binary)
+                self.socketio.emit(event, delta, to=session.sid)
+                # Restzeit bis zum nächsten Tick abwarten, ohne andere Spiele zu blockieren
+                self.socketio.sleep(max(0.0, interval - (time.monotonic() - tick_start)))
+            if done:
+                self.socketio.emit('episode_end', {'score': env.score}, to=session.sid)
+        except Exception as e:
+            self.socketio.emit('error', {'message': f'Spiel abgebrochen: {e}'}, to=session.sid)
+        finally:
+            with self._lock:
+                if self._sessions.get(session.sid) is session:
+                    del self._sessions[session.sid]
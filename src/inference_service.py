@@ -0,0 +1,339 @@
+import argparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+
+class QueueMetrics:
+    """
+    Request, batch and latency counters of one model queue.
+
+    Latencies (submit until the result is set) are kept for the last ``window`` requests.
+    """
+    def __init__(self, window=10_000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=window)
+
+    def record_batch(self, n_rows, latencies, error=False):
+        self.batches += 1
+        self.requests += len(latencies)
+        self.rows += n_rows
+        self.errors += len(latencies) if error else 0
+        self._latencies.extend(latencies)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Totals, mean batch size, throughput (rows/s since start) and p50/p95/p99 latency in ms.
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        latencies = np.array(self._latencies) * 1e3 if self._latencies else np.zeros(1)
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "rows_per_sec": self.rows / elapsed,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+        }
+
+
+def observation_shape(model):
+    """Shape of one observation of a PPO model or SnakePolicy, e.g. (9,)."""
+    if hasattr(model, "observation_space"):
+        return model.observation_space.shape
+    return (model.weights[0][0].shape[0],)
+
+
+class ModelQueue:
+    """
+    Coalesces the requests for one model into batched ``predict`` calls.
+
+    A background thread waits for the first pending request, then keeps collecting until
+    ``window`` seconds have passed since that request or ``max_batch`` observations are
+    pending, and answers all collected requests with a single forward pass. Requests whose
+    observations do not have ``obs_shape`` are rejected in ``submit``; if a batch still fails,
+    its requests are retried one by one, so one bad request cannot fail the others.
+
+    Args:
+        load_model (callable): Returns the model; called once per batch, so reloaded models are picked up.
+        window (float): Maximum time in seconds a request waits for others to join its batch.
+        max_batch (int): Maximum number of observations per forward pass.
+        deterministic (bool): Passed to ``predict``.
+        obs_shape (tuple, optional): Shape of one observation, e.g. (9,). Not checked if None.
+    """
+    def __init__(self, load_model, window=0.002, max_batch=256, deterministic=False, obs_shape=None):
+        self.load_model = load_model
+        self.window = window
+        self.max_batch = max_batch
+        self.deterministic = deterministic
+        self.obs_shape = None if obs_shape is None else tuple(obs_shape)
+        self.metrics = QueueMetrics()
+        self._pending = deque()  # (obs batch, future, submit time)
+        self._pending_rows = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="inference-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, obs):
+        """
+        Queue a batch of observations.
+
+        Args:
+            obs (np.ndarray): Observations of shape (n, *obs_shape).
+
+        Returns:
+            Future: Resolves to the actions, shape (n,).
+
+        Raises:
+            ValueError: If the observations do not have the shape (n, *obs_shape).
+        """
+        if self.obs_shape is not None and (obs.ndim != len(self.obs_shape) + 1 or obs.shape[1:] != self.obs_shape):
+            raise ValueError(f"Beobachtungen der Form {obs.shape}, erwartet (n, {', '.join(map(str, self.obs_shape))})")
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Die Inferenz-Warteschlange ist geschlossen")
+            self._pending.append((obs, future, time.monotonic()))
+            self._pending_rows += len(obs)
+            self._cond.notify()
+        return future
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _next_batch(self):
+        """Wait for the window or a full batch and take the requests (None when closed)."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0][2] + self.window
+            while self._pending_rows < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            # Mindestens eine Anfrage, danach nur so viele, wie in max_batch passen
+            batch = [self._pending.popleft()]
+            rows = len(batch[0][0])
+            while self._pending and rows + len(self._pending[0][0]) <= self.max_batch:
+                batch.append(self._pending.popleft())
+                rows += len(batch[-1][0])
+            self._pending_rows -= rows
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._answer(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch, e)
+                    continue
+                # Einzeln wiederholen, damit nur die fehlerhafte Anfrage scheitert
+                for request in batch:
+                    try:
+                        self._answer([request])
+                    except Exception as e:
+                        self._fail([request], e)
+
+    def _answer(self, batch):
+        """Run one forward pass for the requests of ``batch`` and set their results."""
+        model = self.load_model()
+        obs = np.concatenate([obs for obs, _, _ in batch])
+        actions, _states = model.predict(obs, deterministic=self.deterministic)
+        actions = np.asarray(actions).reshape(len(obs))
+        start = 0
+        now = time.monotonic()
+        for obs, future, _ in batch:
+            future.set_result(actions[start:start + len(obs)])
+            start += len(obs)
+        self.metrics.record_batch(len(actions), [now - submitted for _, _, submitted in batch])
+
+    def _fail(self, batch, error):
+        now = time.monotonic()
+        for _, future, _ in batch:
+            future.set_exception(error)
+        self.metrics.record_batch(sum(len(obs) for obs, _, _ in batch),
+                                  [now - submitted for _, _, submitted in batch], error=True)
+
+
+class InferenceService:
+    """
+    Policy server shared by all games: one coalescing ModelQueue per (model, deterministic).
+
+    Models are taken from a ModelRegistry, so every model the web viewer can list can be served.
+
+    Args:
+        registry (ModelRegistry): Source of the models.
+        window_ms (float, optional): Coalescing window in milliseconds.
+        max_batch (int, optional): Maximum number of observations per forward pass.
+    """
+    def __init__(self, registry, window_ms=2.0, max_batch=256):
+        self.registry = registry
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, model_name, deterministic):
+        """
+        Return the queue of a model, creating it on first use.
+
+        The model is loaded before its queue is created, so unknown names or broken files from
+        outside (``POST /predict``) raise here instead of leaving a queue and thread behind.
+        """
+        key = (model_name, bool(deterministic))
+        with self._lock:
+            queue = self._queues.get(key)
+        if queue is not None:
+            return queue
+        # Laden ausserhalb des Locks, damit die Warteschlangen anderer Modelle erreichbar bleiben
+        model = self.registry.get(model_name)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = ModelQueue(lambda: self._load(key), self.window_ms / 1000.0, self.max_batch, deterministic,
+                                   obs_shape=observation_shape(model))
+                self._queues[key] = queue
+            return queue
+
+    def _load(self, key):
+        """Load the model of a queue; if that fails (e.g. the file was deleted), the queue is removed."""
+        try:
+            return self.registry.get(key[0])
+        except Exception:
+            with self._lock:
+                queue = self._queues.pop(key, None)
+            if queue is not None:
+                queue.close()
+            raise
+
+    def submit(self, model_name, obs, deterministic=False):
+        """
+        Queue a batch of observations for a model.
+
+        Returns:
+            Future: Resolves to the actions as np.ndarray of shape (n,).
+        """
+        return self._queue(model_name, deterministic).submit(np.asarray(obs, dtype=np.float32))
+
+    def predict(self, model_name, obs, deterministic=False, timeout=None):
+        """Blocking variant of ``submit`` for a batch of observations."""
+        return self.submit(model_name, obs, deterministic).result(timeout)
+
+    def policy(self, model_name, deterministic=False):
+        """Return a model-like handle whose ``predict`` goes through the service."""
+        return ServicePolicy(self, model_name, deterministic)
+
+    def metrics(self):
+        """Return the metrics of every queue, keyed by model name (with ':deterministic' for greedy queues)."""
+        with self._lock:
+            queues = dict(self._queues)
+        return {name + (":deterministic" if deterministic else ""): queue.metrics.summary()
+                for (name, deterministic), queue in queues.items()}
+
+    def close(self):
+        with self._lock:
+            for queue in self._queues.values():
+                queue.close()
+            self._queues.clear()
+
+
+class ServicePolicy:
+    """
+    Drop-in replacement for a model in the game loops: ``predict`` sends the observation to the
+    InferenceService and waits for its batch to be evaluated.
+    """
+    def __init__(self, service, model_name, deterministic=False):
+        self.service = service
+        self.model_name = model_name
+        self.deterministic = deterministic
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=None):
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.ndim == 1
+        deterministic = self.deterministic if deterministic is None else deterministic
+        actions = self.service.predict(self.model_name, obs[None] if single else obs, deterministic)
+        return (actions[0] if single else actions), None
+
+
+def create_blueprint(service):
+    """
+    HTTP interface of the service as a Flask blueprint.
+
+    Routes:
+        POST /predict         {"model": name, "obs": [[...], ...], "deterministic": false} -> {"actions": [...]}
+        GET  /inference/stats  metrics of all model queues
+    """
+    from flask import Blueprint, jsonify, request
+
+    blueprint = Blueprint("inference", __name__)
+
+    @blueprint.route('/predict', methods=['POST'])
+    def predict():
+        data = request.get_json(force=True)
+        try:
+            obs = np.asarray(data["obs"], dtype=np.float32)
+            actions = service.predict(data["model"], obs if obs.ndim > 1 else obs[None], data.get("deterministic", False))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"actions": actions.tolist()})
+
+    @blueprint.route('/inference/stats')
+    def stats():
+        return jsonify(service.metrics())
+
+    return blueprint
+
+
+def register_socketio_handlers(socketio, service):
+    """
+    Socket.IO interface: the 'predict' event takes the same payload as POST /predict and
+    answers through the acknowledgement callback.
+    """
+    @socketio.on('predict')
+    def predict(data):
+        try:
+            obs = np.asarray(data["obs"], dtype=np.float32)
+            actions = service.predict(data["model"], obs if obs.ndim > 1 else obs[None], data.get("deterministic", False))
+        except Exception as e:
+            return {"error": str(e)}
+        return {"actions": actions.tolist()}
+
+
+if __name__ == "__main__":
+    from flask import Flask
+    from flask_socketio import SocketIO
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Standalone batched policy server for external clients.")
+    parser.add_argument('--models-dir', type=str, default="./models", help="Directory with the models")
+    parser.add_argument('--port', type=int, default=5001, help="Port of the HTTP/Socket.IO server")
+    parser.add_argument('--window-ms', type=float, default=2.0, help="Coalescing window in milliseconds")
+    parser.add_argument('--max-batch', type=int, default=256, help="Maximum observations per forward pass")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    service = InferenceService(ModelRegistry(args.models_dir), window_ms=args.window_ms, max_batch=args.max_batch)
+    app.register_blueprint(create_blueprint(service))
+    register_socketio_handlers(socketio, service)
+    socketio.run(app, port=args.port)
@@ -0,0 +1,237 @@
+import cProfile
+import os
+import pstats
+import time
+from collections import defaultdict
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+# Histogramme nur nach TensorBoard schreiben, die Text-Ausgaben können keine Arrays darstellen
+HISTOGRAM_EXCLUDE = ("stdout", "log", "json", "csv")
+
+
+class PhaseTimers:
+    """
+    Collects wall-clock durations per training phase.
+
+    Durations are kept until ``flush`` hands them to the logger, so every logged value covers
+    the phases finished since the previous rollout.
+    """
+    def __init__(self):
+        self._durations = defaultdict(list)
+
+    def add(self, phase, seconds):
+        self._durations[phase].append(seconds)
+
+    def flush(self, logger):
+        """
+        Log total, mean and histogram of every phase and start over.
+
+        Args:
+            logger (Logger): The stable-baselines3 logger of the model.
+        """
+        for phase, durations in self._durations.items():
+            values = np.asarray(durations)
+            logger.record(f"timing/{phase}_total_s", float(values.sum()))
+            logger.record(f"timing/{phase}_mean_ms", float(values.mean() * 1e3))
+            logger.record(f"timing/{phase}_ms", values * 1e3, exclude=HISTOGRAM_EXCLUDE)
+        self._durations.clear()
+
+
+class InstrumentedVecEnv(VecEnvWrapper):
+    """
+    VecEnv wrapper that measures the time spent stepping the environments and the snake lengths.
+
+    Works with every vectorization backend of ``train.py`` because it only needs the ``score``
+    in the infos (the snake starts with one segment and grows by one per food, so its length is
+    ``score + 1``) and the ``food_retries`` that SnakeEnv and VecSnakeEnv add to the info of steps
+    that eat (``None`` in the stats if the envs never report it).
+    The time between two steps that is not spent here is the policy forward pass.
+
+    Attributes:
+        timers (PhaseTimers): Receives one 'env_step' duration per vectorized step.
+    """
+    def __init__(self, venv, timers):
+        super().__init__(venv)
+        self.timers = timers
+        self.step_count = 0
+        self.food_eaten = 0
+        self.food_retries = 0
+        self._retries_reported = False
+        self._length_sum = 0
+        self._length_count = 0
+        self._step_start = 0.0
+
+    def reset(self):
+        return self.venv.reset()
+
+    def step_async(self, actions):
+        self._step_start = time.perf_counter()
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self.timers.add("env_step", time.perf_counter() - self._step_start)
+        self.step_count += 1
+        for info in infos:
+            if "score" in info:
+                self._length_sum += info["score"] + 1
+                self._length_count += 1
+            if "food_retries" in info:
+                self.food_retries += info["food_retries"]
+                self._retries_reported = True
+        self.food_eaten += int(np.count_nonzero(rewards > 0))
+        return obs, rewards, dones, infos
+
+    def pop_stats(self):
+        """
+        Return the env counters collected since the last call and reset them.
+
+        Returns:
+            dict: steps, food eaten (= food placements), missed placement draws and the mean snake length.
+        """
+        stats = {
+            "steps": self.step_count,
+            "food_placements": self.food_eaten,
+            "food_retries": self.food_retries if self._retries_reported else None,
+            "mean_snake_length": self._length_sum / max(self._length_count, 1),
+        }
+        self.step_count = self.food_eaten = self.food_retries = self._length_sum = self._length_count = 0
+        return stats
+
+
+class TimedCallback(BaseCallback):
+    """
+    Wraps a callback and records how long it takes whenever it actually does work.
+
+    Args:
+        callback (BaseCallback): The wrapped callback, e.g. a CheckpointCallback or EvalCallback.
+        phase (str): Name of the phase in the timing logs, e.g. 'checkpoint' or 'eval'.
+        timers (PhaseTimers): Where the durations are recorded.
+        every (int, optional): The wrapped callback's frequency in calls (``save_freq``, ``eval_freq``).
+                               Only those calls are timed; by default every call is.
+    """
+    def __init__(self, callback, phase, timers, every=None):
+        super().__init__(callback.verbose)
+        self.callback = callback
+        self.phase = phase
+        self.timers = timers
+        self.every = every
+
+    def _init_callback(self):
+        self.callback.init_callback(self.model)
+
+    def _on_training_start(self):
+        self.callback.on_training_start(self.locals, self.globals)
+
+    def _on_rollout_start(self):
+        self.callback.on_rollout_start()
+
+    def _on_step(self) -> bool:
+        start = time.perf_counter()
+        result = self.callback.on_step()
+        if self.every is None or self.n_calls % self.every == 0:
+            self.timers.add(self.phase, time.perf_counter() - start)
+        return result
+
+    def _on_rollout_end(self):
+        self.callback.on_rollout_end()
+
+    def _on_training_end(self):
+        self.callback.on_training_end()
+
+    def update_child_locals(self, locals_):
+        self.callback.update_locals(locals_)
+
+
+class InstrumentationCallback(BaseCallback):
+    """
+    Logs where the wall time of ``model.learn`` goes, next to ``rollout/avg_score``.
+
+    Per rollout it records the duration of the rollout collection, the env stepping inside it
+    (the rest is mostly the policy forward pass), the PPO update of the previous iteration and
+    the checkpoint/eval callbacks wrapped in ``TimedCallback``, as totals, means and TensorBoard
+    histograms under ``timing/``. Env counters are logged under ``env/``: the number of food
+    placements and their retries, i.e. draws of ``SnakeEnv._place_food`` that hit the body
+    (only while a third of the board is free; fuller boards draw from the free-cell index).
+
+    Args:
+        timers (PhaseTimers): Shared with the InstrumentedVecEnv and the TimedCallbacks.
+        instrumented_env (InstrumentedVecEnv): The wrapped training env.
+    """
+    def __init__(self, timers, instrumented_env, verbose=0):
+        super().__init__(verbose)
+        self.timers = timers
+        self.instrumented_env = instrumented_env
+        self._rollout_start = None
+        self._update_start = None
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._update_start is not None:
+            self.timers.add("update", now - self._update_start)
+        self._rollout_start = now
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        rollout = now - self._rollout_start
+        self.timers.add("rollout", rollout)
+        stats = self.instrumented_env.pop_stats()
+        self.logger.record("env/mean_snake_length", stats["mean_snake_length"])
+        self.logger.record("env/food_placements", stats["food_placements"])
+        if stats["food_retries"] is not None:
+            self.logger.record("env/food_retries", stats["food_retries"])
+        self.logger.record("env/steps_per_sec", stats["steps"] * self.training_env.num_envs / rollout)
+        self.timers.flush(self.logger)
+        self._update_start = now
+
+
+class ProfileCallback(BaseCallback):
+    """
+    Runs cProfile for a bounded window of timesteps and writes the stats to a file.
+
+    The window covers everything that happens in this process meanwhile (env steps, policy
+    forward passes, updates, callbacks). Envs in worker processes (subproc/shm backends) are
+    not profiled.
+
+    Args:
+        n_steps (int): Length of the window in timesteps.
+        out_path (str): File for the raw stats, readable with ``pstats`` or snakeviz.
+        start_step (int, optional): Timestep at which profiling starts.
+    """
+    def __init__(self, n_steps, out_path, start_step=0, verbose=1):
+        super().__init__(verbose)
+        self.n_steps = n_steps
+        self.out_path = out_path
+        self.start_step = start_step
+        self._profiler = None
+        self._profile_start = 0
+        self._done = False
+
+    def _on_step(self) -> bool:
+        if self._done:
+            return True
+        if self._profiler is None and self.num_timesteps >= self.start_step:
+            self._profile_start = self.num_timesteps
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self._profiler is not None and self.num_timesteps - self._profile_start >= self.n_steps:
+            self._dump()
+        return True
+
+    def _on_training_end(self):
+        if self._profiler is not None and not self._done:
+            self._dump()
+
+    def _dump(self):
+        self._profiler.disable()
+        self._done = True
+        os.makedirs(os.path.dirname(self.out_path) or ".", exist_ok=True)
+        self._profiler.dump_stats(self.out_path)
+        if self.verbose:
+            print(f"Profile of {self.num_timesteps - self._profile_start} timesteps saved to {self.out_path}")
+            pstats.Stats(self.out_path).sort_stats("cumulative").print_stats(20)
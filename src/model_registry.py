@@ -0,0 +1,101 @@
+import os
+import threading
+from collections import OrderedDict
+from numpy_policy import load_model
+
+MODEL_SUFFIXES = (".zip", ".npz")
+
+
+class ModelRegistry:
+    """
+    In-process cache of the models under a models directory.
+
+    Models are addressed by their name relative to the directory, like elsewhere in the
+    project: PPO zips without the ``.zip`` suffix (``ppo_snake_config0``,
+    ``best_model_config0/best_model``) and exported NumPy policies with their ``.npz`` suffix.
+    Loaded models are kept in an LRU cache of at most ``max_size`` entries and are reloaded
+    when the file's modification time changes.
+
+    Attributes:
+        models_dir (str): Directory that is scanned for models.
+        max_size (int): Maximum number of models kept in memory.
+        include_checkpoints (bool): Also list the zips in the ``checkpoints_*`` directories.
+    """
+    def __init__(self, models_dir="./models", max_size=8, include_checkpoints=False):
+        self.models_dir = models_dir
+        self.max_size = max_size
+        self.include_checkpoints = include_checkpoints
+        self._cache = OrderedDict()  # name -> (mtime, model)
+        self._lock = threading.Lock()
+
+    def list_models(self, suffixes=MODEL_SUFFIXES):
+        """
+        List the available models, sorted by name.
+
+        Args:
+            suffixes (tuple, optional): File types to include, e.g. ``(".zip",)`` for PPO models only.
+
+        Returns:
+            list: Model names that can be passed to ``get``.
+        """
+        names = []
+        for root, dirs, files in os.walk(self.models_dir):
+            if not self.include_checkpoints:
+                dirs[:] = [d for d in dirs if not d.startswith("checkpoints_")]
+            for file in files:
+                if not file.endswith(suffixes):
+                    continue
+                name = os.path.relpath(os.path.join(root, file), self.models_dir).replace(os.sep, "/")
+                names.append(name[:-4] if name.endswith(".zip") else name)
+        return sorted(names)
+
+    def path(self, name):
+        """Return the file path of a model name."""
+        if os.path.isabs(name) or ".." in name.split("/"):
+            raise ValueError(f"Ungültiger Modellname '{name}'")
+        filename = name if name.endswith(".npz") else name + ".zip"
+        return os.path.join(self.models_dir, filename)
+
+    def get(self, name):
+        """
+        Return a loaded model, loading or reloading it from disk if necessary.
+
+        Args:
+            name (str): Model name as returned by ``list_models``.
+
+        Returns:
+            object: A model with a ``predict`` method (PPO or SnakePolicy).
+
+        Raises:
+            FileNotFoundError: If the model file does not exist.
+        """
+        path = self.path(name)
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(name)
+                return cached[1]
+        # Laden ausserhalb des Locks, damit andere Modelle währenddessen verfügbar bleiben
+        model = load_model(path)
+        with self._lock:
+            self._cache[name] = (mtime, model)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return model
+
+    def preload(self, names=None):
+        """
+        Load models into the cache ahead of time.
+
+        Args:
+            names (list, optional): Models to load. Defaults to all listed models, up to ``max_size``.
+        """
+        for name in (names if names is not None else self.list_models())[:self.max_size]:
+            self.get(name)
+
+    def cached_models(self):
+        """Return the names of the models currently held in memory, least recently used first."""
+        with self._lock:
+            return list(self._cache)
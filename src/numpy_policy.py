@@ -0,0 +1,212 @@
+import sys
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+class SnakePolicy:
+    """
+    Lightweight NumPy runtime for an exported PPO ``MlpPolicy``.
+
+    Only the actor part (policy MLP + action head) is kept, which is all that is needed to
+    select actions. ``predict`` mirrors the signature of stable-baselines3's ``model.predict``,
+    so a SnakePolicy can be used wherever a PPO model is used for inference.
+
+    Attributes:
+        weights (list): (W, b) pairs of the hidden layers, W with shape (in, out).
+        action_weight (np.ndarray): Weight matrix of the action head, shape (hidden, n_actions).
+        action_bias (np.ndarray): Bias of the action head.
+        activation (str): Name of the activation function ("tanh" or "relu").
+    """
+    def __init__(self, weights, action_weight, action_bias, activation="tanh", seed=None):
+        self.weights = weights
+        self.action_weight = action_weight
+        self.action_bias = action_bias
+        self.activation = activation
+        self._activation_fn = ACTIVATIONS[activation]
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a policy written by ``export_policy``.
+
+        Args:
+            path (str): Path of the .npz file.
+
+        Returns:
+            SnakePolicy: The loaded policy.
+        """
+        with np.load(path) as data:
+            return cls.from_arrays(data)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Build a policy from the arrays of ``policy_arrays`` (or an opened .npz file).
+
+        Args:
+            arrays (Mapping): n_layers, activation, W{i}, b{i}, action_W and action_b.
+
+        Returns:
+            SnakePolicy: The policy.
+        """
+        n_layers = int(arrays["n_layers"])
+        weights = [(arrays[f"W{i}"], arrays[f"b{i}"]) for i in range(n_layers)]
+        return cls(weights, arrays["action_W"], arrays["action_b"], activation=str(arrays["activation"]))
+
+    def set_random_seed(self, seed=None):
+        """Seed the generator used for stochastic action selection."""
+        self.rng = np.random.default_rng(seed)
+
+    def action_logits(self, obs):
+        """
+        Compute the action logits for a batch of observations.
+
+        Args:
+            obs (np.ndarray): Observations of shape (batch, 9) or a single observation of shape (9,).
+
+        Returns:
+            np.ndarray: Logits of shape (batch, n_actions).
+        """
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.weights[0][0].shape[0])
+        for W, b in self.weights:
+            x = self._activation_fn(x @ W + b)
+        return x @ self.action_weight + self.action_bias
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=False):
+        """
+        Select actions like ``model.predict`` of stable-baselines3.
+
+        Args:
+            obs (np.ndarray): A single observation or a batch of observations.
+            deterministic (bool, optional): Take the most likely action instead of sampling.
+
+        Returns:
+            tuple: (actions, None). ``actions`` is a scalar array for a single observation and
+                   an array of shape (batch,) for a batch.
+        """
+        obs = np.asarray(obs, dtype=np.float32)
+        logits = self.action_logits(obs)
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else:
+            # Stichprobe aus der Softmax-Verteilung über die inverse Verteilungsfunktion
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            cdf = np.cumsum(probs, axis=1)
+            u = self.rng.random(len(logits))[:, None] * cdf[:, -1:]
+            actions = np.minimum((cdf < u).sum(axis=1), logits.shape[1] - 1)
+        if obs.ndim == 1:
+            return actions[0], None
+        return actions, None
+
+
+def load_model(path):
+    """
+    Load a model for inference: ``.npz`` files as SnakePolicy, everything else with ``PPO.load``.
+
+    stable-baselines3 (and torch) are only imported when a zip model is requested.
+
+    Args:
+        path (str): Path of the model (.npz, or a PPO zip with or without the .zip suffix).
+
+    Returns:
+        object: A model with a ``predict`` method.
+    """
+    if path.endswith(".npz"):
+        return SnakePolicy.load(path)
+    from stable_baselines3 import PPO
+    return PPO.load(path, device="cpu")
+
+
+def policy_arrays(policy):
+    """
+    Copy the actor network of a PPO ``MlpPolicy`` into NumPy arrays.
+
+    Args:
+        policy (ActorCriticPolicy): The policy of a PPO model (``model.policy``).
+
+    Returns:
+        dict: n_layers, activation, W{i}/b{i} of the hidden layers and action_W/action_b, the
+              format written by ``export_policy`` and read by ``SnakePolicy.from_arrays``.
+    """
+    import torch.nn as nn
+    from stable_baselines3.common.torch_layers import FlattenExtractor
+
+    if not isinstance(policy.features_extractor, FlattenExtractor):
+        raise ValueError(f"Nur MlpPolicy kann exportiert werden, nicht {type(policy.features_extractor).__name__}")
+    activation_names = {nn.Tanh: "tanh", nn.ReLU: "relu"}
+    if policy.activation_fn not in activation_names:
+        raise ValueError(f"Aktivierungsfunktion {policy.activation_fn.__name__} wird nicht unterstützt")
+
+    arrays = {}
+    linear_layers = [m for m in policy.mlp_extractor.policy_net if isinstance(m, nn.Linear)]
+    for i, layer in enumerate(linear_layers):
+        # Torch speichert (out, in), NumPy rechnet mit x @ W, daher transponieren
+        arrays[f"W{i}"] = layer.weight.detach().cpu().numpy().T.astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+    arrays["action_W"] = policy.action_net.weight.detach().cpu().numpy().T.astype(np.float32)
+    arrays["action_b"] = policy.action_net.bias.detach().cpu().numpy().astype(np.float32)
+    arrays["n_layers"] = len(linear_layers)
+    arrays["activation"] = activation_names[policy.activation_fn]
+    return arrays
+
+
+def export_policy(model_path, out_path=None):
+    """
+    Export the actor network of a PPO ``MlpPolicy`` zip to a compact .npz file.
+
+    Args:
+        model_path (str): Path of the PPO zip.
+        out_path (str, optional): Target path. Defaults to the model path with the suffix .npz.
+
+    Returns:
+        str: The path of the written file.
+    """
+    from stable_baselines3 import PPO
+
+    model = PPO.load(model_path, device="cpu")
+    arrays = policy_arrays(model.policy)
+    if out_path is None:
+        out_path = (model_path[:-4] if model_path.endswith(".zip") else model_path) + ".npz"
+    np.savez_compressed(out_path, **arrays)
+    return out_path
+
+
+def check_parity(model_path, npz_path, n_samples=10_000, seed=0):
+    """
+    Compare the deterministic actions of the exported policy with ``model.predict``.
+
+    The observations are random 9-feature vectors with binary danger and direction flags
+    and food offsets in [-1, 1], i.e. the value ranges SnakeEnv produces.
+
+    Args:
+        model_path (str): Path of the PPO zip.
+        npz_path (str): Path of the exported .npz file.
+        n_samples (int, optional): Number of random observations.
+        seed (int, optional): Seed of the observation generator.
+
+    Returns:
+        int: Number of observations where the actions differ.
+    """
+    from stable_baselines3 import PPO
+
+    rng = np.random.default_rng(seed)
+    obs = np.zeros((n_samples, 9), dtype=np.float32)
+    obs[:, :3] = rng.integers(0, 2, (n_samples, 3))
+    obs[:, 3:5] = rng.uniform(-1, 1, (n_samples, 2))
+    obs[np.arange(n_samples), 5 + rng.integers(0, 4, n_samples)] = 1.0
+
+    model = PPO.load(model_path, device="cpu")
+    expected, _ = model.predict(obs, deterministic=True)
+    actual, _ = SnakePolicy.load(npz_path).predict(obs, deterministic=True)
+    return int((expected != actual).sum())
+
+
+if __name__ == "__main__":
+    # Die Argumente sind in snake.py definiert (python src/snake.py export --help)
+    from snake import main
+    main(["export", *sys.argv[1:]])
@@ -0,0 +1,295 @@
+import argparse
+import time
+import numpy as np
+from numpy_policy import SnakePolicy, load_model, policy_arrays
+from snake_env import DIRECTION_ARRAY, DIRECTION_INDEX, SnakeEnv, batch_observations
+
+# Relative Züge pro Knoten: geradeaus, rechts, links (ein U-Turn ist nie sinnvoll)
+TURNS = np.array([0, 1, 3], dtype=np.int64)
+
+
+class SearchPlanner:
+    """
+    Policy-guided beam search over cheap clones of the game state.
+
+    From the current state the planner expands all nodes of the beam by one step at a time:
+    every node is an array-backed copy of the game (wall-padded occupancy grid and a ring
+    buffer of the body cells), so cloning is a fancy-indexing copy of a few rows and a whole
+    level is simulated with NumPy operations. The policy rates all nodes of a level in one
+    batched forward pass; children are ranked by eaten food plus the log-probability of their
+    action sequence, and the best ``beam_width`` are kept. Nodes whose head cannot reach enough
+    free cells for the body (flood fill) and cannot reach the tail either are pruned as trapped.
+
+    The search stops at ``max_depth``, when the beam dies out, or when the next level would
+    exceed ``time_budget_ms``; the first action of the best node of the deepest level is played.
+    Food that appears after an apple is eaten is unknown to the planner, so deeper levels only
+    value survival and the policy prior.
+
+    Args:
+        model (object): A PPO MlpPolicy model or a SnakePolicy; PPO models are converted to the
+                        NumPy runtime, the planner needs the action probabilities of many nodes.
+        beam_width (int, optional): Nodes kept per level.
+        max_depth (int, optional): Maximum lookahead in steps.
+        time_budget_ms (float, optional): Time budget per move in milliseconds.
+        prior_weight (float, optional): Weight of the policy log-probability against one apple.
+
+    Attributes:
+        last_stats (dict): Depth, expanded nodes and time of the last ``plan`` call.
+    """
+    def __init__(self, model, beam_width=64, max_depth=40, time_budget_ms=50.0, prior_weight=0.1):
+        if isinstance(model, SnakePolicy):
+            self.policy = model
+        else:
+            self.policy = SnakePolicy.from_arrays(policy_arrays(model.policy))
+        self.beam_width = beam_width
+        self.max_depth = max_depth
+        self.time_budget = time_budget_ms / 1000.0
+        self.prior_weight = prior_weight
+        self.last_stats = {}
+
+    def _root(self, env):
+        """Build the single-node beam of the current state of ``env``."""
+        cols, rows = env.cols, env.rows
+        self._cols, self._rows = cols, rows
+        self._padded_cols = cols + 2
+        self._cells = cols * rows
+        length = len(env.snake)
+        ring = np.zeros((1, self._cells), dtype=np.int32)
+        # Ring von hinten nach vorne: Schwanz an Position 0, Kopf an Position length - 1
+        body = np.array(env.snake, dtype=np.int64).reshape(-1, 2)[::-1]
+        ring[0, :length] = (body[:, 1] + 1) * self._padded_cols + body[:, 0] + 1
+        return {
+            "blocked": env._blocked.copy()[None],
+            "ring": ring,
+            "head_ptr": np.array([length - 1]),
+            "length": np.array([length]),
+            "head": np.array([env.snake[0]], dtype=np.int64),
+            "direction": np.array([DIRECTION_INDEX[env.direction]]),
+            "food": np.array([env.food], dtype=np.int64),
+            "has_food": np.array([not env.won]),
+            "eaten": np.zeros(1, dtype=np.int64),
+            "logp": np.zeros(1),
+            "first": np.zeros(1, dtype=np.int64),
+        }
+
+    def _log_probs(self, beam):
+        """Log-probabilities of the four actions for every node, shape (n, 4)."""
+        # Ohne bekanntes Essen zeigt die Beobachtung dx = dy = 0
+        food = np.where(beam["has_food"][:, None], beam["food"], beam["head"])
+        obs = batch_observations(beam["head"], beam["direction"], food, beam["blocked"])
+        logits = self.policy.action_logits(obs)
+        logits = logits - logits.max(axis=1, keepdims=True)
+        return logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+
+    def _expand(self, beam, depth):
+        """
+        Expand every node by its three moves and keep the best surviving children.
+
+        Returns:
+            dict: The new beam, empty (no nodes) if every child dies.
+        """
+        n = len(beam["head"])
+        log_probs = self._log_probs(beam)
+        parents = np.repeat(np.arange(n), len(TURNS))
+        directions = (beam["direction"][parents] + np.tile(TURNS, n)) % 4
+        heads = beam["head"][parents] + DIRECTION_ARRAY[directions]
+        flat = (heads[:, 1] + 1) * self._padded_cols + heads[:, 0] + 1
+        # Wand und Körper sind im gepolsterten Gitter belegt; auch das Schwanzfeld zählt als Kollision
+        alive = ~beam["blocked"].reshape(n, -1)[parents, flat]
+        parents, directions, heads, flat = parents[alive], directions[alive], heads[alive], flat[alive]
+        if len(parents) == 0:
+            return None
+        eats = beam["has_food"][parents] & (heads == beam["food"][parents]).all(axis=1)
+        eaten = beam["eaten"][parents] + eats
+        logp = beam["logp"][parents] + log_probs[parents, directions]
+        value = eaten + self.prior_weight * logp
+        if len(parents) > self.beam_width:
+            keep = np.argpartition(-value, self.beam_width - 1)[:self.beam_width]
+            parents, directions, heads, flat = parents[keep], directions[keep], heads[keep], flat[keep]
+            eats, eaten, logp = eats[keep], eaten[keep], logp[keep]
+
+        # Kinder als Kopien der Elternzeilen, danach den Zug anwenden
+        k = len(parents)
+        rows = np.arange(k)
+        blocked = beam["blocked"][parents]
+        ring = beam["ring"][parents]
+        length = beam["length"][parents]
+        head_ptr = beam["head_ptr"][parents]
+        tails = ring[rows, (head_ptr - length + 1) % self._cells]
+        blocked_flat = blocked.reshape(k, -1)
+        blocked_flat[rows, flat] = True
+        moved = ~eats
+        blocked_flat[rows[moved], tails[moved]] = False
+        head_ptr = (head_ptr + 1) % self._cells
+        ring[rows, head_ptr] = flat
+        return {
+            "blocked": blocked,
+            "ring": ring,
+            "head_ptr": head_ptr,
+            "length": length + eats,
+            "head": heads,
+            "direction": directions,
+            "food": beam["food"][parents],
+            "has_food": beam["has_food"][parents] & ~eats,
+            "eaten": eaten,
+            "logp": logp,
+            "first": directions if depth == 0 else beam["first"][parents],
+        }
+
+    def _trapped(self, beam):
+        """
+        Flood fill from every head: a node is trapped if fewer free cells than body segments are
+        reachable and the tail is not adjacent to the reachable region.
+
+        Every board row is one uint64 bit mask, so a fill step of all nodes is a handful of shifts
+        over an array of shape (n, rows + 2). Boards wider than 62 columns use boolean grids.
+        """
+        if self._padded_cols > 64:
+            return self._trapped_dense(beam)
+        k = len(beam["head"])
+        rows = np.arange(k)
+        # Freie Felder als Bitmaske pro Zeile (Bit x = Spalte x im gepolsterten Gitter)
+        packed = np.zeros((k, self._rows + 2, 8), dtype=np.uint8)
+        packed[:, :, :-(-self._padded_cols // 8)] = np.packbits(~beam["blocked"], axis=2, bitorder="little")
+        free = packed.view("<u8")[:, :, 0]
+        head_y = beam["head"][:, 1] + 1
+        head_bits = np.left_shift(np.uint64(1), (beam["head"][:, 0] + 1).astype(np.uint64))
+        # Der Kopf selbst ist belegt, die Füllung startet trotzdem dort
+        free[rows, head_y] |= head_bits
+        reach = np.zeros_like(free)
+        reach[rows, head_y] = head_bits
+        one = np.uint64(1)
+        while True:
+            grown = reach | (reach << one) | (reach >> one)
+            grown[:, 1:] |= reach[:, :-1]
+            grown[:, :-1] |= reach[:, 1:]
+            grown &= free
+            if np.array_equal(grown, reach):
+                break
+            reach = grown
+        reach = np.unpackbits(reach.astype("<u8").view(np.uint8).reshape(k, self._rows + 2, 8), axis=2,
+                              bitorder="little")[:, :, :self._padded_cols].astype(bool)
+        return self._trapped_from_reach(beam, reach)
+
+    def _trapped_dense(self, beam):
+        """``_trapped`` on boolean grids, for boards too wide for 64-bit row masks."""
+        k = len(beam["head"])
+        free = ~beam["blocked"]
+        rows = np.arange(k)
+        heads = (beam["head"][:, 1] + 1) * self._padded_cols + beam["head"][:, 0] + 1
+        reach = np.zeros_like(free)
+        reach.reshape(k, -1)[rows, heads] = True
+        free.reshape(k, -1)[rows, heads] = True
+        while True:
+            grown = reach.copy()
+            grown[:, 1:, :] |= reach[:, :-1, :]
+            grown[:, :-1, :] |= reach[:, 1:, :]
+            grown[:, :, 1:] |= reach[:, :, :-1]
+            grown[:, :, :-1] |= reach[:, :, 1:]
+            grown &= free
+            if np.array_equal(grown, reach):
+                break
+            reach = grown
+        return self._trapped_from_reach(beam, reach)
+
+    def _trapped_from_reach(self, beam, reach):
+        """Evaluate the trapped condition from the filled region (boolean, padded grid, head included)."""
+        k = len(beam["head"])
+        rows = np.arange(k)
+        reach_flat = reach.reshape(k, -1)
+        area = reach_flat.sum(axis=1) - 1
+        tails = beam["ring"][rows, (beam["head_ptr"] - beam["length"] + 1) % self._cells]
+        neighbours = tails[:, None] + np.array([1, -1, self._padded_cols, -self._padded_cols])
+        tail_reachable = reach_flat[rows[:, None], neighbours].any(axis=1)
+        return (area < beam["length"]) & ~tail_reachable
+
+    @staticmethod
+    def _select(beam, mask):
+        return {key: value[mask] for key, value in beam.items()}
+
+    def plan(self, env):
+        """
+        Choose the next action for the current state of ``env``.
+
+        Args:
+            env (SnakeEnv): The environment; it is only read, never stepped.
+
+        Returns:
+            int: The action (direction index, 0 = up, 1 = right, 2 = down, 3 = left).
+        """
+        start = time.perf_counter()
+        beam = self._root(env)
+        best, depth, nodes, level_time = None, 0, 0, 0.0
+        while depth < self.max_depth:
+            level_start = time.perf_counter()
+            # Abbrechen, wenn die nächste Ebene das Zeitbudget voraussichtlich überschreitet
+            if level_start - start + level_time > self.time_budget and best is not None:
+                break
+            children = self._expand(beam, depth)
+            if children is None:
+                break
+            trapped = self._trapped(children)
+            if not trapped.all():
+                children = self._select(children, ~trapped)
+            nodes += len(children["head"])
+            beam = children
+            value = beam["eaten"] + self.prior_weight * beam["logp"]
+            best = int(beam["first"][np.argmax(value)])
+            depth += 1
+            level_time = time.perf_counter() - level_start
+            if trapped.all():
+                break
+        self.last_stats = {"depth": depth, "nodes": nodes, "time_ms": (time.perf_counter() - start) * 1e3}
+        if best is None:
+            # Jeder Zug endet sofort tödlich: die Wahl ist egal
+            return DIRECTION_INDEX[env.direction]
+        return best
+
+
+def play_planner_episodes(planner, num_episodes, seed=0, verbose=False):
+    """
+    Play episodes with the planner, one after another.
+
+    Args:
+        planner (SearchPlanner): The planner.
+        num_episodes (int): Number of episodes, episode i uses seed ``seed + i``.
+        seed (int, optional): Base seed.
+        verbose (bool, optional): Print score and planning time after every episode.
+
+    Returns:
+        tuple: (scores, lengths) as np.ndarray, like ``evaluation.play_episodes``.
+    """
+    env = SnakeEnv()
+    scores = np.zeros(num_episodes, dtype=np.int64)
+    lengths = np.zeros(num_episodes, dtype=np.int64)
+    for i in range(num_episodes):
+        env.reset(seed=seed + i)
+        done, steps, plan_time = False, 0, 0.0
+        while not done:
+            action = planner.plan(env)
+            plan_time += planner.last_stats["time_ms"]
+            _, _, terminated, truncated, _ = env.step(action)
+            done = terminated or truncated
+            steps += 1
+        scores[i], lengths[i] = env.score, steps
+        if verbose:
+            print(f"Episode {i}: score {env.score}, {steps} steps, {plan_time / steps:.1f} ms per move")
+    return scores, lengths
+
+
+if __name__ == "__main__":
+    from evaluation import format_summary, summarize_scores
+
+    parser = argparse.ArgumentParser(description="Play episodes with the policy-guided search planner.")
+    parser.add_argument('model', type=str, help="Path of the model (.zip or .npz)")
+    parser.add_argument('--episodes', type=int, default=10, help="Number of episodes")
+    parser.add_argument('--seed', type=int, default=0, help="Base seed of the episodes")
+    parser.add_argument('--beam-width', type=int, default=64, help="Nodes kept per search level")
+    parser.add_argument('--depth', type=int, default=40, help="Maximum lookahead in steps")
+    parser.add_argument('--budget-ms', type=float, default=50.0, help="Time budget per move in milliseconds")
+    args = parser.parse_args()
+
+    planner = SearchPlanner(load_model(args.model), beam_width=args.beam_width, max_depth=args.depth,
+                            time_budget_ms=args.budget_ms)
+    scores, lengths = play_planner_episodes(planner, args.episodes, seed=args.seed, verbose=True)
+    print(format_summary(summarize_scores(scores, lengths)))
@@ -0,0 +1,349 @@
+import argparse
+import mmap
+import os
+import struct
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from snake_env import DIRECTIONS, DIRECTION_INDEX, SnakeEnv, decode_body, encode_body, pack_codes, unpack_codes
+
+# Dateikopf: Magic, Version, Spalten, Zeilen, Keyframe-Intervall
+FILE_HEADER = struct.Struct("<4sBBBH")
+MAGIC = b"SNKR"
+VERSION = 1
+# Episodenkopf: Schritte, Seed (-1 = keiner), Anzahl Essen, Anzahl Keyframes, Score, Flags, Startzelle x/y
+EPISODE_HEADER = struct.Struct("<IqIIHHBB")
+# Keyframe: Schritt, Score, Richtung, Länge, Kopf x/y; danach (Länge - 1) 2-Bit-Codes des Körpers
+KEYFRAME_HEADER = struct.Struct("<IHBHBB")
+FLAG_DEAD = 1
+FLAG_WON = 2
+REPLAY_SUFFIX = ".snkr"
+
+
+class EpisodeRecorder:
+    """
+    Appends episodes to a replay file.
+
+    Per episode only the seed, the start cell, the direction after every step (2 bits, equivalent
+    to the action without U-turns), the food positions and every ``keyframe_interval`` steps a
+    keyframe are stored. A record is written with a single append when the episode ends, so the
+    file stays readable if a run is interrupted.
+
+    Usage::
+
+        recorder = EpisodeRecorder("replays/eval.snkr", env.cols, env.rows)
+        obs, _ = env.reset(seed=seed)
+        recorder.start(env, seed)
+        while not done:
+            obs, reward, terminated, truncated, info = env.step(action)
+            recorder.record_step(env)
+        recorder.end(env)
+
+    Args:
+        path (str): Replay file; created with a file header if it does not exist.
+        cols (int): Board width in cells.
+        rows (int): Board height in cells.
+        keyframe_interval (int, optional): Steps between two keyframes; bounds the work of a seek.
+    """
+    def __init__(self, path, cols, rows, keyframe_interval=64):
+        self.path = path
+        self.cols = cols
+        self.rows = rows
+        self.keyframe_interval = keyframe_interval
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                magic, version, file_cols, file_rows, interval = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            if magic != MAGIC or (file_cols, file_rows) != (cols, rows):
+                raise ValueError(f"{path} ist keine Replay-Datei für ein {cols}x{rows}-Spielfeld")
+            self.keyframe_interval = interval
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(FILE_HEADER.pack(MAGIC, VERSION, cols, rows, keyframe_interval))
+
+    def start(self, env, seed=None):
+        """Begin an episode; call right after ``env.reset``."""
+        self._seed = -1 if seed is None else seed
+        self._start = env.snake[0]
+        self._codes = []
+        self._foods = [env.food]
+        self._keyframes = []
+
+    def record_step(self, env):
+        """Record the step that was just taken."""
+        self._codes.append(DIRECTION_INDEX[env.direction])
+        if env.food != self._foods[-1] and not env.won:
+            self._foods.append(env.food)
+        if len(self._codes) % self.keyframe_interval == 0:
+            head, body = encode_body(env.snake)
+            self._keyframes.append(KEYFRAME_HEADER.pack(len(self._codes), env.score, DIRECTION_INDEX[env.direction],
+                                                        len(env.snake), head[0], head[1]) + body)
+
+    def end(self, env):
+        """Write the episode to the file."""
+        flags = (FLAG_DEAD if env.done and not env.won else 0) | (FLAG_WON if env.won else 0)
+        offsets = np.zeros(len(self._keyframes), dtype=np.uint32)
+        position = 0
+        for i, keyframe in enumerate(self._keyframes):
+            offsets[i] = position
+            position += len(keyframe)
+        record = b"".join([
+            EPISODE_HEADER.pack(len(self._codes), self._seed, len(self._foods), len(self._keyframes),
+                                env.score, flags, self._start[0], self._start[1]),
+            pack_codes(self._codes),
+            np.array(self._foods, dtype=np.uint8).tobytes(),
+            offsets.tobytes(),
+            b"".join(self._keyframes),
+        ])
+        with open(self.path, "ab") as f:
+            f.write(record)
+
+
+class Replay:
+    """
+    One recorded episode. ``state_at(step)`` decodes the nearest keyframe and simulates at
+    most ``keyframe_interval - 1`` steps from there, independent of the episode length.
+
+    Attributes:
+        n_steps (int): Number of steps of the episode.
+        seed (int): Seed of the episode, or None.
+        score (int): Final score.
+        dead (bool): The episode ended with a collision.
+        won (bool): The board was filled.
+    """
+    def __init__(self, buffer, offset, cols, rows, keyframe_interval):
+        self.cols = cols
+        self.rows = rows
+        self.keyframe_interval = keyframe_interval
+        (self.n_steps, seed, n_food, n_keyframes, self.score, flags,
+         start_x, start_y) = EPISODE_HEADER.unpack_from(buffer, offset)
+        self.seed = None if seed < 0 else seed
+        self.dead = bool(flags & FLAG_DEAD)
+        self.won = bool(flags & FLAG_WON)
+        self.start = (start_x, start_y)
+        position = offset + EPISODE_HEADER.size
+        codes_size = -(-self.n_steps // 4)
+        self._codes = buffer[position:position + codes_size]
+        position += codes_size
+        # Slices einer mmap sind Kopien, so bleibt die Datei schliessbar
+        food_bytes = buffer[position:position + 2 * n_food]
+        self.foods = list(zip(food_bytes[0::2], food_bytes[1::2]))
+        position += 2 * n_food
+        self._keyframe_offsets = np.frombuffer(buffer[position:position + 4 * n_keyframes], dtype=np.uint32)
+        position += 4 * n_keyframes
+        self._keyframes_start = position
+        self._buffer = buffer
+        self.size = position - offset + self._keyframes_size(n_keyframes)
+        self._directions = None
+
+    def _keyframes_size(self, n_keyframes):
+        if n_keyframes == 0:
+            return 0
+        last = self._keyframes_start + int(self._keyframe_offsets[-1])
+        length = KEYFRAME_HEADER.unpack_from(self._buffer, last)[3]
+        return int(self._keyframe_offsets[-1]) + KEYFRAME_HEADER.size + -(-(length - 1) // 4)
+
+    @property
+    def directions(self):
+        """Direction index after every step, shape (n_steps,)."""
+        if self._directions is None:
+            self._directions = unpack_codes(self._codes, self.n_steps)
+        return self._directions
+
+    def _keyframe(self, index):
+        position = self._keyframes_start + int(self._keyframe_offsets[index])
+        step, score, direction, length, head_x, head_y = KEYFRAME_HEADER.unpack_from(self._buffer, position)
+        body_start = position + KEYFRAME_HEADER.size
+        body = decode_body((head_x, head_y), self._buffer[body_start:body_start + -(-(length - 1) // 4)], length)
+        return step, score, direction, body
+
+    def state_at(self, step):
+        """
+        Reconstruct the game state after ``step`` steps (0 = start of the episode).
+
+        Returns:
+            dict: Same layout as the web viewer keyframe: cols, rows, snake (head first), food,
+                  score, direction and dead.
+        """
+        step = max(0, min(step, self.n_steps))
+        k = min(step // self.keyframe_interval, len(self._keyframe_offsets))
+        if k > 0:
+            t, score, direction, body = self._keyframe(k - 1)
+        else:
+            t, score, direction, body = 0, 0, 1, [self.start]  # Start wie in SnakeEnv.reset
+        snake = deque(body)
+        occupied = set(body)
+        dead = False
+        directions = self.directions
+        while t < step:
+            direction = int(directions[t])
+            dx, dy = DIRECTIONS[direction]
+            head = (snake[0][0] + dx, snake[0][1] + dy)
+            t += 1
+            if not (0 <= head[0] < self.cols and 0 <= head[1] < self.rows) or head in occupied:
+                dead = True  # Kollision: Schlange bleibt stehen, Episode ist zu Ende
+                break
+            snake.appendleft(head)
+            occupied.add(head)
+            if head == self.foods[min(score, len(self.foods) - 1)]:
+                score += 1
+            else:
+                occupied.discard(snake.pop())
+        if step == self.n_steps and self.dead:
+            dead = True
+        return {
+            'cols': self.cols,
+            'rows': self.rows,
+            'snake': [list(cell) for cell in snake],
+            'food': list(self.foods[min(score, len(self.foods) - 1)]),
+            'score': score,
+            'direction': direction,
+            'dead': dead,
+        }
+
+
+class ReplayFile:
+    """
+    Read-only, memory-mapped view of a replay file.
+
+    Opening the file scans only the episode headers to build an offset index; episode data is
+    read from the memory map on demand.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.cols, self.rows, self.keyframe_interval = FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} ist keine Replay-Datei")
+        self._offsets = []
+        offset = FILE_HEADER.size
+        while offset + EPISODE_HEADER.size <= len(self._mmap):
+            self._offsets.append(offset)
+            offset += self._episode(len(self._offsets) - 1).size
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        return self._episode(index)
+
+    def _episode(self, index):
+        return Replay(self._mmap, self._offsets[index], self.cols, self.rows, self.keyframe_interval)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayLibrary:
+    """
+    The replay files under a directory, kept open while they do not change.
+
+    A file that grew (episodes were appended) is reopened on the next access. Files are used
+    through ``open``, which counts the requests reading each ReplayFile, so a superseded file
+    is closed as soon as the last request that still reads it is done.
+    """
+    def __init__(self, replays_dir="./replays"):
+        self.replays_dir = replays_dir
+        self._open = {}  # name -> (size, ReplayFile)
+        self._users = {}  # ReplayFile -> Anzahl Anfragen, die sie gerade lesen
+        self._lock = threading.Lock()
+
+    def list_files(self):
+        """Return the replay file names (relative to the directory), sorted."""
+        names = []
+        for root, dirs, files in os.walk(self.replays_dir):
+            for file in files:
+                if file.endswith(REPLAY_SUFFIX):
+                    names.append(os.path.relpath(os.path.join(root, file), self.replays_dir).replace(os.sep, "/"))
+        return sorted(names)
+
+    @contextmanager
+    def open(self, name):
+        """
+        Context manager that yields the ReplayFile of a name as returned by ``list_files``.
+
+        The file (and the Replays taken from it) must only be used inside the ``with`` block.
+        """
+        if os.path.isabs(name) or ".." in name.split("/") or not name.endswith(REPLAY_SUFFIX):
+            raise ValueError(f"Ungültiger Replay-Name '{name}'")
+        path = os.path.join(self.replays_dir, name)
+        size = os.path.getsize(path)
+        with self._lock:
+            cached = self._open.get(name)
+            if cached is not None and cached[0] == size:
+                replays = cached[1]
+            else:
+                replays = ReplayFile(path)
+                self._open[name] = (size, replays)
+                if cached is not None and cached[1] not in self._users:
+                    cached[1].close()
+            self._users[replays] = self._users.get(replays, 0) + 1
+        try:
+            yield replays
+        finally:
+            with self._lock:
+                self._users[replays] -= 1
+                if self._users[replays] == 0:
+                    del self._users[replays]
+                    # Inzwischen durch eine neuere Version ersetzt: niemand liest sie mehr
+                    if self._open.get(name, (None, None))[1] is not replays:
+                        replays.close()
+
+
+
+def record_episodes(model, path, num_episodes, seed=0, keyframe_interval=64):
+    """
+    Play episodes with a model on SnakeEnv and append them to a replay file.
+
+    Episode i is played with seed ``seed + i``.
+
+    Returns:
+        list: The scores of the recorded episodes.
+    """
+    env = SnakeEnv()
+    recorder = EpisodeRecorder(path, env.cols, env.rows, keyframe_interval)
+    if hasattr(model, "set_random_seed"):
+        model.set_random_seed(seed)
+    scores = []
+    for i in range(num_episodes):
+        obs, _ = env.reset(seed=seed + i)
+        recorder.start(env, seed + i)
+        done = False
+        while not done:
+            action, _states = model.predict(obs)
+            obs, reward, terminated, truncated, info = env.step(action)
+            recorder.record_step(env)
+            done = terminated or truncated
+        recorder.end(env)
+        scores.append(env.score)
+    return scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show information about a replay file.")
+    parser.add_argument('path', type=str, help="Replay file")
+    parser.add_argument('--episode', type=int, default=None, help="Print the final board of this episode")
+    args = parser.parse_args()
+
+    with ReplayFile(args.path) as replays:
+        steps = sum(replay.n_steps for replay in replays)
+        size = os.path.getsize(args.path)
+        print(f"{len(replays)} episodes, {steps} steps, {size} bytes ({size / max(steps, 1):.2f} bytes/step)")
+        if args.episode is not None:
+            replay = replays[args.episode]
+            state = replay.state_at(replay.n_steps)
+            print(f"Episode {args.episode}: seed {replay.seed}, {replay.n_steps} steps, score {replay.score}")
+            grid = [["." for _ in range(replay.cols)] for _ in range(replay.rows)]
+            grid[state['food'][1]][state['food'][0]] = "F"
+            for i, (x, y) in enumerate(state['snake']):
+                grid[y][x] = ("X" if state['dead'] else "H") if i == 0 else "S"
+            print("\n".join(" ".join(row) for row in grid))
@@ -0,0 +1,218 @@
+import multiprocessing as mp
+import numpy as np
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+
+def _worker(remote, parent_remote, env_fn_wrappers, buffers, start, obs_shape, obs_dtype):
+    """
+    Worker loop: steps a group of environments and writes the results into the shared buffers.
+
+    Only short commands travel through the pipe; observations, actions, rewards and done flags
+    are exchanged through shared memory. Each worker owns the rows ``start:start + len(envs)``.
+    """
+    parent_remote.close()
+    envs = [env_fn() for env_fn in env_fn_wrappers.var]
+    rows = slice(start, start + len(envs))
+    n_total = len(buffers["rewards"])
+    obs = np.frombuffer(buffers["obs"], dtype=obs_dtype).reshape((n_total,) + obs_shape)[rows]
+    terminal_obs = np.frombuffer(buffers["terminal_obs"], dtype=obs_dtype).reshape((n_total,) + obs_shape)[rows]
+    actions = np.frombuffer(buffers["actions"], dtype=np.int64)[rows]
+    rewards = np.frombuffer(buffers["rewards"], dtype=np.float32)[rows]
+    dones = np.frombuffer(buffers["dones"], dtype=np.bool_)[rows]
+    truncs = np.frombuffer(buffers["truncs"], dtype=np.bool_)[rows]
+    scores = np.frombuffer(buffers["scores"], dtype=np.int64)[rows]
+    food_retries = np.frombuffer(buffers["food_retries"], dtype=np.int64)[rows]
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                for j, env in enumerate(envs):
+                    observation, reward, terminated, truncated, info = env.step(actions[j])
+                    done = terminated or truncated
+                    rewards[j] = reward
+                    dones[j] = done
+                    truncs[j] = truncated and not terminated
+                    scores[j] = info.get("score", 0)
+                    food_retries[j] = info.get("food_retries", -1)  # -1: nicht gemeldet
+                    if done:
+                        # letzte Beobachtung sichern, dann zurücksetzen
+                        terminal_obs[j] = observation
+                        observation, _ = env.reset()
+                    obs[j] = observation
+                remote.send(None)
+            elif cmd == "reset":
+                for j, env in enumerate(envs):
+                    observation, _ = env.reset(seed=data[j])
+                    obs[j] = observation
+                remote.send(None)
+            elif cmd == "close":
+                for env in envs:
+                    env.close()
+                remote.close()
+                break
+            elif cmd == "env_method":
+                local, name, args, kwargs = data
+                remote.send([getattr(envs[j], name)(*args, **kwargs) for j in local])
+            elif cmd == "get_attr":
+                local, name = data
+                remote.send([getattr(envs[j], name) for j in local])
+            elif cmd == "is_wrapped":
+                local, wrapper_class = data
+                remote.send([is_wrapped(envs[j], wrapper_class) for j in local])
+            elif cmd == "set_attr":
+                local, name, value = data
+                for j in local:
+                    setattr(envs[j], name, value)
+                remote.send(None)
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+
+class ShmVecEnv(VecEnv):
+    """
+    Multi-process vectorized environment that exchanges data through shared memory.
+
+    The environments are split into ``n_workers`` groups, each stepped by its own process. Unlike
+    ``SubprocVecEnv``, observations are not pickled through pipes: every worker writes directly
+    into a shared observation buffer and the pipe only carries a short "step" command. Grouping
+    several cheap envs per process keeps the per-step IPC overhead small.
+
+    The info dict of each env is reduced to ``{"score": ...}`` (plus ``food_retries`` when the env
+    reports it, and ``terminal_observation`` and ``TimeLimit.truncated`` at the end of an
+    episode), which is all ``SnakeEnv`` reports.
+
+    Args:
+        env_fns (list): Callables that create the environments.
+        n_workers (int, optional): Number of worker processes. Defaults to ``min(len(env_fns), cpu_count)``.
+        start_method (str, optional): multiprocessing start method. Defaults to 'forkserver' if
+                                      available, otherwise 'spawn'.
+    """
+    render_mode = None
+
+    def __init__(self, env_fns, n_workers=None, start_method=None):
+        self.closed = False
+        n_envs = len(env_fns)
+        n_workers = min(n_workers or mp.cpu_count(), n_envs)
+
+        # Beobachtungs- und Aktionsraum einmal im Hauptprozess bestimmen, um die Puffer anzulegen
+        probe_env = env_fns[0]()
+        observation_space, action_space = probe_env.observation_space, probe_env.action_space
+        probe_env.close()
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        obs_shape = observation_space.shape
+        obs_dtype = np.dtype(observation_space.dtype)
+        obs_size = n_envs * int(np.prod(obs_shape))
+        self._buffers = {
+            "obs": ctx.RawArray(np.ctypeslib.as_ctypes_type(obs_dtype), obs_size),
+            "terminal_obs": ctx.RawArray(np.ctypeslib.as_ctypes_type(obs_dtype), obs_size),
+            "actions": ctx.RawArray("q", n_envs),
+            "rewards": ctx.RawArray("f", n_envs),
+            "dones": ctx.RawArray("b", n_envs),
+            "truncs": ctx.RawArray("b", n_envs),
+            "scores": ctx.RawArray("q", n_envs),
+            "food_retries": ctx.RawArray("q", n_envs),
+        }
+        self._obs = np.frombuffer(self._buffers["obs"], dtype=obs_dtype).reshape((n_envs,) + obs_shape)
+        self._terminal_obs = np.frombuffer(self._buffers["terminal_obs"], dtype=obs_dtype).reshape((n_envs,) + obs_shape)
+        self._actions = np.frombuffer(self._buffers["actions"], dtype=np.int64)
+        self._rewards = np.frombuffer(self._buffers["rewards"], dtype=np.float32)
+        self._dones = np.frombuffer(self._buffers["dones"], dtype=np.bool_)
+        self._truncs = np.frombuffer(self._buffers["truncs"], dtype=np.bool_)
+        self._scores = np.frombuffer(self._buffers["scores"], dtype=np.int64)
+        self._food_retries = np.frombuffer(self._buffers["food_retries"], dtype=np.int64)
+
+        # Envs möglichst gleichmässig auf die Worker verteilen
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        self._groups = [range(bounds[w], bounds[w + 1]) for w in range(n_workers)]
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_workers)])
+        self.processes = []
+        for group, work_remote, remote in zip(self._groups, self.work_remotes, self.remotes):
+            fns = CloudpickleWrapper([env_fns[i] for i in group])
+            args = (work_remote, remote, fns, self._buffers, group.start, obs_shape, obs_dtype)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        super().__init__(n_envs, observation_space, action_space)
+
+    def _broadcast(self, cmd, data_per_worker=None):
+        """Send a command to all workers and collect their replies."""
+        for w, remote in enumerate(self.remotes):
+            remote.send((cmd, None if data_per_worker is None else data_per_worker[w]))
+        return [remote.recv() for remote in self.remotes]
+
+    def _local_indices(self, indices):
+        """Map global env indices to (worker, [local indices]) pairs."""
+        targets = {}
+        for i in self._get_indices(indices):
+            for w, group in enumerate(self._groups):
+                if i in group:
+                    targets.setdefault(w, []).append(i - group.start)
+        return targets.items()
+
+    def reset(self):
+        seeds = [[self._seeds[i] for i in group] for group in self._groups]
+        self._broadcast("reset", seeds)
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def step_async(self, actions):
+        self._actions[:] = np.asarray(actions).reshape(self.num_envs)
+        for remote in self.remotes:
+            remote.send(("step", None))
+
+    def step_wait(self):
+        for remote in self.remotes:
+            remote.recv()
+        infos = [{"score": int(score)} for score in self._scores]
+        for i in np.flatnonzero(self._food_retries >= 0):
+            infos[i]["food_retries"] = int(self._food_retries[i])
+        for i in np.flatnonzero(self._dones):
+            infos[i]["terminal_observation"] = self._terminal_obs[i].copy()
+            infos[i]["TimeLimit.truncated"] = bool(self._truncs[i])
+        return self._obs.copy(), self._rewards.copy(), self._dones.copy(), infos
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def get_attr(self, attr_name, indices=None):
+        results = []
+        for w, local in self._local_indices(indices):
+            self.remotes[w].send(("get_attr", (local, attr_name)))
+            results.extend(self.remotes[w].recv())
+        return results
+
+    def set_attr(self, attr_name, value, indices=None):
+        for w, local in self._local_indices(indices):
+            self.remotes[w].send(("set_attr", (local, attr_name, value)))
+            self.remotes[w].recv()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        results = []
+        for w, local in self._local_indices(indices):
+            self.remotes[w].send(("env_method", (local, method_name, method_args, method_kwargs)))
+            results.extend(self.remotes[w].recv())
+        return results
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        results = []
+        for w, local in self._local_indices(indices):
+            self.remotes[w].send(("is_wrapped", (local, wrapper_class)))
+            results.extend(self.remotes[w].recv())
+        return results
@@ -0,0 +1,248 @@
+"""
+Command line entry point for training, evaluation, the web viewer, the policy export and the benchmarks.
+
+    python src/snake.py train --timesteps 100000 --config config2
+    python src/snake.py expert --out data/expert --episodes 1000
+    python src/snake.py eval --load ppo_snake_config2
+    python src/snake.py serve --preload
+    python src/snake.py export models/ppo_snake_config2.zip
+    python src/snake.py bench --suite env --quick
+
+This module only imports the standard library; stable-baselines3, torch and Flask are imported by the
+subcommand that needs them, so ``--help`` and argument errors return immediately. The scripts train.py,
+test.py, app.py, expert.py, numpy_policy.py and benchmark.py delegate their ``__main__`` to this parser and stay
+importable as libraries without side effects.
+"""
+import argparse
+import json
+import sys
+
+
+def cmd_train(args):
+    from train import get_config_by_name, train_ppo, CONFIG_PATH
+
+    config_path = args.config_file or CONFIG_PATH
+    try:
+        config = get_config_by_name(args.config, config_path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+    curriculum = None
+    if args.curriculum:
+        from snake_env import parse_board_size
+        curriculum = [parse_board_size(size) for size in args.curriculum.split(",")]
+
+    ppo_model = None
+    # Geladen wird nur das Modell, nicht die Config: das Ergebnis wird unter dem Namen der Config gespeichert
+    # (train --load ppo_snake_config2_base --config config2 speichert als ppo_snake_config2)
+    if args.load is not None:
+        from stable_baselines3 import PPO
+        print("lodaded model: ", args.load)
+        ppo_model = PPO.load("./models/" + args.load)
+
+    if args.timesteps:
+        print("timesteps: ", args.timesteps)
+        train_ppo(total_timesteps=args.timesteps, model=ppo_model,
+                  n_envs=args.n_envs, vec_backend=args.vec_backend, seed=args.seed,
+                  instrument=args.instrument, profile_steps=args.profile,
+                  async_callbacks=not args.sync_callbacks, keep_last=args.keep_last,
+                  keep_best=args.keep_best, eval_episodes=args.eval_episodes,
+                  observation_mode=args.observation_mode, curriculum=curriculum,
+                  curriculum_patience=args.curriculum_patience, target_score=args.target_score,
+                  config=config, pretrain=args.pretrain, pretrain_epochs=args.pretrain_epochs)
+
+
+def cmd_expert(args):
+    from expert import generate_dataset
+    from snake_env import parse_board_size
+
+    cols, rows = parse_board_size(args.board)
+    manifest = generate_dataset(args.out, args.episodes, n_workers=args.workers, shard_size=args.shard_size,
+                                seed=args.seed, cols=cols, rows=rows)
+    print(f"{manifest['episodes']} expert episodes, {manifest['steps']} steps (mean score {manifest['mean_score']:.1f}) "
+          f"in {len(manifest['shards'])} shards under {args.out} ({manifest['wall_time_s']:.1f} s)")
+
+
+def cmd_eval(args):
+    from model_registry import ModelRegistry
+    from test import full_test, test_model
+
+    registry = ModelRegistry(args.models_dir, include_checkpoints=args.checkpoints)
+    if args.report:
+        from eval_cache import EvalCache, format_report
+        cache = EvalCache(args.cache, block_size=args.block_size)
+        print(format_report(cache.report(seed=args.seed)))
+        cache.close()
+    elif args.full_test:
+        cache = None
+        if not args.no_cache:
+            from eval_cache import EvalCache
+            cache = EvalCache(args.cache, block_size=args.block_size)
+        full_test(registry, args.episodes, n_workers=args.workers, seed=args.seed, numpy=args.numpy, out_path=args.out,
+                  cache=cache)
+        if cache is not None:
+            cache.close()
+        print(f"Full test completed. Results saved to {args.out}.")
+    elif args.load and args.record:
+        from replay import record_episodes
+        scores = record_episodes(registry.get(args.load), args.record, args.record_episodes, seed=args.seed)
+        print(f"Recorded {len(scores)} episodes (mean score {sum(scores) / len(scores):.2f}) to {args.record}.")
+    elif args.load:
+        planner_kwargs = None
+        if args.planner:
+            planner_kwargs = dict(beam_width=args.beam_width, max_depth=args.depth, time_budget_ms=args.planner_budget_ms)
+        print(test_model(args.load, num_episodes=args.episodes, seed=args.seed, planner_kwargs=planner_kwargs,
+                         registry=registry))
+    else:
+        print("Error: Either --load or --full_test must be specified.")
+
+
+def cmd_serve(args):
+    import app
+
+    app.run(preload=args.preload, cache_size=args.cache_size, tick_rate=args.tick_rate,
+            batch_window_ms=args.batch_window_ms, max_batch=args.max_batch, batching=not args.no_batching,
+            budget_ms=args.planner_budget_ms, beam_width=args.beam_width)
+
+
+def cmd_export(args):
+    import os
+    from numpy_policy import check_parity, export_policy
+
+    out_path = export_policy(args.model, args.out)
+    print(f"Exported policy to {out_path} ({os.path.getsize(out_path)} bytes)")
+    if not args.no_check:
+        mismatches = check_parity(args.model, out_path)
+        print(f"Parity check: {mismatches} mismatching actions")
+        if mismatches:
+            raise SystemExit(1)
+
+
+def cmd_bench(args):
+    from benchmark import compare_to_baseline, run_benchmarks
+
+    results = run_benchmarks([suite.strip() for suite in args.suite.split(",") if suite.strip()], quick=args.quick)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    for name, metric in results["metrics"].items():
+        print(f"{name:<40} {metric['value']:>14.2f} {metric['unit']}")
+    print(f"Results saved to {args.out}.")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for name, base, current, change in regressions:
+            print(f"REGRESSION {name}: {base:.2f} -> {current:.2f} ({change:+.1%})")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}.")
+
+
+def build_parser():
+    """
+    Create the argument parser with the subcommands train, expert, eval, serve, export and bench.
+
+    Returns:
+        argparse.ArgumentParser: The parser; ``args.func`` is the handler of the chosen subcommand.
+    """
+    parser = argparse.ArgumentParser(prog="snake", description="Reinforcement learning Snake: train, evaluate, serve, export and benchmark.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train = subparsers.add_parser("train", help="Train a PPO model", description="Train PPO model for Snake game.")
+    train.add_argument('--config', type=str, default="config2", help='Name of the PPO config in the config file')
+    train.add_argument('--config-file', type=str, default=None, help='TOML file with the PPO configs (default: ppo_configs.toml next to train.py)')
+    train.add_argument('--load', type=str, default=None, help='Path to the model to load')
+    train.add_argument('--timesteps', type=int, default=10_000, help='Number of timesteps to train the model')
+    train.add_argument('--n-envs', type=int, default=1, help='Number of parallel environments')
+    train.add_argument('--vec-backend', choices=["dummy", "subproc", "shm", "vec"], default='dummy', help='How the parallel environments are run')
+    train.add_argument('--seed', type=int, default=None, help='Base seed for the environments (env i uses seed + i)')
+    train.add_argument('--instrument', action='store_true', help='Log phase timings and env counters to TensorBoard')
+    train.add_argument('--profile', type=int, default=0, help='Run cProfile for this many timesteps (0 = off)')
+    train.add_argument('--sync-callbacks', action='store_true', help='Use the blocking CheckpointCallback/EvalCallback of stable-baselines3')
+    train.add_argument('--keep-last', type=int, default=5, help='Number of checkpoints to keep')
+    train.add_argument('--keep-best', type=int, default=3, help='Number of best evaluated models to keep')
+    train.add_argument('--eval-episodes', type=int, default=100, help='Episodes per evaluation during training')
+    train.add_argument('--observation-mode', choices=['features', 'grid'], default='features', help='9 features (MlpPolicy) or board tensor (CnnPolicy)')
+    train.add_argument('--curriculum', type=str, default=None, help='Board sizes from small to large, e.g. "8,12,16,20" or "8x6,20x20"')
+    train.add_argument('--curriculum-patience', type=int, default=3, help='Evaluations without improvement before the next board size')
+    train.add_argument('--target-score', type=float, default=None, help='Stop the curriculum when this mean score is reached on the last board')
+    train.add_argument('--pretrain', type=str, default=None, help='Expert dataset directory for behaviour cloning before PPO (see expert)')
+    train.add_argument('--pretrain-epochs', type=int, default=1, help='Passes over the expert dataset')
+    train.set_defaults(func=cmd_train)
+
+    expert = subparsers.add_parser("expert", help="Generate an expert dataset for behaviour cloning",
+                                   description="Play the heuristic expert on all cores and write memory-mapped shards.")
+    expert.add_argument('--out', type=str, required=True, help="Target directory of the dataset")
+    expert.add_argument('--episodes', type=int, default=1000, help="Number of episodes")
+    expert.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    expert.add_argument('--shard-size', type=int, default=1 << 18, help="Records (steps) per shard")
+    expert.add_argument('--seed', type=int, default=0, help="Base seed, episode i uses seed + i")
+    expert.add_argument('--board', type=str, default="20", help='Board size in cells, e.g. "20" or "24x16"')
+    expert.set_defaults(func=cmd_expert)
+
+    test = subparsers.add_parser("eval", help="Test one or all models", description="Test a PPO model for Snake game.")
+    test.add_argument('--load', type=str, help="Path to the model to be loaded")
+    test.add_argument('--models-dir', type=str, default="./models", help="Directory of the models")
+    test.add_argument('--test_episode', action='store_true', help="Execute a test episode")
+    test.add_argument('--full_test', action='store_true', help="Test all available models and write results to a file")
+    test.add_argument('--out', type=str, default="test_results.txt", help="Result file of --full_test")
+    test.add_argument('--checkpoints', action='store_true', help="--full_test also evaluates the checkpoints_* directories")
+    test.add_argument('--cache', type=str, default="eval_results.sqlite", help="Result database of --full_test and --report")
+    test.add_argument('--no-cache', action='store_true', help="--full_test plays all episodes without the result database")
+    test.add_argument('--block-size', type=int, default=1000, help="Episodes per cached block (part of the cache key)")
+    test.add_argument('--report', action='store_true', help="Compare all models in the result database without playing")
+    test.add_argument('--episodes', type=int, default=10000, help="Number of evaluation episodes per model")
+    test.add_argument('--workers', type=int, default=None, help="Number of worker processes for --full_test (default: CPU count)")
+    test.add_argument('--seed', type=int, default=0, help="Base seed of the evaluation episodes")
+    test.add_argument('--numpy', action='store_true', help="Use the exported NumPy policies (.npz) instead of the PPO zips")
+    test.add_argument('--planner', action='store_true', help="Play --load with the policy-guided search planner")
+    test.add_argument('--planner-budget-ms', type=float, default=50.0, help="Time budget of the planner per move")
+    test.add_argument('--beam-width', type=int, default=64, help="Nodes kept per search level of the planner")
+    test.add_argument('--depth', type=int, default=40, help="Maximum lookahead of the planner in steps")
+    test.add_argument('--record', type=str, default=None, help="Record episodes of --load to this replay file (e.g. replays/eval.snkr)")
+    test.add_argument('--record-episodes', type=int, default=100, help="Number of episodes for --record")
+    test.set_defaults(func=cmd_eval)
+
+    serve = subparsers.add_parser("serve", help="Start the web viewer", description="Start the Snake web viewer.")
+    serve.add_argument('--preload', action='store_true', help="Load all models into the cache at startup")
+    serve.add_argument('--cache-size', type=int, default=8, help="Maximum number of models kept in memory")
+    serve.add_argument('--tick-rate', type=float, default=10.0, help="Game steps per second")
+    serve.add_argument('--batch-window-ms', type=float, default=2.0, help="How long the inference service collects observations per batch")
+    serve.add_argument('--max-batch', type=int, default=256, help="Maximum observations per forward pass")
+    serve.add_argument('--no-batching', action='store_true', help="Every game calls model.predict itself")
+    serve.add_argument('--planner-budget-ms', type=float, default=50.0, help="Time budget per move of the search planner")
+    serve.add_argument('--beam-width', type=int, default=64, help="Nodes kept per search level of the planner")
+    serve.set_defaults(func=cmd_serve)
+
+    export = subparsers.add_parser("export", help="Export a PPO model to a NumPy policy",
+                                   description="Export a PPO model to a NumPy-only policy (.npz).")
+    export.add_argument('model', type=str, help="Path to the PPO model zip, e.g. models/ppo_snake_config2.zip")
+    export.add_argument('--out', type=str, default=None, help="Output path (default: model path with .npz)")
+    export.add_argument('--no-check', action='store_true', help="Skip the parity check against model.predict")
+    export.set_defaults(func=cmd_export)
+
+    suites = "env, observation, predict, ppo, server"
+    bench = subparsers.add_parser("bench", help="Run the benchmark suites",
+                                  description="Benchmark suite for the Snake environment, inference, training and server.")
+    bench.add_argument('--suite', type=str, default=suites.replace(" ", ""), help=f"Comma separated suites ({suites})")
+    bench.add_argument('--out', type=str, default="benchmark_results.json", help="Where to write the JSON results")
+    bench.add_argument('--baseline', type=str, default=None, help="JSON results to compare against")
+    bench.add_argument('--threshold', type=float, default=0.2, help="Allowed relative regression against the baseline (0.2 = 20%%)")
+    bench.add_argument('--quick', action='store_true', help="Fewer repetitions for a fast smoke run")
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    """
+    Parse ``argv`` (default: sys.argv[1:]) and run the chosen subcommand.
+
+    Args:
+        argv (list, optional): Command line arguments, starting with the subcommand.
+    """
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,47 +1,321 @@
+import itertools
+import struct
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-import random
+from collections import deque
+
+# Richtungen in Aktionsreihenfolge: 0 = oben, 1 = rechts, 2 = unten, 3 = links
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+DIRECTION_ARRAY = np.array(DIRECTIONS, dtype=np.int64)
+# Richtungsindex pro Schritt (dx + 1, dy + 1), für die Kodierung des Körpers
+STEP_CODES = np.zeros((3, 3), dtype=np.uint8)
+for _i, (_dx, _dy) in enumerate(DIRECTIONS):
+    STEP_CODES[_dx + 1, _dy + 1] = _i
+# Versatz der Zellen geradeaus, links (-dy, dx) und rechts (dy, -dx) pro Richtungsindex
+DANGER_OFFSETS = tuple((DIRECTIONS[d], DIRECTIONS[(d + 1) % 4], DIRECTIONS[(d + 3) % 4]) for d in range(4))
+# One-Hot der Richtung pro Richtungsindex in der Reihenfolge [rechts, unten, links, oben]
+DIRECTION_ONEHOT = np.array([
+    [0, 0, 0, 1],  # oben
+    [1, 0, 0, 0],  # rechts
+    [0, 1, 0, 0],  # unten
+    [0, 0, 1, 0],  # links
+], dtype=np.float32)
+DIRECTION_ONEHOT_TUPLES = tuple(tuple(row) for row in DIRECTION_ONEHOT.tolist())
+# Dieselben Versätze als Arrays (Richtung, geradeaus/links/rechts) für die Batch-Variante
+BATCH_DANGER_DX = np.array([[dx for dx, _ in offsets] for offsets in DANGER_OFFSETS], dtype=np.int64)
+BATCH_DANGER_DY = np.array([[dy for _, dy in offsets] for offsets in DANGER_OFFSETS], dtype=np.int64)
+
+OBSERVATION_MODES = ("features", "grid")
+# Kanäle der Gitter-Beobachtung (observation_mode="grid"), Werte 0 oder 255 (ausser Richtung)
+GRID_CHANNELS = ("body", "head", "food", "direction")
+CH_BODY, CH_HEAD, CH_FOOD, CH_DIRECTION = range(len(GRID_CHANNELS))
+# Wert des Richtungskanals an der Kopfzelle pro Richtungsindex (oben, rechts, unten, links)
+GRID_DIRECTION_VALUES = (64, 128, 192, 255)
+
+# Snapshot (get_state/set_state): Version, Spalten, Zeilen, Richtung, Flags, Score, Essen x/y, Länge, Kopf x/y;
+# danach der PCG64-Zustand (state, inc, has_uint32, uinteger), (Länge - 1) 2-Bit-Codes des Körpers und
+# mit STATE_FREE_ORDER die Reihenfolge der freien Zellen im Index (uint16 pro freie Zelle)
+STATE_HEADER = struct.Struct("<BBBBBHBBHBB")
+STATE_RNG = struct.Struct("<16s16sBI")
+STATE_VERSION = 1
+STATE_DONE = 1
+STATE_WON = 2
+STATE_FREE_ORDER = 4
+# Zufallszüge auf dem ganzen Feld, bevor das Essen aus dem Index der freien Zellen gezogen wird
+MAX_FOOD_DRAWS = 16
+
+
+# Koordinaten werden in Snapshots, Replays und Binär-Frames als uint8 gespeichert
+MAX_BOARD_SIZE = 255
+
+
+def check_board_size(cols, rows):
+    """Raise a ValueError unless the board has between 2 and MAX_BOARD_SIZE columns and rows."""
+    if not (2 <= cols <= MAX_BOARD_SIZE and 2 <= rows <= MAX_BOARD_SIZE):
+        raise ValueError(f"Ungültige Spielfeldgrösse {cols}x{rows}, erlaubt sind 2 bis {MAX_BOARD_SIZE} Felder pro Seite")
+
+
+def parse_board_size(text):
+    """Parse a board size given as "20" (square) or "COLSxROWS", e.g. "24x16"; returns (cols, rows)."""
+    cols, _, rows = text.lower().partition("x")
+    return int(cols), int(rows or cols)
+
+
+def pack_codes(codes):
+    """Pack 2-bit codes (values 0-3) into bytes, four codes per byte, first code in the low bits."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)).astype(np.uint8).tobytes()
+
+
+def unpack_codes(data, n):
+    """Inverse of ``pack_codes``: return the first ``n`` codes as uint8 array."""
+    packed = np.frombuffer(data, dtype=np.uint8)
+    codes = np.stack([packed & 3, (packed >> 2) & 3, (packed >> 4) & 3, packed >> 6], axis=1).reshape(-1)
+    return codes[:n]
+
+
+def encode_body(snake):
+    """
+    Encode a body as the head cell plus one 2-bit direction code per further segment.
+
+    Code i is the direction index from segment i to segment i + 1 (towards the tail).
+    """
+    cells = np.fromiter(itertools.chain.from_iterable(snake), dtype=np.int64, count=2 * len(snake))
+    steps = np.diff(cells.reshape(-1, 2), axis=0)
+    return snake[0], pack_codes(STEP_CODES[steps[:, 0] + 1, steps[:, 1] + 1])
+
+
+def decode_body(head, data, length):
+    """Inverse of ``encode_body``: return the cells head first."""
+    steps = DIRECTION_ARRAY[unpack_codes(data, length - 1)]
+    cells = np.cumsum(steps, axis=0) + head
+    return [head] + list(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+
+def batch_observations(heads, directions, food, blocked, out=None):
+    """
+    Compute the 9-dimensional SnakeEnv observation for many boards in one call.
+
+    Args:
+        heads (np.ndarray): Head coordinates (x, y), shape (n, 2).
+        directions (np.ndarray): Direction indices (see DIRECTIONS), shape (n,).
+        food (np.ndarray): Food coordinates (x, y), shape (n, 2).
+        blocked (np.ndarray): Wall-padded occupancy grids of shape (n, rows + 2, cols + 2),
+                              True for body cells and for the border.
+        out (np.ndarray, optional): float32 buffer of shape (n, 9) to write into.
+
+    Returns:
+        np.ndarray: The observations, shape (n, 9), dtype float32. Identical to SnakeEnv._get_observation.
+    """
+    n, padded_rows, padded_cols = blocked.shape
+    if out is None:
+        out = np.empty((n, 9), dtype=np.float32)
+    # Versatz im flachen, gepolsterten Gitter pro (Richtung, geradeaus/links/rechts)
+    offsets = BATCH_DANGER_DY * padded_cols + BATCH_DANGER_DX
+    base = (heads[:, 1] + 1) * padded_cols + heads[:, 0] + 1
+    cells = base[:, None] + offsets[directions]
+    out[:, :3] = blocked.reshape(n, -1)[np.arange(n)[:, None], cells]
+    out[:, 3] = (food[:, 0] - heads[:, 0]) / (padded_cols - 2)
+    out[:, 4] = (food[:, 1] - heads[:, 1]) / (padded_rows - 2)
+    out[:, 5:] = DIRECTION_ONEHOT[directions]
+    return out
+
 
 class SnakeEnv(gym.Env):
     metadata = {'render_modes': ['human']}
 
-    def __init__(self, grid_size=20, width=400, height=400):
+    def __init__(self, grid_size=20, width=400, height=400, copy_observation=True, observation_mode="features",
+                 cols=None, rows=None):
         super(SnakeEnv, self).__init__()
         self.grid_size = grid_size
         self.width = width
         self.height = height
-        self.cols = width // grid_size
-        self.rows = height // grid_size      
+        # Spielfeldgrösse in Zellen; ohne Angabe aus den Pixelmassen abgeleitet (400 / 20 = 20)
+        self.cols = width // grid_size if cols is None else cols
+        self.rows = height // grid_size if rows is None else rows
+        check_board_size(self.cols, self.rows)
         self.action_space = spaces.Discrete(4) # Aktionen: 0 = oben, 1 = rechts, 2 = unten, 3 = links
-        # Beobachtungsraum: Wir nutzen einen 9-dimensionalen Feature-Vektor für das Training.
-        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(9,), dtype=np.float32)
+        if observation_mode not in OBSERVATION_MODES:
+            raise ValueError(f"Unbekannter observation_mode '{observation_mode}', erlaubt sind {OBSERVATION_MODES}")
+        self.observation_mode = observation_mode
+        if observation_mode == "grid":
+            # Spielfeld als uint8-Tensor (Kanäle, Zeilen, Spalten) für CNN-Policies, siehe GRID_CHANNELS.
+            # Der Tensor bleibt bestehen und wird bei jedem Schritt nur an den geänderten Zellen nachgeführt.
+            self.observation_space = spaces.Box(low=0, high=255, shape=(len(GRID_CHANNELS), self.rows, self.cols), dtype=np.uint8)
+            self._board = np.zeros(self.observation_space.shape, dtype=np.uint8)
+        else:
+            # Beobachtungsraum: Wir nutzen einen 9-dimensionalen Feature-Vektor für das Training.
+            self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(9,), dtype=np.float32)
+            self._board = None
         #### reward and penalty
         self.reward_for_food = 1.0
         self.penalty_for_small_steps = -0.01
         self.penalty_for_hit_wall = -1.0
         self.penalty_for_hit_body = -2.0
         ####      
+        # Wiederverwendeter Beobachtungspuffer; ohne Kopie wird er bei jedem Schritt überschrieben
+        self.copy_observation = copy_observation
+        self._obs = np.zeros(9, dtype=np.float32)
+        # Versatz der Zellen geradeaus/links/rechts im flachen Gitter mit Wandrand pro Richtungsindex
+        self._padded_cols = self.cols + 2
+        self._danger_offsets = tuple(tuple(dy * self._padded_cols + dx for dx, dy in offsets) for offsets in DANGER_OFFSETS)
+        # Alle Zellen in Zeilenreihenfolge, Vorlage für den Index der freien Zellen bei reset
+        self._all_cells = list(range(self.cols * self.rows))
         self.reset()
 
+    def __getstate__(self):
+        # Die NumPy-Sichten auf _blocked_bytes werden beim Kopieren/Pickeln neu aufgebaut
+        state = self.__dict__.copy()
+        state.pop("_blocked", None)
+        state.pop("occupancy", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "_blocked_bytes" in state:
+            self._bind_grid_views()
+
+    def _bind_grid_views(self):
+        """Create the NumPy views ``_blocked`` and ``occupancy`` on the ``_blocked_bytes`` buffer."""
+        self._blocked = np.frombuffer(self._blocked_bytes, dtype=bool).reshape(self.rows + 2, self.cols + 2)
+        self.occupancy = self._blocked[1:-1, 1:-1]
+
+    @property
+    def board(self):
+        """
+        The persistent grid observation tensor (observation_mode="grid"), shape (channels, rows, cols).
+
+        This is the buffer itself, not a copy: it changes with every step. None in "features" mode.
+        """
+        return self._board
+
     def eats_food(self):
         return self.snake[0] == self.food
 
-    def reset(self, **kwargs):
-        """Setzt die Umgebung zurück und gibt (observation, info) zurück."""
-        self.snake = [(self.cols // 2, self.rows // 2)]  # Schlange startet in der Mitte
+    def reset(self, seed=None, options=None):
+        """
+        Setzt die Umgebung zurück und gibt (observation, info) zurück.
+        Mit ``seed`` wird ``self.np_random`` neu initialisiert, das für die Futterplatzierung verwendet wird.
+        """
+        super().reset(seed=seed)
+        # Belegungsgitter mit Wandrand als flacher bytearray (schnelle Einzelzugriffe in Python);
+        # _blocked ist eine NumPy-Sicht darauf (am Rand True), occupancy[y, x] das Innere.
+        # Wird bei jedem Schritt inkrementell nachgeführt.
+        self._blocked_bytes = bytearray(b"\x01") * ((self.rows + 2) * self._padded_cols)
+        self._bind_grid_views()
+        self.occupancy[:] = False
+        # Index der freien Zellen: die ersten _n_free Einträge von _free_cells sind frei,
+        # _free_pos[cell] ist die Position einer Zelle in _free_cells (Swap-Remove in O(1))
+        self._free_cells = self._all_cells[:]
+        self._free_pos = self._all_cells[:]
+        self._n_free = self.cols * self.rows
+        self._free_order_fixed = False
+        self.food_retries = 0
+        start = (self.cols // 2, self.rows // 2)  # Schlange startet in der Mitte
+        self.snake = deque([start])
+        self._occupy(start)
+        if self._board is not None:
+            self._board[:] = 0
+            self._board[CH_BODY, start[1], start[0]] = 255
+            self._board[CH_HEAD, start[1], start[0]] = 255
         self.direction = (1, 0)  # startet nach rechts
         self.done = False
+        self.won = False
         self.score = 0
         self._place_food()
         return self._get_observation(), {}
 
+    def _occupy(self, cell):
+        """
+        Mark a cell as covered by the snake and remove it from the free-cell index.
+
+        Args:
+            cell (tuple): The (x, y) coordinates of the cell.
+        """
+        x, y = cell
+        self._blocked_bytes[(y + 1) * self._padded_cols + x + 1] = 1
+        index = y * self.cols + x
+        pos = self._free_pos[index]
+        self._n_free -= 1
+        last = self._free_cells[self._n_free]
+        self._free_cells[pos] = last
+        self._free_pos[last] = pos
+        self._free_cells[self._n_free] = index
+        self._free_pos[index] = self._n_free
+
+    def _release(self, cell):
+        """
+        Mark a cell as free again and add it back to the free-cell index.
+
+        Args:
+            cell (tuple): The (x, y) coordinates of the cell.
+        """
+        x, y = cell
+        self._blocked_bytes[(y + 1) * self._padded_cols + x + 1] = 0
+        index = y * self.cols + x
+        pos = self._free_pos[index]
+        first = self._free_cells[self._n_free]
+        self._free_cells[pos] = first
+        self._free_pos[first] = pos
+        self._free_cells[self._n_free] = index
+        self._free_pos[index] = self._n_free
+        self._n_free += 1
+
+    def _sort_free_cells(self):
+        """Put the free part of the free-cell index into row-major order (it then depends only on the occupied cells)."""
+        free = sorted(self._free_cells[:self._n_free])
+        self._free_cells[:self._n_free] = free
+        for pos, index in enumerate(free):
+            self._free_pos[index] = pos
+
     def _place_food(self):
-        """Plaziert das Essen an einer zufälligen, freien Stelle."""
-        while True:
-            self.food = (random.randint(0, self.cols - 1), random.randint(0, self.rows - 1))
-            if self.food not in self.snake:
-                break
+        """
+        Plaziert das Essen an einer zufälligen, freien Stelle.
+
+        While at least a third of the board is free, up to MAX_FOOD_DRAWS cells are drawn from the
+        whole board until a free one is hit (at most three draws on average); the number of missed
+        draws is kept in ``food_retries``. On fuller boards, and if all draws miss, the food is
+        drawn in O(1) from the free-cell index.
+
+        Which cell is drawn from the index depends on its order, which depends on the order of
+        earlier moves. So that a restored environment places the same food as the original, the
+        index is sorted when less than a third of the board becomes free (once per episode, the
+        number of free cells never grows within an episode) and ``get_state`` stores its order
+        from then on; before, draws from the index sort it first.
+
+        Returns:
+            bool: False if the board is full and no food could be placed (the game is won), True otherwise.
+        """
+        self.food_retries = 0
+        if self._n_free == 0:
+            return False
+        n_cells = self.cols * self.rows
+        index = -1
+        if 3 * self._n_free >= n_cells:
+            blocked = self._blocked_bytes
+            for _ in range(MAX_FOOD_DRAWS):
+                draw = int(self.np_random.integers(n_cells))
+                y, x = divmod(draw, self.cols)
+                if not blocked[(y + 1) * self._padded_cols + x + 1]:
+                    index = draw
+                    break
+                self.food_retries += 1
+        if index < 0:
+            if not self._free_order_fixed:
+                self._sort_free_cells()
+                self._free_order_fixed = 3 * self._n_free < n_cells
+            index = self._free_cells[int(self.np_random.integers(self._n_free))]
+        if self._board is not None:
+            if hasattr(self, "food"):
+                self._board[CH_FOOD, self.food[1], self.food[0]] = 0
+            self._board[CH_FOOD, index // self.cols, index % self.cols] = 255
+        self.food = (index % self.cols, index // self.cols)
+        return True
 
     def _new_direction(self, action):
         """
@@ -98,13 +372,16 @@ class SnakeEnv(gym.Env):
         """
         Check if the snake's head has hit its body.
 
+        Uses the occupancy grid, so the check is O(1) regardless of the snake length.
+        The head must lie inside the board (check ``_hit_wall`` first).
+
         Args:
             head (tuple): The (x, y) coordinates of the snake's head.
 
         Returns:
             bool: True if the snake's head has hit its body, False otherwise.
         """
-        return head in self.snake[1:]
+        return self._blocked_bytes[(head[1] + 1) * self._padded_cols + head[0] + 1] == 1
         
     def _eat_food(self, head):
         """
@@ -144,65 +421,171 @@ class SnakeEnv(gym.Env):
             return self._get_observation(), reward, terminated, truncated, {"score": self.score}
 
         # Kein Kollisionsfehler: Neuer Kopf einfügen
-        self.snake.insert(0, new_head)
+        self.snake.appendleft(new_head)
+        self._occupy(new_head)
+        board = self._board
+        if board is not None:
+            board[CH_HEAD, head[1], head[0]] = 0
+            board[CH_DIRECTION, head[1], head[0]] = 0
+            board[CH_HEAD, new_head[1], new_head[0]] = 255
+            board[CH_BODY, new_head[1], new_head[0]] = 255
         
+        terminated = False
         if self._eat_food(new_head):
             reward = self.reward_for_food
             self.score += 1
-            self._place_food()
+            if not self._place_food():
+                # Spielfeld komplett gefüllt: gewonnen
+                self.won = True
+                self.done = True
+                terminated = True
         else:
             reward = 0
-            self.snake.pop()  # Schwanzsegment entfernen
+            tail = self.snake.pop()
+            self._release(tail)  # Schwanzsegment entfernen
+            if board is not None:
+                board[CH_BODY, tail[1], tail[0]] = 0
 
-        terminated = False
         truncated = False
-        return self._get_observation(), reward, terminated, truncated, {"score": self.score}
+        info = {"score": self.score}
+        if reward > 0:
+            info["food_retries"] = self.food_retries
+        return self._get_observation(), reward, terminated, truncated, info
 
     def _get_observation(self):
         """
         Erzeugt einen 9-dimensionalen Feature-Vektor:
         [danger_ahead, danger_left, danger_right, food_dx, food_dy, dir_right, dir_down, dir_left, dir_up]
+
+        Uses the precomputed direction tables and the wall-padded occupancy grid. With
+        ``copy_observation=False`` the values are written into a preallocated buffer that is
+        returned itself and overwritten by the next step.
+
+        With ``observation_mode="grid"`` the board tensor is returned instead (a copy, or with
+        ``copy_observation=False`` the persistent tensor itself).
         """
-        head = self.snake[0]
+        x, y = self.snake[0]
+        d = DIRECTION_INDEX[self.direction]
+        if self._board is not None:
+            # Die Richtung kann sich auch ohne Bewegung ändern (Kollision), daher hier schreiben
+            self._board[CH_DIRECTION, y, x] = GRID_DIRECTION_VALUES[d]
+            return self._board.copy() if self.copy_observation else self._board
+        blocked = self._blocked_bytes
+        # Gefahrenindikatoren geradeaus, links, rechts (Gitter mit Wandrand, daher +1)
+        base = (y + 1) * self._padded_cols + x + 1
+        ahead, left, right = self._danger_offsets[d]
+        # Relative Position des Essens (normalisiert) und One-Hot-Encoding der Richtung
+        values = (blocked[base + ahead], blocked[base + left], blocked[base + right],
+                  (self.food[0] - x) / self.cols, (self.food[1] - y) / self.rows) + DIRECTION_ONEHOT_TUPLES[d]
+        if self.copy_observation:
+            return np.array(values, dtype=np.float32)
+        self._obs[:] = values
+        return self._obs
 
-        def is_danger(cell):
-            x, y = cell
-            if x < 0 or x >= self.cols or y < 0 or y >= self.rows:
-                return 1.0
-            if cell in self.snake:
-                return 1.0
-            return 0.0
-
-        # Gefahrenindikatoren
-        danger_ahead = is_danger((head[0] + self.direction[0], head[1] + self.direction[1]))
-        left_dir = (-self.direction[1], self.direction[0])
-        danger_left = is_danger((head[0] + left_dir[0], head[1] + left_dir[1]))
-        right_dir = (self.direction[1], -self.direction[0])
-        danger_right = is_danger((head[0] + right_dir[0], head[1] + right_dir[1]))
-
-        # Relative Position des Essens (normalisiert)
-        food_dx = (self.food[0] - head[0]) / self.cols
-        food_dy = (self.food[1] - head[1]) / self.rows
-
-        # One-Hot-Encoding der aktuellen Richtung (Reihenfolge: [rechts, unten, links, oben])
-        if self.direction == (1, 0):
-            dir_onehot = [1, 0, 0, 0]
-        elif self.direction == (0, 1):
-            dir_onehot = [0, 1, 0, 0]
-        elif self.direction == (-1, 0):
-            dir_onehot = [0, 0, 1, 0]
-        elif self.direction == (0, -1):
-            dir_onehot = [0, 0, 0, 1]
-        else:
-            dir_onehot = [0, 0, 0, 0]
+    def get_state(self):
+        """
+        Snapshot of the game as a compact byte string.
 
-        obs_vector = np.array([danger_ahead, danger_left, danger_right, food_dx, food_dy] + dir_onehot, dtype=np.float32)
-        return obs_vector
+        Contains the body (head cell plus 2-bit direction codes), direction, food, score, the
+        done/won flags and the state of ``np_random``, about 50 bytes plus one byte per four
+        segments. Once less than a third of the board is free, the order of the free-cell index
+        is added (two bytes per free cell), since food placement then depends on it. Restoring
+        the snapshot with ``set_state`` continues the game exactly: the same actions lead to the
+        same observations, rewards and food placements.
+
+        Returns:
+            bytes: The snapshot.
+        """
+        rng = self.np_random.bit_generator.state
+        if rng["bit_generator"] != "PCG64":
+            raise ValueError(f"Snapshots unterstützen nur PCG64, nicht {rng['bit_generator']}")
+        (hx, hy), body = encode_body(self.snake)
+        flags = (STATE_DONE if self.done else 0) | (STATE_WON if self.won else 0)
+        if self._free_order_fixed:
+            flags |= STATE_FREE_ORDER
+            body += np.array(self._free_cells[:self._n_free], dtype="<u2").tobytes()
+        return (STATE_HEADER.pack(STATE_VERSION, self.cols, self.rows, DIRECTION_INDEX[self.direction], flags,
+                                  self.score, self.food[0], self.food[1], len(self.snake), hx, hy)
+                + STATE_RNG.pack(rng["state"]["state"].to_bytes(16, "little"), rng["state"]["inc"].to_bytes(16, "little"),
+                                 rng["has_uint32"], rng["uinteger"])
+                + body)
+
+    def set_state(self, state):
+        """
+        Restore a snapshot from ``get_state``.
+
+        The snapshot must come from an environment with the same board size; the observation
+        mode may differ. Costs O(cells + length), independent of the length of the episode; the
+        free-cell index is rebuilt from the restored body.
+
+        Args:
+            state (bytes): The snapshot.
+
+        Returns:
+            np.ndarray: The observation of the restored state.
+        """
+        (version, cols, rows, direction, flags, score, food_x, food_y, length, head_x, head_y) = STATE_HEADER.unpack_from(state)
+        if version != STATE_VERSION:
+            raise ValueError(f"Unbekannte Snapshot-Version {version}")
+        if (cols, rows) != (self.cols, self.rows):
+            raise ValueError(f"Snapshot für {cols}x{rows}, die Umgebung hat {self.cols}x{self.rows} Felder")
+        rng_state, rng_inc, has_uint32, uinteger = STATE_RNG.unpack_from(state, STATE_HEADER.size)
+        bit_generator = self.np_random.bit_generator
+        if not isinstance(bit_generator, np.random.PCG64):
+            self.np_random = np.random.Generator(np.random.PCG64())
+            bit_generator = self.np_random.bit_generator
+        bit_generator.state = {"bit_generator": "PCG64",
+                               "state": {"state": int.from_bytes(rng_state, "little"), "inc": int.from_bytes(rng_inc, "little")},
+                               "has_uint32": has_uint32, "uinteger": uinteger}
+
+        body_start = STATE_HEADER.size + STATE_RNG.size
+        body_end = body_start + -(-(length - 1) // 4)
+        cells = decode_body((head_x, head_y), state[body_start:body_end], length)
+        self.occupancy[:] = False
+        blocked = self._blocked_bytes
+        for x, y in cells:
+            blocked[(y + 1) * self._padded_cols + x + 1] = 1
+        # Index der freien Zellen neu aufbauen, in der gespeicherten Reihenfolge oder zeilenweise
+        n_cells = self.cols * self.rows
+        self._n_free = n_cells - len(cells)
+        self._free_order_fixed = bool(flags & STATE_FREE_ORDER)
+        occupancy = self.occupancy.ravel()
+        if self._free_order_fixed:
+            free = np.frombuffer(state, dtype="<u2", count=self._n_free, offset=body_end).astype(np.int64)
+        else:
+            free = np.flatnonzero(~occupancy)
+        order = np.concatenate([free, np.flatnonzero(occupancy)])
+        positions = np.empty(n_cells, dtype=np.int64)
+        positions[order] = np.arange(n_cells)
+        self._free_cells = order.tolist()
+        self._free_pos = positions.tolist()
+        self.snake = deque(cells)
+        self.direction = DIRECTIONS[direction]
+        self.food = (food_x, food_y)
+        self.score = score
+        self.done = bool(flags & STATE_DONE)
+        self.won = bool(flags & STATE_WON)
+        if self._board is not None:
+            self._board[:] = 0
+            xs, ys = zip(*cells)
+            self._board[CH_BODY, ys, xs] = 255
+            self._board[CH_HEAD, head_y, head_x] = 255
+            self._board[CH_FOOD, food_y, food_x] = 255
+        return self._get_observation()
 
     def get_grid(self):
-        grid = np.zeros((self.grid_size, self.grid_size), dtype=int)
+        """
+        Return the board as an int array of shape (rows, cols): 0 = empty, 1 = body, 2 = food,
+        3 = head, 4 = head after a collision.
+        """
+        grid = np.zeros((self.rows, self.cols), dtype=int)
+        # Nach einem Sieg liegt das letzte Essen unter dem Kopf, deshalb zuerst zeichnen
+        if 0 <= self.food[0] < self.cols and 0 <= self.food[1] < self.rows:
+            grid[self.food[1], self.food[0]] = 2
+        else:
+            print(f"Food index out of bounds: x={self.food[0]}, y={self.food[1]}")
         for i, (x, y) in enumerate(self.snake):
-            if 0 <= x < self.grid_size and 0 <= y < self.grid_size:
+            if 0 <= x < self.cols and 0 <= y < self.rows:
                 # Wenn die Schlange tot ist, Kopf als 'X' markieren (Wert 4)
                 if i == 0:
                     grid[y, x] = 4 if self.done else 3
@@ -210,10 +593,6 @@ class SnakeEnv(gym.Env):
                     grid[y, x] = 1
             else:
                 print(f"Index out of bounds: x={x}, y={y}")
-        if 0 <= self.food[0] < self.grid_size and 0 <= self.food[1] < self.grid_size:
-            grid[self.food[1], self.food[0]] = 2
-        else:
-            print(f"Food index out of bounds: x={self.food[0]}, y={self.food[1]}")
         return grid
 
     def render(self, mode='human'):
@@ -0,0 +1,264 @@
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import toml
+
+# ppo_configs.toml liegt neben diesem Modul
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ppo_configs.toml")
+RESULT_FIELDS = ["trial", "name", "rung", "timesteps", "mean_score", "ci95_low", "ci95_high", "p95_score",
+                 "mean_length", "best_score", "wall_time_s", "status"]
+
+
+def load_configs(config_path=CONFIG_PATH):
+    """Return the PPO configs of a TOML file as a dict name -> config (without the name key)."""
+    with open(config_path, "r") as f:
+        data = toml.load(f)
+    return {cfg["name"]: {k: v for k, v in cfg.items() if k != "name"} for cfg in data["configs"]}
+
+
+def _sample_value(spec, rng):
+    """Draw one value: lists are sampled uniformly, tables {low, high, log} from the interval."""
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    low, high = spec["low"], spec["high"]
+    if spec.get("log", False):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    return int(round(value)) if isinstance(low, int) and isinstance(high, int) else value
+
+
+def expand_trials(configs, sweep=None, seed=0):
+    """
+    Expand a sweep spec into trial configs.
+
+    Args:
+        configs (dict): Base configs by name, as returned by ``load_configs``.
+        sweep (dict, optional): The ``[sweep]`` table: ``method`` ("grid" or "random"), ``base``
+                                (names of the base configs, default all), ``params`` (values per
+                                PPO argument) and ``n_trials`` (random only). Without a spec, every
+                                base config is one trial.
+        seed (int, optional): Seed for random sampling.
+
+    Returns:
+        list: Trials as dicts with ``name`` and the PPO ``config``.
+    """
+    sweep = sweep or {}
+    base_names = sweep.get("base") or list(configs)
+    for name in base_names:
+        if name not in configs:
+            raise ValueError(f"Konfiguration '{name}' nicht gefunden!")
+    params = sweep.get("params", {})
+    method = sweep.get("method", "grid")
+
+    trials = []
+    if method == "grid":
+        keys = list(params)
+        for name in base_names:
+            for values in itertools.product(*(params[k] for k in keys)):
+                overrides = dict(zip(keys, values))
+                suffix = "".join(f"_{k}={v}" for k, v in overrides.items())
+                trials.append({"name": name + suffix, "config": {**configs[name], **overrides}})
+    elif method == "random":
+        rng = np.random.default_rng(seed)
+        for i in range(sweep.get("n_trials", 8)):
+            name = base_names[rng.integers(len(base_names))]
+            overrides = {k: _sample_value(spec, rng) for k, spec in params.items()}
+            trials.append({"name": f"{name}_r{i}", "config": {**configs[name], **overrides}})
+    else:
+        raise ValueError(f"Unbekannte Sweep-Methode '{method}', erlaubt sind 'grid' und 'random'")
+    return trials
+
+
+def rung_timesteps(min_timesteps, max_timesteps, eta):
+    """Training budget (total timesteps) of every successive-halving rung: min, min*eta, ..., max."""
+    budgets = []
+    budget = min_timesteps
+    while budget < max_timesteps:
+        budgets.append(budget)
+        budget *= eta
+    budgets.append(max_timesteps)
+    return budgets
+
+
+def run_trial(trial_dir, ppo_config, timesteps, cpus=1, n_envs=1, seed=0, eval_episodes=200, eval_seed=0):
+    """
+    Process-pool task: train one trial up to ``timesteps`` and evaluate it.
+
+    The trial's model is kept in ``trial_dir/model.zip``, so the next rung continues where this
+    one stopped. If the evaluation is the best of the trial so far, the model is also saved as
+    ``trial_dir/best_model.zip``.
+
+    Args:
+        trial_dir (str): Directory of the trial.
+        ppo_config (dict): PPO arguments of the trial.
+        timesteps (int): Total timesteps the model should have been trained for after this rung.
+        cpus (int, optional): CPU budget of the trial (torch threads).
+        n_envs (int, optional): Number of parallel environments (VecSnakeEnv if > 1).
+        seed (int, optional): Seed of the model and the training environments.
+        eval_episodes (int, optional): Episodes of the evaluation.
+        eval_seed (int, optional): Seed of the evaluation games, the same for every trial.
+
+    Returns:
+        dict: Evaluation statistics, trained timesteps, best score and wall time.
+    """
+    import torch
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+    from evaluation import play_episodes, summarize_scores
+    from numpy_policy import SnakePolicy, policy_arrays
+    from snake_env import SnakeEnv
+    from vec_snake_env import VecSnakeEnv
+
+    torch.set_num_threads(cpus)
+    start = time.perf_counter()
+    env = VecMonitor(VecSnakeEnv(num_envs=n_envs) if n_envs > 1 else DummyVecEnv([SnakeEnv]))
+    env.seed(seed)
+    model_path = os.path.join(trial_dir, "model.zip")
+    if os.path.exists(model_path):
+        model = PPO.load(model_path, env=env, device="cpu")
+        # Das geladene Modell kennt weder den Zufallszustand noch die Beobachtungen der neuen Umgebung:
+        # pro Rung neu seeden (seed + bisherige Schritte) und die Umgebung zurücksetzen
+        model.set_random_seed(seed + model.num_timesteps)
+        model._last_obs = env.reset()
+        model._last_episode_starts = np.ones(env.num_envs, dtype=bool)
+    else:
+        os.makedirs(trial_dir, exist_ok=True)
+        model = PPO("MlpPolicy", env, seed=seed, device="cpu", **ppo_config)
+    try:
+        model.learn(total_timesteps=max(timesteps - model.num_timesteps, 0), reset_num_timesteps=False)
+    finally:
+        env.close()
+    model.save(model_path)
+
+    policy = SnakePolicy.from_arrays(policy_arrays(model.policy))
+    scores, lengths = play_episodes(policy, eval_episodes, seed=eval_seed)
+    summary = summarize_scores(scores, lengths)
+
+    best_path = os.path.join(trial_dir, "best.json")
+    best_score = -math.inf
+    if os.path.exists(best_path):
+        with open(best_path, "r") as f:
+            best_score = json.load(f)["mean_score"]
+    if summary["mean_score"] > best_score:
+        best_score = summary["mean_score"]
+        model.save(os.path.join(trial_dir, "best_model.zip"))
+        with open(best_path, "w") as f:
+            json.dump({"mean_score": best_score, "timesteps": model.num_timesteps}, f)
+    return {**summary, "timesteps": model.num_timesteps, "best_score": best_score,
+            "wall_time_s": time.perf_counter() - start}
+
+
+def run_sweep(trials, out_dir, n_workers=None, cpus_per_trial=1, n_envs=1, min_timesteps=20_000,
+              max_timesteps=180_000, eta=3, eval_episodes=200, seed=0):
+    """
+    Run the trials with successive halving on a local process pool.
+
+    All active trials of a rung are trained in parallel up to the rung's budget and evaluated on
+    the same seeds; only the best ``1/eta`` (at least one) continue to the next rung. Every result
+    row is appended to ``out_dir/results.csv`` as soon as it is known.
+
+    Args:
+        trials (list): Trials from ``expand_trials``.
+        out_dir (str): Output directory, one subdirectory per trial.
+        n_workers (int, optional): Parallel trials. Defaults to CPU count // cpus_per_trial.
+        cpus_per_trial (int, optional): torch threads per trial.
+        n_envs (int, optional): Parallel environments per trial.
+        min_timesteps (int, optional): Budget of the first rung.
+        max_timesteps (int, optional): Budget of the last rung.
+        eta (int, optional): Reduction factor of successive halving.
+        eval_episodes (int, optional): Evaluation episodes per rung.
+        seed (int, optional): Base seed, trial i trains with seed + i; evaluation uses ``seed``.
+
+    Returns:
+        list: The final row of every trial, best first.
+    """
+    n_workers = n_workers or max(1, (os.cpu_count() or 1) // cpus_per_trial)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "trials.json"), "w") as f:
+        json.dump(trials, f, indent=2)
+    results_path = os.path.join(out_dir, "results.csv")
+    with open(results_path, "w", newline="") as f:
+        csv.DictWriter(f, RESULT_FIELDS).writeheader()
+
+    final = {}
+    active = list(range(len(trials)))
+    budgets = rung_timesteps(min_timesteps, max_timesteps, eta)
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        for rung, budget in enumerate(budgets):
+            print(f"Rung {rung}: {len(active)} trials, {budget} timesteps")
+            futures = {
+                i: pool.submit(run_trial, os.path.join(out_dir, f"trial_{i:03d}"), trials[i]["config"], budget,
+                               cpus_per_trial, n_envs, seed + i, eval_episodes, seed)
+                for i in active
+            }
+            rows = []
+            for i, future in futures.items():
+                row = {"trial": i, "name": trials[i]["name"], "rung": rung}
+                try:
+                    row.update({k: v for k, v in future.result().items() if k in RESULT_FIELDS}, status="ok")
+                except Exception as e:
+                    row.update(mean_score=-math.inf, status=f"error: {e}")
+                rows.append(row)
+                final[i] = row
+                with open(results_path, "a", newline="") as f:
+                    csv.DictWriter(f, RESULT_FIELDS).writerow(row)
+            rows.sort(key=lambda row: -row["mean_score"])
+            if rung < len(budgets) - 1:
+                keep = max(1, len(rows) // eta)
+                active = [row["trial"] for row in rows[:keep] if row["status"] == "ok"]
+                for row in rows[keep:]:
+                    # Fehlgeschlagene Trials behalten ihre Fehlermeldung
+                    if row["status"] == "ok":
+                        row["status"] = f"stopped after rung {rung}"
+                if not active:
+                    break
+    return sorted(final.values(), key=lambda row: -row["mean_score"])
+
+
+def format_results(rows):
+    """Format the final rows as a text table."""
+    lines = [f"{'trial':>5}  {'name':<48} {'rung':>4} {'timesteps':>9} {'mean score':>10} {'best':>7}  status"]
+    for row in rows:
+        lines.append(f"{row['trial']:>5}  {row['name'][:48]:<48} {row['rung']:>4} {row.get('timesteps', 0):>9} "
+                     f"{row['mean_score']:>10.3f} {row.get('best_score', float('nan')):>7.3f}  {row['status']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep over ppo_configs.toml with successive halving.")
+    parser.add_argument('--configs', type=str, default=CONFIG_PATH, help="TOML file with the base configs")
+    parser.add_argument('--spec', type=str, default=None, help="TOML file with a [sweep] table (default: one trial per config)")
+    parser.add_argument('--out', type=str, default=None, help="Output directory (default ./sweeps/<timestamp>)")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel trials (default CPU count // cpus-per-trial)")
+    parser.add_argument('--cpus-per-trial', type=int, default=1, help="torch threads per trial")
+    parser.add_argument('--n-envs', type=int, default=1, help="Parallel environments per trial")
+    parser.add_argument('--min-timesteps', type=int, default=20_000, help="Training budget of the first rung")
+    parser.add_argument('--max-timesteps', type=int, default=180_000, help="Training budget of the last rung")
+    parser.add_argument('--eta', type=int, default=3, help="Only the best 1/eta trials continue to the next rung")
+    parser.add_argument('--eval-episodes', type=int, default=200, help="Evaluation episodes per rung")
+    parser.add_argument('--seed', type=int, default=0, help="Base seed")
+    args = parser.parse_args()
+
+    sweep = None
+    if args.spec:
+        with open(args.spec, "r") as f:
+            sweep = toml.load(f)["sweep"]
+    trials = expand_trials(load_configs(args.configs), sweep, seed=args.seed)
+    out_dir = args.out or os.path.join("./sweeps", datetime.now().strftime("%Y%m%d_%H%M%S"))
+    print(f"{len(trials)} trials, results in {out_dir}")
+    rows = run_sweep(trials, out_dir, n_workers=args.workers, cpus_per_trial=args.cpus_per_trial, n_envs=args.n_envs,
+                     min_timesteps=args.min_timesteps, max_timesteps=args.max_timesteps, eta=args.eta,
+                     eval_episodes=args.eval_episodes, seed=args.seed)
+    table = format_results(rows)
+    with open(os.path.join(out_dir, "results.txt"), "w") as f:
+        f.write(table + "\n")
+    print(table)
+    print(f"Best model of every trial: {out_dir}/trial_<id>/best_model.zip")
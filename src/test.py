@@ -1,60 +1,48 @@
-import argparse
+import os
+import sys
 from snake_env import SnakeEnv
-from stable_baselines3 import PPO
-
-import argparse
-from stable_baselines3 import PPO
-
-AVAILABLE_MODELS = [
-    "best_model_config0/best_model",
-    "best_model_config1/best_model",
-    "best_model_config2/best_model",
-    "best_model_config3/best_model",
-    "ppo_snake_config0",
-    "ppo_snake_config1",
-    "ppo_snake_config2",
-    "ppo_snake_config3"
-]
-
-# load the environment
-env = SnakeEnv()
-
-def calculate_average_score(model, num_episodes=10):
+from evaluation import evaluate_models, format_summary, play_episodes, summarize_scores
+from model_registry import ModelRegistry
+
+DEFAULT_MODELS_DIR = "./models"
+
+def available_models(registry):
+    """
+    Return the names of all PPO models of the registry (without checkpoints and without suffix).
+    """
+    return registry.list_models(suffixes=(".zip",))
+
+def calculate_average_score(model, num_episodes=10, seed=0):
     """
     Test the model and return the average score over a specified number of episodes.
+    The episodes are played in lockstep on a VecSnakeEnv with one batched predict call per tick;
+    a SearchPlanner plays them one after another.
 
     Parameters:
     model (object): The trained model to be tested.
-    num_episodes (int, optional): The number of episodes to run the test. Default is 1000.
+    num_episodes (int, optional): The number of episodes to run the test. Default is 10.
+    seed (int, optional): Seed for food placement and action sampling. Default is 0.
 
     Returns:
     float: The average score obtained over the specified number of episodes.
     """
-    total_scores = 0
-
-    for _ in range(num_episodes):
-        obs, _ = env.reset()
-        done = False
-        total_reward = 0
-
-        while not done:
-            action, _states = model.predict(obs)
-            obs, reward, terminated, truncated, info = env.step(action)
-            done = terminated or truncated
-            total_reward += reward
-
-        total_scores += env.score
-
-    avg_score = total_scores / num_episodes
-    print("Average score:", avg_score, "over", num_episodes, "episodes.")
-    return avg_score
+    if hasattr(model, "plan"):
+        from planner import play_planner_episodes
+        scores, lengths = play_planner_episodes(model, num_episodes, seed=seed)
+    else:
+        scores, lengths = play_episodes(model, num_episodes, seed=seed)
+    summary = summarize_scores(scores, lengths)
+    print("Average score:", summary["mean_score"], "over", num_episodes, "episodes.")
+    print(format_summary(summary))
+    return summary["mean_score"]
 
-def execute_test_episode(model):
+def execute_test_episode(model, env=None):
     """
     Test the model and print a single episode with the total reward.
 
     Parameters:
-    model (object): The trained model used to predict actions.
+    model (object): The trained model used to predict actions, or a SearchPlanner.
+    env (SnakeEnv, optional): The environment to play in. A new SnakeEnv is created if None.
 
     Returns:
     None
@@ -63,12 +51,17 @@ def execute_test_episode(model):
     and prints the reward for each step along with the total score. At the end of the episode, it prints
     the total reward and total score.
     """
+    if env is None:
+        env = SnakeEnv()
     obs, _ = env.reset()
     done = False
     total_reward = 0
 
     while not done:
-        action, _states = model.predict(obs)
+        if hasattr(model, "plan"):
+            action = model.plan(env)
+        else:
+            action, _states = model.predict(obs)
         obs, reward, terminated, truncated, info = env.step(action)
         done = terminated or truncated
         total_reward += reward
@@ -78,34 +71,73 @@ def execute_test_episode(model):
     print("Episode finished. Total Reward:", total_reward, ". Total Score:", env.score)
     return f"Episode finished. Total Reward: {total_reward}, Total Score: {env.score}"
 
-def test_model(model_path):
+def test_model(model_path, num_episodes=10000, seed=0, planner_kwargs=None, registry=None):
+    """
+    Play one rendered test episode and evaluate the model over num_episodes episodes.
+
+    Parameters:
+    model_path (str): Name of the model in the registry.
+    num_episodes (int, optional): Number of evaluation episodes.
+    seed (int, optional): Base seed of the evaluation episodes.
+    planner_kwargs (dict, optional): If given, the model plays through a SearchPlanner with these arguments.
+    registry (ModelRegistry, optional): Where the model is loaded from. Defaults to DEFAULT_MODELS_DIR.
+
+    Returns:
+    str: The result text (or the error) of the model.
+    """
+    if registry is None:
+        registry = ModelRegistry(DEFAULT_MODELS_DIR)
     print(f"Loading model from: {model_path}")
     try:
-        ppo_model = PPO.load(f"./models/{model_path}")
+        ppo_model = registry.get(model_path)
+        if planner_kwargs is not None:
+            from planner import SearchPlanner
+            ppo_model = SearchPlanner(ppo_model, **planner_kwargs)
         test_result = execute_test_episode(ppo_model)
-        score_result = calculate_average_score(ppo_model, num_episodes=10000)
+        score_result = calculate_average_score(ppo_model, num_episodes=num_episodes, seed=seed)
         return f"Model: {model_path}\n execute_test_episode {test_result}\n calculate_average_score {score_result}\n"
     except Exception as e:
         return f"Model: {model_path}\nError: {str(e)}\n"
 
+def full_test(registry=None, num_episodes=10000, n_workers=None, seed=0, numpy=False, out_path="test_results.txt",
+              cache=None):
+    """
+    Evaluate all available models of the registry and write the results to a text file.
+    With a cache (EvalCache), only models whose file content is new and only the missing episode
+    blocks are played; everything else is read from the cache.
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Test a PPO model for Snake game.")
-    parser.add_argument('--load', type=str, help="Path to the model to be loaded")
-    parser.add_argument('--test_episode', action='store_true', help="Execute a test episode")
-    parser.add_argument('--full_test', action='store_true', help="Test all available models and write results to a file")
-
-    args = parser.parse_args()
-
-    if args.full_test:
-        with open("test_results.txt", "w") as file:
-            for model in AVAILABLE_MODELS:
-                result = test_model(model)
-                file.write(result + "\n")
-        print("Full test completed. Results saved to test_results.txt.")
-    elif args.load:
-        result = test_model(args.load)
-        print(result)
+    Parameters:
+    registry (ModelRegistry, optional): The models to test. Defaults to DEFAULT_MODELS_DIR.
+    num_episodes (int, optional): Number of evaluation episodes per model.
+    n_workers (int, optional): Number of worker processes (default: CPU count).
+    seed (int, optional): Base seed of the evaluation episodes.
+    numpy (bool, optional): Evaluate the exported NumPy policies (.npz) instead of the PPO zips.
+    out_path (str, optional): The result file.
+    cache (EvalCache, optional): Result cache, see eval_cache.py.
+
+    Returns:
+    dict: The evaluation results per model path, see evaluation.evaluate_models.
+    """
+    if registry is None:
+        registry = ModelRegistry(DEFAULT_MODELS_DIR)
+    models = available_models(registry)
+    suffix = ".npz" if numpy else ""
+    model_paths = [os.path.join(registry.models_dir, model + suffix) for model in models]
+    if cache is not None:
+        results = cache.evaluate(model_paths, num_episodes, n_workers=n_workers, seed=seed)
     else:
-        print("Error: Either --load or --full_test must be specified.")
+        results = evaluate_models(model_paths, num_episodes, n_workers=n_workers, seed=seed)
+    with open(out_path, "w") as file:
+        for model, model_path in zip(models, model_paths):
+            result = results[model_path]
+            if "error" in result:
+                file.write(f"Model: {model}\nError: {result['error']}\n\n")
+            else:
+                file.write(f"Model: {model}\n calculate_average_score {format_summary(result)}\n\n")
+    return results
+
 
+if __name__ == "__main__":
+    # Die Argumente sind in snake.py definiert (python src/snake.py eval --help)
+    from snake import main
+    main(["eval", *sys.argv[1:]])
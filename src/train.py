@@ -1,13 +1,17 @@
-import argparse
+import os
+import sys
 import toml
-from datetime import datetime
-import torch.optim as optim
+from functools import partial
 from snake_env import SnakeEnv
-from stable_baselines3 import DQN, PPO
+from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import CallbackList, BaseCallback, CheckpointCallback, EvalCallback
 from stable_baselines3.common.monitor import Monitor
 from stable_baselines3.common.env_checker import check_env
-from stable_baselines3.dqn.policies import DQNPolicy
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
+
+# Die Konfigurationen liegen neben diesem Modul, unabhängig vom Arbeitsverzeichnis
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ppo_configs.toml")
+DEFAULT_CONFIG_NAME = "config2"
 
 class ScoreLoggingCallback(BaseCallback):
     """
@@ -50,59 +54,161 @@ def clean_toml_config(config):
     """
     excluded_keys = ["name"]
     return {k: v for k, v in config.items() if k not in excluded_keys}
-def get_config_by_name(config_name=None):
+def get_config_by_name(config_name=None, config_path=CONFIG_PATH):
     """
     Wählt eine Konfiguration basierend auf dem Namen aus der TOML-Datei aus.
     Falls kein Name angegeben wird, wird die erste Konfiguration verwendet.
     """
+    with open(config_path, "r") as f:
+        data = toml.load(f)
     if config_name:
         for cfg in data["configs"]:
             if cfg.get("name") == config_name:
                 return cfg
-        raise ValueError(f"Konfiguration '{config_name}' nicht gefunden!")
+        raise ValueError(f"Konfiguration '{config_name}' nicht gefunden in {config_path}!")
     
     return data["configs"][0]  # Fallback auf erste Konfiguration
-# TOML-Konfiguration lesen
-with open("./src/ppo_configs.toml", "r") as f:
-    data = toml.load(f)
-# TOML-Konfiguration laden
-config_name = "config2"  # Hier den gewünschten Namen setzen oder als Argument übergeben
-config = get_config_by_name(config_name)
-print("\nUsing configuration:", config)
-
-
-env = SnakeEnv() # Setups the environment
-env_monitor = Monitor(env) # Monitor the environment
-
-# Callback to save checkpoints during training
-checkpoint_callback = CheckpointCallback(
-    save_freq=5000,  # save a checkpoint every 5k steps
-    save_path="./models/checkpoints_"+config.get("name")+"/",
-    name_prefix="ppo_snake",
-    verbose=1,
-)
-# Callback to evaluate the model during training
-eval_callback = EvalCallback(
-    env_monitor,
-    best_model_save_path="./models/best_model_"+config.get("name")+"/",
-    log_path="./logs/",
-    eval_freq=10_000,  # Evaluate the model every 10k steps
-    n_eval_episodes=3,  # Evaluate the model on 3 episodes
-    deterministic=False,  # False for stochastic when less computation power
-    render=False
-)
-# Callback to log the scores of episodes during training
-score_callback = ScoreLoggingCallback(verbose=1)
-
-# Callback list to combine all callbacks
-callbacks = CallbackList([score_callback, checkpoint_callback, eval_callback])
-
-def train_ppo(total_timesteps, model=None):
+
+VEC_BACKENDS = ["dummy", "subproc", "shm", "vec"]
+
+def run_name(config, observation_mode="features"):
+    """
+    Name under which models, checkpoints and best models of the config are saved.
+    Grid models get the observation mode as suffix, so they do not overwrite the feature models.
+    """
+    return config.get("name") + ("" if observation_mode == "features" else "_" + observation_mode)
+
+def make_training_env(n_envs=1, vec_backend="dummy", seed=None, observation_mode="features", buckets=None):
+    """
+    Create the vectorized training environment.
+    Parameters:
+    n_envs (int): Number of parallel Snake games.
+    vec_backend (str): "dummy" (all envs in this process), "subproc" (SB3 SubprocVecEnv, one process per env),
+                       "shm" (ShmVecEnv, worker processes with shared-memory buffers) or "vec" (VecSnakeEnv, NumPy batch engine).
+    seed (int, optional): Base seed, env i is seeded with seed + i.
+    observation_mode (str): "features" (9-dimensional vector) or "grid" (uint8 board tensor, not supported by "vec").
+    buckets (list, optional): ((cols, rows), n_envs) per board size for curriculum training; the games are run in
+                              a BucketedVecEnv (one VecSnakeEnv per size) and vec_backend is ignored.
+    Returns:
+    VecEnv: The environment wrapped in a VecMonitor.
+    """
+    env_fn = partial(SnakeEnv, observation_mode=observation_mode)
+    if buckets is not None:
+        if observation_mode != "features":
+            raise ValueError("Curriculum-Training unterstützt nur observation_mode='features'")
+        from curriculum import BucketedVecEnv
+        vec_env = BucketedVecEnv(buckets)
+    elif vec_backend == "vec":
+        if observation_mode != "features":
+            raise ValueError("VecSnakeEnv unterstützt nur observation_mode='features'")
+        from vec_snake_env import VecSnakeEnv
+        vec_env = VecSnakeEnv(num_envs=n_envs)
+    elif vec_backend == "shm":
+        from shm_vec_env import ShmVecEnv
+        vec_env = ShmVecEnv([env_fn] * n_envs)
+    elif vec_backend == "subproc":
+        vec_env = SubprocVecEnv([env_fn] * n_envs)
+    elif vec_backend == "dummy":
+        vec_env = DummyVecEnv([env_fn] * n_envs)
+    else:
+        raise ValueError(f"Unbekanntes Vec-Backend '{vec_backend}', erlaubt sind {VEC_BACKENDS}")
+    vec_env.seed(seed)
+    return VecMonitor(vec_env)
+
+def build_callbacks(name, n_envs=1, timers=None, writer=None, keep_last=5, keep_best=3, eval_episodes=100, observation_mode="features"):
+    """
+    Create the training callbacks; checkpoints and best models are saved under the run name ``name``. The checkpoint and eval frequencies are given in total
+    timesteps and divided by n_envs, because callbacks are called once per vectorized step.
+    If timers (PhaseTimers) is given, the checkpoint and eval callbacks are timed.
+    If writer (BackgroundWriter) is given, checkpoints are written in the background and the
+    evaluation runs in a worker process (see async_callbacks.py); keep_last, keep_best and
+    eval_episodes only apply to these. Otherwise the synchronous stable-baselines3 callbacks are used.
+    The evaluation uses the same observation_mode as training.
+    """
+    save_freq = max(5000 // n_envs, 1)
+    eval_freq = max(10_000 // n_envs, 1)
+    if writer is not None:
+        from async_callbacks import AsyncCheckpointCallback, AsyncEvalCallback
+        checkpoint_callback = AsyncCheckpointCallback(
+            save_freq=save_freq,
+            save_path="./models/checkpoints_"+name+"/",
+            writer=writer,
+            name_prefix="ppo_snake",
+            keep_last=keep_last,
+            verbose=1,
+        )
+        eval_callback = AsyncEvalCallback(
+            eval_freq=eval_freq,
+            best_model_save_path="./models/best_model_"+name+"/",
+            writer=writer,
+            n_eval_episodes=eval_episodes,
+            keep_best=keep_best,
+            log_path="./logs/",
+            observation_mode=observation_mode,
+        )
+    else:
+        checkpoint_callback, eval_callback = build_sync_callbacks(name, save_freq, eval_freq, observation_mode)
+    if timers is not None:
+        from instrumentation import TimedCallback
+        checkpoint_callback = TimedCallback(checkpoint_callback, "checkpoint", timers, every=save_freq)
+        eval_callback = TimedCallback(eval_callback, "eval", timers, every=eval_freq)
+    # Callback to log the scores of episodes during training
+    score_callback = ScoreLoggingCallback(verbose=1)
+
+    # Callback list to combine all callbacks
+    return CallbackList([score_callback, checkpoint_callback, eval_callback])
+
+def build_sync_callbacks(name, save_freq, eval_freq, observation_mode="features"):
+    """
+    Create the synchronous CheckpointCallback and EvalCallback, which block training while they run.
+    """
+    eval_env = Monitor(SnakeEnv(observation_mode=observation_mode))
+    # Callback to save checkpoints during training
+    checkpoint_callback = CheckpointCallback(
+        save_freq=save_freq,  # save a checkpoint every 5k steps
+        save_path="./models/checkpoints_"+name+"/",
+        name_prefix="ppo_snake",
+        verbose=1,
+    )
+    # Callback to evaluate the model during training
+    eval_callback = EvalCallback(
+        eval_env,
+        best_model_save_path="./models/best_model_"+name+"/",
+        log_path="./logs/",
+        eval_freq=eval_freq,  # Evaluate the model every 10k steps
+        n_eval_episodes=3,  # Evaluate the model on 3 episodes
+        deterministic=False,  # False for stochastic when less computation power
+        render=False
+    )
+    return checkpoint_callback, eval_callback
+
+def train_ppo(total_timesteps, model=None, n_envs=1, vec_backend="dummy", seed=None, instrument=False, profile_steps=0,
+              async_callbacks=True, keep_last=5, keep_best=3, eval_episodes=100, observation_mode="features",
+              curriculum=None, curriculum_patience=3, target_score=None, config=None, pretrain=None, pretrain_epochs=1):
     """
     Train a Proximal Policy Optimization (PPO) model for the Snake environment.
     Parameters:
     total_timesteps (int): The total number of timesteps to train the model.
     model (PPO, optional): An existing PPO model to continue training. If None, a new model will be created.
+    n_envs (int, optional): Number of parallel environments. n_steps of the config is collected per environment.
+    vec_backend (str, optional): Vectorization backend, see make_training_env.
+    seed (int, optional): Base seed for the environments.
+    instrument (bool, optional): Log phase timings and env counters to TensorBoard (see instrumentation.py).
+    profile_steps (int, optional): If > 0, run cProfile for this many timesteps and save the stats under ./logs/.
+    async_callbacks (bool, optional): Write checkpoints in a background thread and evaluate in a worker process.
+    keep_last (int, optional): Number of checkpoints kept (async callbacks only).
+    keep_best (int, optional): Number of best evaluated snapshots kept (async callbacks only).
+    eval_episodes (int, optional): Episodes per evaluation (async callbacks only).
+    observation_mode (str, optional): "features" trains an MlpPolicy on the 9 features, "grid" a CnnPolicy
+                                      with the small SnakeCNN extractor on the uint8 board tensor.
+    curriculum (list, optional): Board sizes (cols, rows) from small to large. Training starts on the first board
+                                 and moves on when the score on the current board plateaus (see curriculum.py).
+    curriculum_patience (int, optional): Evaluations without improvement before the next board is used.
+    target_score (float, optional): Stop when the curriculum evaluation on the last board reaches this mean score.
+    config (dict, optional): PPO config from ppo_configs.toml (see get_config_by_name). Defaults to DEFAULT_CONFIG_NAME.
+    pretrain (str, optional): Directory of an expert dataset (see expert.py). The policy is pretrained on it with
+                              behaviour cloning before PPO starts; only for observation_mode="features".
+    pretrain_epochs (int, optional): Passes over the expert dataset.
     Returns:
     PPO: The trained PPO model.
     """
@@ -110,13 +216,51 @@ def train_ppo(total_timesteps, model=None):
         print("Train new model.")
     else:
         print("Continue training existing model.")
-        
-    check_env(env, warn=True)
+    if config is None:
+        config = get_config_by_name(DEFAULT_CONFIG_NAME)
+    print("\nUsing configuration:", config)
+    name = run_name(config, observation_mode)
+
+    if pretrain is not None and observation_mode != "features":
+        raise ValueError("Behaviour Cloning unterstützt nur observation_mode='features'")
+    check_env(SnakeEnv(observation_mode=observation_mode), warn=True)
+    scheduler = None
+    if curriculum:
+        from curriculum import CurriculumScheduler
+        scheduler = CurriculumScheduler(curriculum, patience=curriculum_patience)
+    train_env = make_training_env(n_envs, vec_backend, seed, observation_mode,
+                                  buckets=scheduler.buckets(n_envs) if scheduler else None)
+    timers = None
+    extra_callbacks = []
+    if scheduler is not None:
+        from curriculum import CurriculumCallback
+        extra_callbacks.append(CurriculumCallback(scheduler, eval_episodes=max(eval_episodes, 200), target_score=target_score))
+    if instrument:
+        from instrumentation import InstrumentationCallback, InstrumentedVecEnv, PhaseTimers
+        timers = PhaseTimers()
+        train_env = InstrumentedVecEnv(train_env, timers)
+        extra_callbacks.append(InstrumentationCallback(timers, train_env))
+    if profile_steps > 0:
+        from instrumentation import ProfileCallback
+        extra_callbacks.append(ProfileCallback(profile_steps, "./logs/profile_"+name+".prof"))
+    writer = None
+    if async_callbacks:
+        from async_callbacks import BackgroundWriter
+        writer = BackgroundWriter()
+    callbacks = build_callbacks(name, n_envs, timers, writer, keep_last, keep_best, eval_episodes, observation_mode)
+    callbacks.callbacks.extend(extra_callbacks)
     if model is None:
         ppo_config = clean_toml_config(config)
-        model = PPO("MlpPolicy", env, verbose=1, tensorboard_log="./tensorboard/", **ppo_config)
+        if observation_mode == "grid":
+            from cnn_extractor import SnakeCNN
+            # Beobachtungen bleiben im Rollout-Puffer uint8 (1 Byte pro Zelle und Kanal)
+            policy_kwargs = dict(features_extractor_class=SnakeCNN, features_extractor_kwargs=dict(features_dim=256))
+            model = PPO("CnnPolicy", train_env, verbose=1, tensorboard_log="./tensorboard/",
+                        policy_kwargs=policy_kwargs, **ppo_config)
+        else:
+            model = PPO("MlpPolicy", train_env, verbose=1, tensorboard_log="./tensorboard/", **ppo_config)
     else:
-        model.set_env(env)
+        model.set_env(train_env)
         model.verbose = 1
         model.tensorboard_log = "./tensorboard/"
         print("model loaded")
@@ -125,32 +269,21 @@ def train_ppo(total_timesteps, model=None):
         for param_group in model.policy.optimizer.param_groups:
             param_group['lr'] = 0.0001
         print("model config loaded")
+    if pretrain is not None:
+        from expert import ExpertDataset, pretrain_policy
+        # Die Politik startet mit den Aktionen des Experten statt mit zufälligen Gewichten
+        pretrain_policy(model, ExpertDataset(pretrain), epochs=pretrain_epochs, seed=seed or 0)
     
-    model.learn(total_timesteps=total_timesteps, progress_bar=True, callback=callbacks)
-    model.save("./models/ppo_snake_"+config.get("name"))
+    try:
+        model.learn(total_timesteps=total_timesteps, progress_bar=True, callback=callbacks)
+    finally:
+        train_env.close()
+        if writer is not None:
+            writer.close()
+    model.save("./models/ppo_snake_"+name)
     return model
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Train PPO model for Snake game.')
-    parser.add_argument('--load', type=str, default=None, help='Path to the model to load')
-    parser.add_argument('--timesteps', type=int, default=10_000, help='Number of timesteps to train the model')
-    
-    args = parser.parse_args()
-    
-    ppo_model = None
-    # Import if you want to load a model, load the model and retrain it
-    # there is a learning_rate for retraining the model in the code above
-    # if you want to change the config, change in the code above
-    # if you retrian the model, it will be saved in the same directory wit the name of the config
-    # src/train.py --load ppo_snake_config2_base --timesteps 10000 > lod the model with this name, 
-    # re-train it and will be saved as ppo_snake_config2 because of the config name!!!
-    # you see, here is a lot to d, but it is possible to do it :)
-    
-    
-    if args.load != None:
-        print("lodaded model: ", args.load)
-        ppo_model = PPO.load("./models/" + args.load) # Load the model NOT THE CONFIG
-        
-    if args.timesteps:
-        print("timesteps: ", args.timesteps)
-        ppo_model = train_ppo(total_timesteps=args.timesteps, model=ppo_model)
+    # Die Argumente sind in snake.py definiert (python src/snake.py train --help)
+    from snake import main
+    main(["train", *sys.argv[1:]])
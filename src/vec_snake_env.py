@@ -0,0 +1,228 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+from snake_env import DIRECTIONS, batch_observations, check_board_size
+
+# Richtungen in Aktionsreihenfolge: 0 = oben, 1 = rechts, 2 = unten, 3 = links
+DIR_DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int64)
+DIR_DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int64)
+
+
+class VecSnakeEnv(VecEnv):
+    """
+    Batched Snake engine that steps ``num_envs`` games at once with NumPy array operations.
+
+    Implements the stable-baselines3 ``VecEnv`` interface, so it can be handed to PPO directly
+    instead of wrapping several ``SnakeEnv`` instances in a ``DummyVecEnv``. Observations, rewards
+    and termination rules are identical to ``SnakeEnv``; finished games are reset automatically
+    and their last observation is stored in ``infos[i]["terminal_observation"]``.
+
+    State layout (one row per game):
+        heads:     (num_envs, 2) head coordinates (x, y)
+        direction: (num_envs,) direction index (0 = up, 1 = right, 2 = down, 3 = left)
+        food:      (num_envs, 2) food coordinates (x, y)
+        blocked:   (num_envs, rows + 2, cols + 2) bool body occupancy grid with a wall border
+        body:      (num_envs, rows * cols) ring buffer of flat cells of ``blocked``, head at ``head_ptr``
+    """
+    render_mode = None
+
+    def __init__(self, num_envs=8, grid_size=20, width=400, height=400, seed=None, cols=None, rows=None):
+        self.grid_size = grid_size
+        self.width = width
+        self.height = height
+        # Spielfeldgrösse in Zellen wie bei SnakeEnv
+        self.cols = width // grid_size if cols is None else cols
+        self.rows = height // grid_size if rows is None else rows
+        check_board_size(self.cols, self.rows)
+        self.n_cells = self.cols * self.rows
+        self.padded_cols = self.cols + 2
+        #### reward and penalty (wie SnakeEnv)
+        self.reward_for_food = 1.0
+        self.penalty_for_small_steps = -0.01
+        self.penalty_for_hit_wall = -1.0
+        self.penalty_for_hit_body = -2.0
+        ####
+        action_space = spaces.Discrete(4)
+        observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(9,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, action_space)
+
+        self._rng = np.random.default_rng(seed)
+        self._arange = np.arange(num_envs)
+        self.heads = np.zeros((num_envs, 2), dtype=np.int64)
+        self.direction = np.ones(num_envs, dtype=np.int64)
+        self.food = np.zeros((num_envs, 2), dtype=np.int64)
+        self.blocked = np.ones((num_envs, self.rows + 2, self.cols + 2), dtype=bool)
+        self._blocked_flat = self.blocked.reshape(num_envs, -1)
+        self.body = np.zeros((num_envs, self.n_cells), dtype=np.int64)
+        self.head_ptr = np.zeros(num_envs, dtype=np.int64)
+        self.length = np.ones(num_envs, dtype=np.int64)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        self._reset_envs(self._arange)
+
+    @property
+    def occupancy(self):
+        """Body occupancy grids without the wall border, shape (num_envs, rows, cols)."""
+        return self.blocked[:, 1:-1, 1:-1]
+
+    def _cell(self, x, y):
+        """Flat index of (x, y) in the wall-padded grid."""
+        return (y + 1) * self.padded_cols + x + 1
+
+    def _reset_envs(self, idx):
+        """
+        Reset the games at the given indices to the start position and place new food.
+
+        Args:
+            idx (np.ndarray): Indices of the games to reset.
+        """
+        if len(idx) == 0:
+            return
+        start_x, start_y = self.cols // 2, self.rows // 2  # Schlange startet in der Mitte
+        start_cell = self._cell(start_x, start_y)
+        self.heads[idx] = (start_x, start_y)
+        self.direction[idx] = 1  # startet nach rechts
+        self.blocked[idx, 1:-1, 1:-1] = False
+        self._blocked_flat[idx, start_cell] = True
+        self.body[idx, 0] = start_cell
+        self.head_ptr[idx] = 0
+        self.length[idx] = 1
+        self.score[idx] = 0
+        self._place_food(idx)
+
+    def _place_food(self, idx):
+        """
+        Place food on a uniformly chosen free cell for each game in ``idx``.
+
+        Args:
+            idx (np.ndarray): Indices of the games that need new food.
+
+        Returns:
+            np.ndarray: Boolean mask over ``idx``, True where the board was full and no food
+                        could be placed (the game is won).
+        """
+        # Der Wandrand ist immer belegt, frei sind nur Zellen im Inneren
+        free = ~self._blocked_flat[idx]
+        n_free = free.sum(axis=1)
+        full = n_free == 0
+        # k-te freie Zelle ziehen: erste Position, an der die kumulierte Summe k überschreitet
+        k = (self._rng.random(len(idx)) * n_free).astype(np.int64)
+        cells = np.argmax(np.cumsum(free, axis=1) > k[:, None], axis=1)
+        # Bei vollem Feld bleibt das Essen wie in SnakeEnv unter dem Kopf liegen
+        placed = idx[~full]
+        self.food[placed, 0] = cells[~full] % self.padded_cols - 1
+        self.food[placed, 1] = cells[~full] // self.padded_cols - 1
+        return full
+
+    def _get_observations(self, idx=None):
+        """
+        Compute the 9-dimensional feature vector of ``SnakeEnv`` for all games or the games in ``idx``.
+
+        Returns:
+            np.ndarray: Array of shape (num_envs, 9) or (len(idx), 9) with dtype float32.
+        """
+        if idx is None:
+            return batch_observations(self.heads, self.direction, self.food, self.blocked)
+        return batch_observations(self.heads[idx], self.direction[idx], self.food[idx], self.blocked[idx])
+
+    def reset(self):
+        if any(seed is not None for seed in self._seeds):
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_envs(self._arange)
+        return self._get_observations()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        actions = self._actions
+        # Bestimme neue Richtung (ungültige Aktionen behalten die Richtung) und vermeide U-Turns
+        new_dir = np.where((actions >= 0) & (actions < 4), actions, self.direction)
+        uturn = (self.length > 1) & (new_dir == (self.direction + 2) % 4)
+        self.direction = np.where(uturn, self.direction, new_dir)
+
+        new_x = self.heads[:, 0] + DIR_DX[self.direction]
+        new_y = self.heads[:, 1] + DIR_DY[self.direction]
+        hit_wall = (new_x < 0) | (new_x >= self.cols) | (new_y < 0) | (new_y >= self.rows)
+        # Auch Wandzellen liegen im gepolsterten Gitter, daher ist der Index immer gültig
+        new_cell = self._cell(new_x, new_y)
+        hit_body = ~hit_wall & self._blocked_flat[self._arange, new_cell]
+        alive = ~(hit_wall | hit_body)
+        eats = alive & (new_x == self.food[:, 0]) & (new_y == self.food[:, 1])
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        rewards[hit_wall] = self.penalty_for_hit_wall
+        rewards[hit_body] = self.penalty_for_hit_body
+        rewards[eats] = self.reward_for_food
+
+        # Kein Kollisionsfehler: neuen Kopf in den Ringpuffer schreiben
+        moved = np.flatnonzero(alive)
+        self.head_ptr[moved] = (self.head_ptr[moved] + 1) % self.n_cells
+        self.body[moved, self.head_ptr[moved]] = new_cell[moved]
+        self._blocked_flat[moved, new_cell[moved]] = True
+        self.heads[moved, 0] = new_x[moved]
+        self.heads[moved, 1] = new_y[moved]
+
+        # Schwanzsegment entfernen, falls nicht gefressen wurde
+        shrink = np.flatnonzero(alive & ~eats)
+        tail = self.body[shrink, (self.head_ptr[shrink] - self.length[shrink]) % self.n_cells]
+        self._blocked_flat[shrink, tail] = False
+
+        won = np.zeros(self.num_envs, dtype=bool)
+        grow = np.flatnonzero(eats)
+        if len(grow):
+            self.length[grow] += 1
+            self.score[grow] += 1
+            won[grow] = self._place_food(grow)
+
+        dones = ~alive | won
+        obs = self._get_observations()
+        infos = [{"score": int(score)} for score in self.score]
+        # Das Essen wird ohne Fehlversuche auf die k-te freie Zelle gelegt
+        for i in grow:
+            infos[i]["food_retries"] = 0
+
+        done_idx = np.flatnonzero(dones)
+        for i in done_idx:
+            infos[i]["terminal_observation"] = obs[i].copy()
+            infos[i]["TimeLimit.truncated"] = False
+        if len(done_idx):
+            self._reset_envs(done_idx)
+            obs[done_idx] = self._get_observations(done_idx)
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def _whole_batch(self, indices, call):
+        """
+        Indices of a call that acts on the batch object and therefore on all games at once.
+
+        Raises:
+            ValueError: If ``indices`` names only some of the games.
+        """
+        indices = list(self._get_indices(indices))
+        if indices and sorted(set(indices)) != list(range(self.num_envs)):
+            raise ValueError(f"VecSnakeEnv.{call} wirkt auf alle Spiele gemeinsam, nicht nur auf die Indizes {indices}")
+        return indices
+
+    def set_attr(self, attr_name, value, indices=None):
+        if self._whole_batch(indices, "set_attr"):
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Wie get_attr: alle Spiele liegen in einem Objekt, die Methode wird einmal darauf aufgerufen
+        # und ihr Resultat für jeden angefragten Index zurückgegeben
+        indices = self._whole_batch(indices, "env_method")
+        if not indices:
+            return []
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in indices]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]